@@ -0,0 +1,122 @@
+from functools import wraps
+from typing import List
+
+from flask import Blueprint, jsonify, request, session
+
+from categories import CATEGORIES, get_category
+from product_query import DEFAULT_LIMIT, CursorExpired, QueryError, product_table
+from http_cache import conditional, catalog_version
+
+
+api_v1 = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+
+def api_login_required(f):
+    """Like app.login_required, but answers with a JSON 401 instead of redirecting"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({"error": "login required"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _list_arg(name: str) -> List[str]:
+    """Repeated (?brand=a&brand=b) and comma-separated (?brand=a,b) values."""
+    values: List[str] = []
+    for raw in request.args.getlist(name):
+        values.extend(v.strip() for v in raw.split(",") if v.strip())
+    return values
+
+
+def _number_arg(name: str) -> float | None:
+    raw = (request.args.get(name) or "").replace(",", "").strip()
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        raise QueryError(f"{name} must be a number")
+
+
+def _bool_arg(name: str) -> bool | None:
+    raw = (request.args.get(name) or "").strip().lower()
+    if not raw:
+        return None
+    if raw in ("1", "true", "yes"):
+        return True
+    if raw in ("0", "false", "no"):
+        return False
+    raise QueryError(f"{name} must be true or false")
+
+
+@api_v1.errorhandler(QueryError)
+def _query_error(e: QueryError):
+    return jsonify({"error": str(e)}), 410 if isinstance(e, CursorExpired) else 400
+
+
+@api_v1.route("/categories")
+@api_login_required
+def categories():
+    return jsonify({"categories": [
+        {"slug": slug, "brands": cat.brands, "count": len(product_table(cat))}
+        for slug, cat in CATEGORIES.items()
+    ]})
+
+
+def _catalog_version():
+    return catalog_version(get_category(request.args.get("category")))
+
+
+@api_v1.route("/products")
+@api_login_required
+@conditional(_catalog_version)
+def products():
+    """
+    One page of a category's catalog.
+
+    Query parameters: category, brand, source (repeatable or comma-separated),
+    min_price, max_price, below_threshold (true/false), q (name words),
+    sort (catalog, price, name, savings; "-" prefix for descending),
+    fields (comma-separated projection), limit (max 100) and cursor (the
+    next_cursor of the previous page).
+    """
+    cat = get_category(request.args.get("category"))
+    table = product_table(cat)
+    fields = _list_arg("fields") or None
+    want_offers = bool(fields) and "other_offers" in fields
+    # Offers are matched by url and source, so project those too while building them
+    extra = [f for f in ("url", "source") if want_offers and f not in fields]
+    try:
+        limit = int(request.args.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    page = table.query(
+        brands=_list_arg("brand"),
+        sources=_list_arg("source"),
+        min_price=_number_arg("min_price"),
+        max_price=_number_arg("max_price"),
+        below_threshold=_bool_arg("below_threshold"),
+        q=request.args.get("q") or "",
+        sort=request.args.get("sort") or "catalog",
+        fields=fields + extra if extra else fields,
+        limit=limit,
+        cursor=request.args.get("cursor"),
+    )
+    if want_offers:
+        # Offers for the same model at other retailers, from the category's match index
+        matches = cat.match_index()
+        for item in page["items"]:
+            item["other_offers"] = [o for o in matches.offers_for(item["url"]) if o["source"] != item["source"]]
+            for f in extra:
+                del item[f]
+    return jsonify({"category": cat.slug, **page})
+
+
+@api_v1.route("/products/facets")
+@api_login_required
+@conditional(_catalog_version)
+def product_facets():
+    """Counts per brand and source, price bounds and the below-threshold count, for filter UIs."""
+    cat = get_category(request.args.get("category"))
+    return jsonify({"category": cat.slug, **product_table(cat).facets()})
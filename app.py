@@ -8,45 +8,37 @@ from functools import wraps
 # Load environment variables
 load_dotenv()
 
-from scrape_daraz import save_products_to_json
-from price_tracker import load_products_from_json, check_prices, llm_summary_alerts
-from recommendation_agent import recommend_products, load_products_from_json as load_products_for_reco, filter_below_threshold_products
-from review_agent import analyze_product_reviews
-from compare_agent import compare_selected_phones
-from enhanced_compare_agent import enhanced_compare_products
-from scrape_daraz import scrape_daraz_products, scrape_daraz_laptops, scrape_daraz_headphones, scrape_daraz_cameras, scrape_daraz_smartwatches, scrape_daraz_speakers
+from price_tracker import check_prices, cached_summary_alerts, summary_version
+from recommendation_agent import recommend_products
+from deal_ranker import DealRanker, HISTORY_PATH, load_price_history, record_price_history
 from user_auth import UserAuth
+from categories import get_category
+from api import api_v1
+from product_query import product_table
+from http_cache import conditional, catalog_version, static_page, compress_response
+from catalog_summary import get_summary
+import metrics
+import profiler
+from product_cache import TTLCache
+
+# Agents that pull in Playwright, NumPy or scikit-learn are imported inside the
+# routes that use them, so booting the app (or serving /login) does not pay for them.
 
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
+app.register_blueprint(api_v1)
+# Registered before compression so request timings include it
+metrics.init_app(app)
+app.after_request(compress_response)
+# Registered last so its after_request hook stops the profiler right after the view
+profiler.init_app(app)
 
 # Initialize user authentication
 user_auth = UserAuth()
 
-
-BRANDS = [
-    "Samsung", "Xiaomi", "Apple", "Google", "Nokia", "Vivo", "Redmi", "Huawei"
-]
-LAPTOP_BRANDS = [
-    "Dell", "ASUS", "HP", "Lenovo", "Apple", "Acer", "MSI"
-]
-HEADPHONE_BRANDS = [
-    "Sony", "Bose", "Sennheiser", "JBL", "Audio-Technica", "Beats", "Skullcandy", 
-    "Jabra", "Philips", "Logitech", "Razer", "HyperX", "SteelSeries", "Corsair"
-]
-
-CAMERA_BRANDS = [
-    "Canon", "Nikon", "Sony", "Fujifilm", "Panasonic", "Olympus", "GoPro", "DJI", "Pentax"
-]
-
-SMARTWATCH_BRANDS = [
-    "Apple", "Samsung", "Huawei", "Xiaomi", "Amazfit", "Garmin", "Fitbit", "Realme", "OnePlus", "OPPO"
-]
-
-SPEAKER_BRANDS = [
-    "JBL", "Sony", "Bose", "Anker", "Marshall", "UE", "boAt", "Xiaomi", "Huawei", "Samsung", "Philips", "Logitech"
-]
+# Rendered dashboard widgets keyed by category and catalog version
+dashboard_fragments = TTLCache(ttl=24 * 3600, stale=0, max_entries=64)
 
 
 def login_required(f):
@@ -73,53 +65,31 @@ def parse_price_numeric(price_str: str) -> int | None:
     return parse_price(price_str)
 
 
-def normalize_category(raw: str | None) -> str:
-    cat = (raw or "phones").strip().lower()
-    aliases = {
-        "smartwatch": "smartwatches",
-        "smart-watch": "smartwatches",
-        "smart watch": "smartwatches",
-        "smart-watches": "smartwatches",
-        "smartwatches": "smartwatches",
-        "watch": "smartwatches",
-        "watches": "smartwatches",
-        "camera": "cameras",
-        "cameras": "cameras",
-        "headphone": "headphones",
-        "headphones": "headphones",
-        "laptop": "laptops",
-        "laptops": "laptops",
-        "phone": "phones",
-        "phones": "phones",
-        "speaker": "speakers",
-        "speakers": "speakers",
-        "bluetooth speaker": "speakers",
-        "bluetooth speakers": "speakers",
-    }
-    if cat in aliases:
-        return aliases[cat]
-    # Heuristic contains checks
-    if ("smart" in cat and "watch" in cat):
-        return "smartwatches"
-    if "camera" in cat:
-        return "cameras"
-    if "headphone" in cat:
-        return "headphones"
-    if "speaker" in cat:
-        return "speakers"
-    if "laptop" in cat:
-        return "laptops"
-    if "phone" in cat:
-        return "phones"
-    return cat
+def category_page_version(category: str | None = None):
+    """Validator for pages that render from one category's catalog."""
+    return catalog_version(get_category(category or request.args.get("category")))
+
+
+def tracker_page_version():
+    """The tracker also shows price-history deals and the background alert summary."""
+    parts, last_modified = category_page_version()
+    try:
+        history_mtime = os.path.getmtime(HISTORY_PATH)
+    except OSError:
+        history_mtime = None
+    if history_mtime and (last_modified is None or history_mtime > last_modified):
+        last_modified = history_mtime
+    return parts + (history_mtime, summary_version()), last_modified
 
 
 @app.route("/")
+@conditional(static_page, max_age=300)
 def index():
     return render_template("launch.html")
 
 
 @app.route("/pricing")
+@conditional(static_page, max_age=300)
 def pricing():
     """Display pricing plans page"""
     return render_template("pricing.html")
@@ -177,165 +147,79 @@ def logout():
 
 @app.route("/dashboard")
 @login_required
+@conditional(category_page_version)
 def dashboard():
-    category = normalize_category(request.args.get("category"))
-    if category == "laptops":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_laptops.json")
-        brands = LAPTOP_BRANDS
-    elif category == "headphones":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_headphones.json")
-        brands = HEADPHONE_BRANDS
-    elif category == "cameras":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_cameras.json")
-        brands = CAMERA_BRANDS
-    elif category == "smartwatches":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_smartwatches.json")
-        brands = SMARTWATCH_BRANDS
-    elif category == "speakers":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_speakers.json")
-        brands = SPEAKER_BRANDS
-    else:
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_products.json")
-        brands = BRANDS
-    products = load_products_from_json(data_path)
-    total_products = len(products) if products else 0
-    below_count = len(check_prices(products)) if products else 0
-    last_brand = products[0].get("brand") if products else None
-    # brand counts for simple chart
-    brand_counts = {}
-    for p in products or []:
-        b = p.get("brand") or "Unknown"
-        brand_counts[b] = brand_counts.get(b, 0) + 1
-    return render_template(
-        "index.html",
-        brands=brands,
-        category=category,
-        total_products=total_products,
-        below_count=below_count,
-        last_brand=last_brand,
-        brand_counts=brand_counts,
-        products=products,
-    )
+    cat = get_category(request.args.get("category"))
+    version = cat.version
+
+    def render_stats() -> str:
+        summary = get_summary(cat)
+        return render_template(
+            "_dashboard_stats.html",
+            category=cat.slug,
+            total_products=summary["total_products"],
+            below_count=summary["below_count"],
+            last_brand=summary["last_brand"],
+        )
+
+    # Widgets depend only on the catalog, so they are shared by all users until it changes
+    stats_html = dashboard_fragments.get_or_load(f"{cat.slug}:{version}", render_stats)
+    return render_template("index.html", brands=cat.brands, category=cat.slug, stats_html=stats_html)
 
 
 @app.route("/scrape", methods=["POST"])
 @login_required
 def scrape():
-    category = normalize_category(request.form.get("category"))
-    brand = request.form.get("brand") or ("Dell" if category == "laptops" else "Sony" if category == "headphones" else "Canon" if category == "cameras" else "Apple" if category == "smartwatches" else "JBL" if category == "speakers" else "Samsung")
-    threshold_input = request.form.get("threshold") or ("Rs. 50000" if category == "headphones" else "Rs. 400000")
+    from catalog_ingest import ingest_products
+
+    cat = get_category(request.form.get("category"))
+    brand = request.form.get("brand") or cat.default_brand
+    threshold_input = request.form.get("threshold") or cat.default_threshold
     # Normalize threshold to include Rs. prefix if numeric provided
     if threshold_input.isdigit():
         threshold_input = f"Rs. {int(threshold_input):,}".replace(",", "")
 
-    if category == "laptops":
-        # Daraz laptops category with brand filter, target 40 items per brand
-        products = scrape_daraz_laptops(brand, threshold_input, max_items=40)
-        save_path = os.path.join(os.path.dirname(__file__), "daraz_laptops.json")
-    elif category == "headphones":
-        # Daraz headphones category with brand filter, target 40 items per brand
-        products = scrape_daraz_headphones(brand, threshold_input, max_items=40)
-        save_path = os.path.join(os.path.dirname(__file__), "daraz_headphones.json")
-    elif category == "cameras":
-        # Daraz cameras category with brand filter, target 40 items per brand
-        products = scrape_daraz_cameras(brand, threshold_input, max_items=40)
-        save_path = os.path.join(os.path.dirname(__file__), "daraz_cameras.json")
-    elif category == "smartwatches":
-        # Daraz smartwatches category with brand filter, target 40 items per brand
-        products = scrape_daraz_smartwatches(brand, threshold_input, max_items=40)
-        save_path = os.path.join(os.path.dirname(__file__), "daraz_smartwatches.json")
-    elif category == "speakers":
-        # Daraz speakers category with brand filter, target 40 items per brand
-        products = scrape_daraz_speakers(brand, threshold_input, max_items=40)
-        save_path = os.path.join(os.path.dirname(__file__), "daraz_speakers.json")
-    else:
-        # Scrape Daraz for phones
-        products = scrape_daraz_products(brand, threshold_input)
-        save_path = os.path.join(os.path.dirname(__file__), "daraz_products.json")
+    products = cat.scrape(brand, threshold_input)
     if not products:
         flash("No products scraped. Try another brand or try again.", "error")
         return redirect(url_for("dashboard"))
 
-    save_products_to_json(products, save_path)
-    if category == "laptops":
-        flash(f"Scraped {len(products)} laptops.", "success")
-        return redirect(url_for("tracker", category="laptops"))
-    elif category == "headphones":
-        flash(f"Scraped {len(products)} headphones.", "success")
-        return redirect(url_for("tracker", category="headphones"))
-    elif category == "cameras":
-        flash(f"Scraped {len(products)} cameras.", "success")
-        return redirect(url_for("tracker", category="cameras"))
-    elif category == "smartwatches":
-        flash(f"Scraped {len(products)} smartwatches.", "success")
-        return redirect(url_for("tracker", category="smartwatches"))
-    elif category == "speakers":
-        flash(f"Scraped {len(products)} speakers.", "success")
-        return redirect(url_for("tracker", category="speakers"))
-    else:
-        flash(f"Scraped {len(products)} products for {brand} across multiple sites.", "success")
-        return redirect(url_for("tracker", category="phones"))
+    products = ingest_products(products, cat.slug)
+    cat.save(products)
+    record_price_history(products)
+    flash(cat.scrape_message.format(count=len(products), brand=brand), "success")
+    return redirect(url_for("tracker", category=cat.slug))
 
 
 @app.route("/tracker")
 @login_required
+@conditional(tracker_page_version)
 def tracker():
-    category = normalize_category(request.args.get("category"))
-    if category == "laptops":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_laptops.json")
-    elif category == "headphones":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_headphones.json")
-    elif category == "cameras":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_cameras.json")
-    elif category == "smartwatches":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_smartwatches.json")
-    elif category == "speakers":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_speakers.json")
-    else:
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_products.json")
-    products = load_products_from_json(data_path)
+    cat = get_category(request.args.get("category"))
+    category = cat.slug
+    products = cat.products()
     alerts = check_prices(products) if products else []
-    summary = llm_summary_alerts(alerts) if products else "🔍 No products tracked yet. Use the home page to scrape a brand first."
-    alerts_by_url = {a["url"]: a for a in alerts}
-
-    # Annotate products with below-threshold flag
-    annotated: List[Dict] = []
-    for p in products:
-        url = p.get("url", "#")
-        alert = alerts_by_url.get(url)
-        annotated.append({
-            **p,
-            "below_threshold": bool(alert),
-        })
-
-    # Group by source website for the UI
-    groups: Dict[str, List[Dict]] = {}
-    for p in annotated:
-        src = p.get("source") or "Daraz"
-        groups.setdefault(src, []).append(p)
+    summary = cached_summary_alerts(alerts) if products else "🔍 No products tracked yet. Use the home page to scrape a brand first."
+    matches = cat.match_index()
+    deals = DealRanker(k=20, history=load_price_history()).add_all(products, category).top()
+    # The product tables are paged in from /api/v1/products; only per-source counts are rendered here
+    sources = product_table(cat).facets()["sources"]
 
-    return render_template("tracker.html", products=annotated, groups=groups, summary=summary, category=category)
+    return render_template("tracker.html", total=len(products), sources=sources, summary=summary, category=category, cross_source=matches.multi_source(), deals=deals)
 
 
 @app.route("/recommendations", methods=["GET", "POST"])
 @login_required
+@conditional(category_page_version)
 def recommendations():
-    category = normalize_category(request.args.get("category") or request.form.get("category"))
-    if category == "laptops":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_laptops.json")
-    elif category == "headphones":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_headphones.json")
-    elif category == "cameras":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_cameras.json")
-    elif category == "smartwatches":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_smartwatches.json")
-    elif category == "speakers":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_speakers.json")
-    else:
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_products.json")
-    all_products = load_products_for_reco(data_path)
-    products = filter_below_threshold_products(all_products)
+    from catalog_index import get_catalog_index
+
+    cat = get_category(request.args.get("category") or request.form.get("category"))
+    category = cat.slug
+    products = cat.below_threshold()
     recs: List[Dict] = []
+    cross_recs: List[Dict] = []
+    accessories: List[Dict] = []
     query_name = ""
     max_price = None
     quick_picks: List[str] = []
@@ -355,31 +239,27 @@ def recommendations():
             query_name = products[0].get("name", "")
         if query_name:
             recs = recommend_products(query_name, products, top_n=5, max_price=max_price)
+            # Alternatives and add-ons from the other categories, served by the shared index
+            index = get_catalog_index()
+            cross_recs = index.similar(query_name, exclude_categories=[category], top_n=4, max_price=max_price)
+            accessories = index.accessories_for(query_name, category)
 
-    return render_template("recommendations.html", products=products, recs=recs, query=query_name, quick_picks=quick_picks, category=category)
+    return render_template("recommendations.html", products=products, recs=recs, cross_recs=cross_recs, accessories=accessories, query=query_name, quick_picks=quick_picks, category=category)
 
 
 @app.route("/reviews", methods=["GET", "POST"])
 @login_required
 def reviews():
-    category = normalize_category(request.args.get("category") or request.form.get("category"))
-    if category == "laptops":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_laptops.json")
-    elif category == "headphones":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_headphones.json")
-    elif category == "cameras":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_cameras.json")
-    elif category == "smartwatches":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_smartwatches.json")
-    elif category == "speakers":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_speakers.json")
-    else:
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_products.json")
-    products = load_products_for_reco(data_path)
+    from review_agent import analyze_product_reviews, MAX_REVIEWS as REVIEW_CRAWL_MAX
+
+    cat = get_category(request.args.get("category") or request.form.get("category"))
+    category = cat.slug
+    products = cat.products()
     product_query = ""
     chosen = None
     reviews_list: List[Dict] = []
     summary = ""
+    analysis = None
 
     if request.method == "POST":
         product_query = request.form.get("query") or ""
@@ -391,35 +271,28 @@ def reviews():
                 if product_query.lower() in (p.get("name", "").lower()):
                     chosen = p
                     break
-            # Request all available reviews by passing a large max_reviews
-            reviews_list, summary = analyze_product_reviews(product_query, (chosen or {}).get("url"), max_reviews=10000)
-            
+            # The crawl stops at the review count/time budgets or once every star rating is covered
+            reviews_list, summary, analysis = analyze_product_reviews(product_query, (chosen or {}).get("url"), max_reviews=REVIEW_CRAWL_MAX)
+
             # Show success message if reviews were found
             if reviews_list:
-                flash(f"Successfully scraped {len(reviews_list)} reviews for '{product_query}'", "success")
+                crawl = (analysis or {}).get("crawl")
+                stopped = f" ({crawl['reason']}, {crawl['elapsed']}s)" if crawl else ""
+                flash(f"Successfully scraped {len(reviews_list)} reviews for '{product_query}'{stopped}", "success")
             else:
                 flash(f"No reviews found for '{product_query}'. Try a different product.", "error")
 
-    return render_template("reviews.html", products=products, query=product_query, chosen=chosen, reviews=reviews_list, summary=summary, category=category)
+    return render_template("reviews.html", query=product_query, chosen=chosen, reviews=reviews_list, summary=summary, analysis=analysis, category=category)
 
 
 @app.route("/compare", methods=["GET", "POST"])
 @login_required
 def compare():
-    category = normalize_category(request.args.get("category") or request.form.get("category"))
-    if category == "laptops":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_laptops.json")
-    elif category == "headphones":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_headphones.json")
-    elif category == "cameras":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_cameras.json")
-    elif category == "smartwatches":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_smartwatches.json")
-    elif category == "speakers":
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_speakers.json")
-    else:
-        data_path = os.path.join(os.path.dirname(__file__), "daraz_products.json")
-    products = load_products_for_reco(data_path)
+    from compare_agent import compare_selected_phones
+    from enhanced_compare_agent import enhanced_compare_products
+
+    cat = get_category(request.args.get("category") or request.form.get("category"))
+    category = cat.slug
     selected_urls: List[str] = []
     selected: List[Dict] = []
     priorities_raw = ""
@@ -431,8 +304,8 @@ def compare():
         priorities_raw = request.form.get("priorities") or ""
         priorities = [p.strip().lower() for p in priorities_raw.split(",") if p.strip()]
         # Map URLs to product dicts if present
-        url_to_product = {p.get("url"): p for p in (products or [])}
-        selected = [url_to_product.get(u, {"url": u, "name": u}) for u in selected_urls]
+        table = product_table(cat)
+        selected = [table.rows[table.by_url[u]] if u in table.by_url else {"url": u, "name": u} for u in selected_urls]
         
         # Use enhanced comparison if products are selected
         if selected and len(selected) > 0:
@@ -446,7 +319,6 @@ def compare():
             comparison = compare_selected_phones(selected, priorities, category=category)
 
     return render_template("compare.html", 
-                         products=products, 
                          selected=selected, 
                          comparison=comparison, 
                          enhanced_comparison=enhanced_comparison,
@@ -456,23 +328,10 @@ def compare():
 
 @app.route("/category/<category>")
 @login_required
+@conditional(static_page)
 def category_hub(category: str):
-    cat = normalize_category(category)
-    if cat not in ("phones", "laptops", "headphones", "cameras", "smartwatches", "speakers"):
-        cat = "phones"
-    if cat == "laptops":
-        brands = LAPTOP_BRANDS
-    elif cat == "headphones":
-        brands = HEADPHONE_BRANDS
-    elif cat == "cameras":
-        brands = CAMERA_BRANDS
-    elif cat == "smartwatches":
-        brands = SMARTWATCH_BRANDS
-    elif cat == "speakers":
-        brands = SPEAKER_BRANDS
-    else:
-        brands = BRANDS
-    return render_template("category_hub.html", category=cat, brands=brands)
+    cat = get_category(category)
+    return render_template("category_hub.html", category=cat.slug, brands=cat.brands)
 
 
 ## Alerts feature removed
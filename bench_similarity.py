@@ -0,0 +1,84 @@
+"""
+Memory benchmark for the recommendation similarity path.
+
+Compares peak traced memory of the previous dense implementation
+(TfidfVectorizer -> toarray -> cosine_similarity) with the chunked sparse
+path in recommendation_agent.recommend_products on synthetic catalogs.
+
+Usage: python bench_similarity.py [sizes...]
+"""
+import io
+import sys
+import time
+import random
+import tracemalloc
+import contextlib
+from typing import List, Dict
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from recommendation_agent import recommend_products
+
+
+# The dense path needs rows x vocabulary float64 cells; skip it past this size
+DENSE_LIMIT = 20000
+
+BRANDS = ["Samsung", "Apple", "Xiaomi", "Redmi", "Huawei", "Vivo", "Nokia", "Google", "Realme", "Oppo"]
+WORDS = ["Galaxy", "iPhone", "Note", "Pro", "Max", "Ultra", "Lite", "Plus", "5G", "Dual", "SIM",
+         "Smartphone", "Mobile", "Phone", "Edition", "Global", "Version", "AMOLED", "Fast", "Charge"]
+
+
+def synthetic_catalog(size: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(size):
+        name = " ".join([
+            rng.choice(BRANDS),
+            *rng.sample(WORDS, 4),
+            f"M{rng.randint(1, size)}",
+            f"{rng.choice([4, 6, 8, 12])}GB",
+            f"{rng.choice([64, 128, 256, 512])}GB",
+        ])
+        products.append({
+            "name": name,
+            "price": f"Rs. {rng.randint(15000, 400000):,}",
+            "url": f"https://example.invalid/p/{i}",
+        })
+    return products
+
+
+def dense_reference(query: str, products: List[Dict]) -> None:
+    corpus = [query] + [p["name"] for p in products]
+    vectors = TfidfVectorizer().fit_transform(corpus).toarray()
+    cosine_similarity([vectors[0]], vectors[1:])[0]
+
+
+def measure(fn, *args) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed
+
+
+def main(sizes: List[int]) -> None:
+    query = "Samsung Galaxy Ultra 5G 12GB 256GB"
+    print(f"{'products':>10} | {'dense peak MB':>13} | {'dense s':>8} | {'sparse peak MB':>14} | {'sparse s':>8}")
+    print("-" * 66)
+    for size in sizes:
+        products = synthetic_catalog(size)
+        if size <= DENSE_LIMIT:
+            dense_mb, dense_s = measure(dense_reference, query, products)
+            dense = f"{dense_mb:13.1f} | {dense_s:8.2f}"
+        else:
+            dense = f"{'skipped':>13} | {'-':>8}"
+        sparse_mb, sparse_s = measure(recommend_products, query, products, 5)
+        print(f"{size:>10} | {dense} | {sparse_mb:14.1f} | {sparse_s:8.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 5000, 20000, 100000])
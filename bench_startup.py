@@ -0,0 +1,107 @@
+"""
+Cold-start benchmark and import budget check for the Flask app.
+
+Each scenario runs in a fresh interpreter, several times:
+- eager: app plus every agent module imported up front (how app.py booted
+  before agents were imported lazily)
+- lazy: just `import app`, which is what a worker does at boot
+
+For both it reports import time, time to the first /login response and
+peak RSS. It then checks the lazy scenario against the budget: boot must
+stay under --budget seconds and --rss-budget MB, and none of HEAVY_MODULES
+may be imported. The exit status is non-zero when the budget is exceeded,
+so this can run in CI.
+
+Usage: python bench_startup.py [--runs 5] [--budget 1.0] [--rss-budget 80]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Dependencies that must not be loaded just by importing the app
+HEAVY_MODULES = ["sklearn", "scipy", "numpy", "playwright", "google.generativeai"]
+
+EAGER_IMPORTS = """
+import scrape_daraz, review_agent, compare_agent, enhanced_compare_agent
+import catalog_index, catalog_ingest, product_matcher, recommendation_agent
+recommendation_agent._get_hasher()
+try:
+    import google.generativeai
+except Exception:
+    pass
+"""
+
+_PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+import app
+{extra}
+booted = time.perf_counter() - start
+client = app.app.test_client()
+client.get("/login")
+first = time.perf_counter() - start
+print(json.dumps({{
+    "import_s": booted,
+    "first_request_s": first,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_probe(extra: str) -> dict:
+    env = dict(os.environ, LLM_DISABLED="1")
+    code = _PROBE.format(extra=extra, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(extra: str, runs: int) -> dict:
+    # One untimed run so both scenarios start from a warm bytecode cache
+    run_probe(extra)
+    samples = [run_probe(extra) for _ in range(runs)]
+    return {
+        "import_s": statistics.median(s["import_s"] for s in samples),
+        "first_request_s": statistics.median(s["first_request_s"] for s in samples),
+        "rss_mb": statistics.median(s["rss_mb"] for s in samples),
+        "heavy": samples[-1]["heavy"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="max seconds to import the app")
+    parser.add_argument("--rss-budget", type=float, default=80.0, help="max RSS in MB after boot")
+    args = parser.parse_args()
+
+    results = {"eager": measure(EAGER_IMPORTS, args.runs), "lazy": measure("", args.runs)}
+    print(f"{'scenario':>8} | {'import s':>8} | {'first /login s':>14} | {'RSS MB':>7} | heavy modules loaded")
+    print("-" * 78)
+    for name, r in results.items():
+        print(f"{name:>8} | {r['import_s']:8.2f} | {r['first_request_s']:14.2f} | {r['rss_mb']:7.0f} | "
+              f"{', '.join(r['heavy']) or '-'}")
+
+    lazy = results["lazy"]
+    failures = []
+    if lazy["import_s"] > args.budget:
+        failures.append(f"app import took {lazy['import_s']:.2f}s (budget {args.budget:.2f}s)")
+    if lazy["rss_mb"] > args.rss_budget:
+        failures.append(f"RSS after boot is {lazy['rss_mb']:.0f} MB (budget {args.rss_budget:.0f} MB)")
+    if lazy["heavy"]:
+        failures.append(f"heavy modules imported at boot: {', '.join(lazy['heavy'])}")
+    for f in failures:
+        print(f"BUDGET EXCEEDED: {f}")
+    if not failures:
+        print("Startup budget OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import os
+import json
+from typing import List, Dict, Tuple, Iterable
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from recommendation_agent import parse_price
+from categories import BASE_DIR, CATEGORIES
+from metrics import span
+
+
+# Catalog file backing each category
+CATEGORY_FILES = {slug: cat.filename for slug, cat in CATEGORIES.items()}
+
+# Categories that make sense as add-ons for a product of the given category
+ACCESSORY_CATEGORIES = {
+    "phones": ["headphones", "smartwatches", "speakers"],
+    "laptops": ["headphones", "speakers"],
+    "smartwatches": ["headphones"],
+    "cameras": [],
+    "headphones": [],
+    "speakers": [],
+}
+
+
+class CatalogIndex:
+    """
+    One TF-IDF index over the catalogs of every category.
+
+    Products from all categories share a single sparse matrix; parallel NumPy
+    columns (category, brand, price) drive category-aware filtering so
+    cross-category queries never reload or re-vectorize the JSON files.
+    """
+
+    def __init__(self, catalogs: Dict[str, List[Dict]]):
+        self.categories: List[str] = list(catalogs.keys())
+        self.products: List[Dict] = []
+        category_codes: List[int] = []
+        for code, cat in enumerate(self.categories):
+            for p in catalogs[cat] or []:
+                if not p.get("name") or p.get("name") == "No Name":
+                    continue
+                self.products.append({**p, "category": cat})
+                category_codes.append(code)
+
+        self.category_codes = np.array(category_codes, dtype=np.int16)
+        self.brands = np.array([(p.get("brand") or "").strip().lower() for p in self.products], dtype=object)
+        self.brand_set = {b for b in self.brands if b}
+        self.names_lower = np.array([p["name"].strip().lower() for p in self.products], dtype=object)
+        self.position = {name: i for i, name in enumerate(self.names_lower)}
+        prices = [parse_price(p.get("price")) for p in self.products]
+        self.prices = np.array([np.nan if v is None else float(v) for v in prices], dtype=np.float64)
+
+        self.vectorizer = TfidfVectorizer()
+        if self.products:
+            # Rows are L2-normalized, so a sparse dot product is the cosine similarity
+            self.matrix = self.vectorizer.fit_transform([p["name"] for p in self.products]).tocsr()
+        else:
+            self.matrix = None
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _category_mask(self, categories: Iterable[str] | None, exclude: Iterable[str] | None) -> np.ndarray:
+        mask = np.ones(len(self.products), dtype=bool)
+        if categories is not None:
+            codes = [self.categories.index(c) for c in categories if c in self.categories]
+            mask &= np.isin(self.category_codes, codes)
+        if exclude:
+            codes = [self.categories.index(c) for c in exclude if c in self.categories]
+            mask &= ~np.isin(self.category_codes, codes)
+        return mask
+
+    def _query_scores(self, text: str) -> np.ndarray:
+        query_vec = self.vectorizer.transform([text or ""])
+        return np.asarray((self.matrix @ query_vec.T).todense()).ravel()
+
+    def _top(self, scores: np.ndarray, mask: np.ndarray, top_n: int) -> List[int]:
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0 or top_n <= 0:
+            return []
+        cand_scores = scores[candidates]
+        if candidates.size > top_n:
+            part = np.argpartition(-cand_scores, top_n - 1)[:top_n]
+            candidates, cand_scores = candidates[part], cand_scores[part]
+        order = np.argsort(-cand_scores, kind="stable")
+        return [int(i) for i in candidates[order]]
+
+    def _result(self, idx: int, similarity: float, score: float) -> Dict:
+        p = self.products[idx]
+        return {
+            "name": p.get("name", ""),
+            "price": p.get("price", ""),
+            "url": p.get("url", "#"),
+            "source": p.get("source", ""),
+            "brand": p.get("brand", ""),
+            "category": p["category"],
+            "similarity_score": round(float(similarity), 2),
+            "composite_score": round(float(score), 2),
+        }
+
+    def similar(self, product_name: str, categories: Iterable[str] | None = None, exclude_categories: Iterable[str] | None = None,
+                top_n: int = 5, max_price: int | None = None) -> List[Dict]:
+        """Most similar products by name, optionally restricted to or excluding some categories."""
+        if self.matrix is None:
+            return []
+        scores = self._query_scores(product_name)
+        mask = self._category_mask(categories, exclude_categories) & (scores > 0)
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        # Never return the query product itself
+        q = (product_name or "").strip().lower()
+        mask &= self.names_lower != q
+        return [self._result(i, scores[i], scores[i]) for i in self._top(scores, mask, top_n)]
+
+    def accessories_for(self, product_name: str, category: str, brand: str | None = None,
+                        per_category: int = 3) -> List[Dict]:
+        """
+        Suggest add-ons from the complementary categories of ``category``.
+        Same-brand items (ecosystem matches) rank first, then name similarity,
+        with a small bonus for accessories priced well below the product.
+        Items with no name similarity at all are never suggested.
+        """
+        targets = ACCESSORY_CATEGORIES.get(category, [])
+        if self.matrix is None or not targets:
+            return []
+        scores = self._query_scores(product_name)
+        q_brand = (brand or "").strip().lower()
+        if not q_brand:
+            q_lower = (product_name or "").lower()
+            q_brand = next((b for b in q_lower.split() if b in self.brand_set), "")
+        brand_bonus = (self.brands == q_brand).astype(np.float64) * 0.5 if q_brand else 0.0
+
+        price_bonus = 0.0
+        pos = self.position.get((product_name or "").strip().lower())
+        product_price = self.prices[pos] if pos is not None else np.nan
+        if not np.isnan(product_price):
+            price_bonus = np.where(self.prices <= product_price * 0.5, 0.05, 0.0)
+
+        composite = scores + brand_bonus + price_bonus
+        results: List[Dict] = []
+        for target in targets:
+            # Same relevance floor as similar(): the bonuses only rank items that share some text
+            mask = self._category_mask([target], None) & (scores > 0)
+            for i in self._top(composite, mask, per_category):
+                results.append(self._result(i, scores[i], composite[i]))
+        return results
+
+
+def _load_catalog(path: str) -> List[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def _catalog_signature(base_dir: str) -> Tuple:
+    if base_dir == BASE_DIR:
+        return tuple((slug, cat.version) for slug, cat in CATEGORIES.items())
+    sig = []
+    for cat, filename in CATEGORY_FILES.items():
+        path = os.path.join(base_dir, filename)
+        try:
+            sig.append((cat, os.path.getmtime(path)))
+        except OSError:
+            sig.append((cat, None))
+    return tuple(sig)
+
+
+_index_cache: Dict[str, Tuple[Tuple, CatalogIndex]] = {}
+
+
+def get_catalog_index(base_dir: str = BASE_DIR) -> CatalogIndex:
+    """Return the shared index, rebuilding it only when a catalog file changed on disk."""
+    signature = _catalog_signature(base_dir)
+    cached = _index_cache.get(base_dir)
+    if cached and cached[0] == signature:
+        return cached[1]
+    if base_dir == BASE_DIR:
+        # Share the registry's warm catalogs instead of reading the files again
+        catalogs = {slug: cat.products() for slug, cat in CATEGORIES.items()}
+    else:
+        catalogs = {cat: _load_catalog(os.path.join(base_dir, filename)) for cat, filename in CATEGORY_FILES.items()}
+    with span("build_catalog_index"):
+        index = CatalogIndex(catalogs)
+    _index_cache[base_dir] = (signature, index)
+    return index
+
+
+if __name__ == "__main__":
+    index = get_catalog_index()
+    print(f"Indexed {len(index)} products across {len(index.categories)} categories")
+    query = "Samsung Galaxy S24 Ultra"
+    print(f"\nSimilar to '{query}' in other categories:")
+    for r in index.similar(query, exclude_categories=["phones"], top_n=5):
+        print(f"  [{r['category']}] {r['name'][:60]} - {r['price']} ({r['similarity_score']})")
+    print(f"\nAccessories for '{query}':")
+    for r in index.accessories_for(query, "phones", brand="Samsung"):
+        print(f"  [{r['category']}] {r['name'][:60]} - {r['price']} ({r['composite_score']})")
@@ -0,0 +1,37 @@
+from typing import List, Dict
+
+from dedup import dedupe_listings
+from spec_table import add_spec_columns
+
+
+def ingest_products(products: List[Dict], category: str) -> List[Dict]:
+    """
+    Run freshly scraped products through the catalog ingest pipeline before
+    they are saved. Stages:
+    - dedup: collapse near-duplicate listings from different sellers of the
+      same retailer into the cheapest canonical offer (see
+      ``dedup.dedupe_listings``); offers from other retailers are kept for
+      ``product_matcher.ProductMatchIndex``
+    - specs: parse each name once into typed spec columns stored under
+      ``specs`` (see ``spec_table.add_spec_columns``)
+    """
+    if not products:
+        return []
+    products = dedupe_listings(products)
+    return add_spec_columns(products, category)
+
+
+if __name__ == "__main__":
+    from product_matcher import ProductMatchIndex
+
+    # Regression: listings of one model at two retailers must survive ingest and be matched
+    scraped = [
+        {"name": "Samsung Galaxy A15 8GB 256GB", "price": "Rs. 52,999", "url": "d1", "brand": "Samsung", "source": "Daraz"},
+        {"name": "Samsung Galaxy A15 8GB 256GB Blue", "price": "Rs. 51,500", "url": "l1", "brand": "Samsung", "source": "Life Mobile"},
+        {"name": "Samsung Galaxy A15 8GB 256GB", "price": "Rs. 53,499", "url": "d2", "brand": "Samsung", "source": "Daraz"},
+    ]
+    ingested = ingest_products(scraped, "phones")
+    assert len(ingested) == 2, [p["url"] for p in ingested]
+    matches = ProductMatchIndex(ingested).multi_source()
+    assert len(matches) == 1 and matches[0]["sources"] == ["Daraz", "Life Mobile"], matches
+    print(f"{len(scraped)} listings -> {len(ingested)} after ingest -> {len(matches)} cross-retailer match")
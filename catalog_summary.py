@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Tuple
+
+from price_tracker import parse_price
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUMMARY_PATH = os.environ.get("CATALOG_SUMMARY_PATH", os.path.join(BASE_DIR, "catalog_summary.json"))
+
+_lock = threading.Lock()
+_summaries: Dict[str, Dict] | None = None
+
+
+def summarize_products(products: List[Dict]) -> Dict:
+    """
+    Dashboard aggregates for one catalog in a single pass, counted the
+    same way as ``price_tracker.check_prices`` (listings without a name
+    or price are skipped; a missing threshold defaults to Rs. 400000)
+    but without its per-product logging.
+    """
+    below = 0
+    brand_counts: Dict[str, int] = {}
+    for p in products or []:
+        b = p.get("brand") or "Unknown"
+        brand_counts[b] = brand_counts.get(b, 0) + 1
+        if p.get("name", "Unknown Product") == "No Name" or p.get("price", "No Price") == "No Price":
+            continue
+        price = parse_price(p.get("price"))
+        threshold = parse_price(p.get("threshold", "Rs. 400000"))
+        if price and threshold and price < threshold:
+            below += 1
+    return {
+        "total_products": len(products or []),
+        "below_count": below,
+        "last_brand": products[0].get("brand") if products else None,
+        "brand_counts": brand_counts,
+    }
+
+
+def _load() -> Dict[str, Dict]:
+    global _summaries
+    if _summaries is None:
+        try:
+            with open(SUMMARY_PATH, "r", encoding="utf-8") as f:
+                _summaries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            _summaries = {}
+    return _summaries
+
+
+def update_summary(category: str, products: List[Dict], version: Tuple | None) -> Dict:
+    """
+    Record the summary of a catalog that was just written. Only this
+    category's entry is recomputed, from the products already in memory;
+    the other categories' entries are kept as they are.
+    """
+    entry = {**summarize_products(products), "version": list(version) if version else None, "updated": time.time()}
+    with _lock:
+        summaries = _load()
+        summaries[category] = entry
+        tmp = f"{SUMMARY_PATH}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(summaries, f, ensure_ascii=False)
+            os.replace(tmp, SUMMARY_PATH)
+        except OSError as e:
+            print(f"Could not save catalog summary: {e}")
+    return entry
+
+
+def get_summary(category) -> Dict:
+    """
+    The stored summary for a ``categories.Category``. The catalog itself
+    is read only when the summary is missing or older than the file on
+    disk (e.g. the catalog was written by the scraper CLI).
+    """
+    global _summaries
+    version = category.version
+    wanted = list(version) if version else None
+    entry = _load().get(category.slug)
+    if not entry or entry.get("version") != wanted:
+        # Another worker may have written a newer summary since we loaded the file
+        with _lock:
+            _summaries = None
+        entry = _load().get(category.slug)
+    if entry and entry.get("version") == wanted:
+        return entry
+    return update_summary(category.slug, category.products(), version)
+
+
+if __name__ == "__main__":
+    from categories import CATEGORIES
+
+    for cat in CATEGORIES.values():
+        start = time.perf_counter()
+        s = get_summary(cat)
+        print(f"{cat.slug:>12}: {s['total_products']:4d} products, {s['below_count']:4d} below threshold, "
+              f"{len(s['brand_counts'])} brands ({(time.perf_counter() - start) * 1e6:.0f} µs)")
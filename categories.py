@@ -0,0 +1,209 @@
+import os
+import json
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from metrics import span, timed
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CATEGORY = "phones"
+
+CATEGORY_ALIASES = {
+    "smartwatch": "smartwatches",
+    "smart-watch": "smartwatches",
+    "smart watch": "smartwatches",
+    "smart-watches": "smartwatches",
+    "watch": "smartwatches",
+    "watches": "smartwatches",
+    "camera": "cameras",
+    "headphone": "headphones",
+    "laptop": "laptops",
+    "phone": "phones",
+    "speaker": "speakers",
+    "bluetooth speaker": "speakers",
+    "bluetooth speakers": "speakers",
+}
+
+
+class Category:
+    """
+    Everything the app needs to serve one product category: its catalog
+    file, scraper, brand list and form defaults, plus warm resources
+    derived from the catalog.
+
+    The catalog is loaded once and reloaded only when the file changes on
+    disk. Derived resources (below-threshold list, match index, ...) are
+    built on first use through ``cached`` and kept until the catalog
+    changes. Products are shared between requests, so callers must treat
+    them as read-only and copy before annotating.
+    """
+
+    def __init__(self, slug: str, filename: str, brands: List[str], default_brand: str,
+                 default_threshold: str, scraper: str, max_items: int | None, scrape_message: str):
+        self.slug = slug
+        self.filename = filename
+        self.path = os.path.join(BASE_DIR, filename)
+        self.brands = brands
+        self.default_brand = default_brand
+        self.default_threshold = default_threshold
+        self.scraper = scraper
+        self.max_items = max_items
+        self.scrape_message = scrape_message
+        self._lock = threading.Lock()
+        self._version: Tuple | None = None
+        self._products: List[Dict] = []
+        self._derived: Dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"Category({self.slug!r})"
+
+    def _disk_version(self) -> Tuple | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self) -> None:
+        version = self._disk_version()
+        if version == self._version and self._version is not None:
+            return
+        with self._lock:
+            if version == self._version and self._version is not None:
+                return
+            products: List[Dict] = []
+            if version is not None:
+                try:
+                    with span("load_catalog"), open(self.path, "r", encoding="utf-8") as f:
+                        products = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Error loading {self.filename}: {e}")
+            self._products = products if isinstance(products, list) else []
+            self._derived = {}
+            self._version = version
+
+    @property
+    def version(self) -> Tuple | None:
+        """(mtime_ns, size) of the catalog file, or None when it does not exist. Does not load the catalog."""
+        return self._disk_version()
+
+    def products(self) -> List[Dict]:
+        self._refresh()
+        return self._products
+
+    def cached(self, name: str, build: Callable[[List[Dict]], Any]) -> Any:
+        """A resource built from the catalog, rebuilt only when the catalog changes."""
+        self._refresh()
+        derived, products = self._derived, self._products
+        if name not in derived:
+            # Built outside the lock; a concurrent duplicate build is harmless
+            with span(f"build_{name}"):
+                derived[name] = build(products)
+        return derived[name]
+
+    def below_threshold(self) -> List[Dict]:
+        from recommendation_agent import filter_below_threshold_products
+        return self.cached("below_threshold", filter_below_threshold_products)
+
+    def match_index(self):
+        from product_matcher import ProductMatchIndex
+        return self.cached("match_index", lambda products: ProductMatchIndex(products, self.slug))
+
+    @timed("scrape")
+    def scrape(self, brand: str, threshold: str) -> List[Dict]:
+        import scrape_daraz
+        scraper = getattr(scrape_daraz, self.scraper)
+        if self.max_items is None:
+            return scraper(brand, threshold)
+        return scraper(brand, threshold, max_items=self.max_items)
+
+    def save(self, products: List[Dict]) -> None:
+        from scrape_daraz import save_products_to_json
+        from catalog_summary import update_summary
+        save_products_to_json(products, self.path)
+        # Reload on next access even if the mtime did not move (coarse filesystem clocks)
+        self._version = None
+        update_summary(self.slug, products, self._disk_version())
+
+
+CATEGORIES: Dict[str, Category] = {
+    "phones": Category(
+        "phones", "daraz_products.json",
+        ["Samsung", "Xiaomi", "Apple", "Google", "Nokia", "Vivo", "Redmi", "Huawei"],
+        default_brand="Samsung", default_threshold="Rs. 400000",
+        scraper="scrape_daraz_products", max_items=None,
+        scrape_message="Scraped {count} products for {brand} across multiple sites.",
+    ),
+    "laptops": Category(
+        "laptops", "daraz_laptops.json",
+        ["Dell", "ASUS", "HP", "Lenovo", "Apple", "Acer", "MSI"],
+        default_brand="Dell", default_threshold="Rs. 400000",
+        scraper="scrape_daraz_laptops", max_items=40,
+        scrape_message="Scraped {count} laptops.",
+    ),
+    "headphones": Category(
+        "headphones", "daraz_headphones.json",
+        ["Sony", "Bose", "Sennheiser", "JBL", "Audio-Technica", "Beats", "Skullcandy",
+         "Jabra", "Philips", "Logitech", "Razer", "HyperX", "SteelSeries", "Corsair"],
+        default_brand="Sony", default_threshold="Rs. 50000",
+        scraper="scrape_daraz_headphones", max_items=40,
+        scrape_message="Scraped {count} headphones.",
+    ),
+    "cameras": Category(
+        "cameras", "daraz_cameras.json",
+        ["Canon", "Nikon", "Sony", "Fujifilm", "Panasonic", "Olympus", "GoPro", "DJI", "Pentax"],
+        default_brand="Canon", default_threshold="Rs. 400000",
+        scraper="scrape_daraz_cameras", max_items=40,
+        scrape_message="Scraped {count} cameras.",
+    ),
+    "smartwatches": Category(
+        "smartwatches", "daraz_smartwatches.json",
+        ["Apple", "Samsung", "Huawei", "Xiaomi", "Amazfit", "Garmin", "Fitbit", "Realme", "OnePlus", "OPPO"],
+        default_brand="Apple", default_threshold="Rs. 400000",
+        scraper="scrape_daraz_smartwatches", max_items=40,
+        scrape_message="Scraped {count} smartwatches.",
+    ),
+    "speakers": Category(
+        "speakers", "daraz_speakers.json",
+        ["JBL", "Sony", "Bose", "Anker", "Marshall", "UE", "boAt", "Xiaomi", "Huawei", "Samsung", "Philips", "Logitech"],
+        default_brand="JBL", default_threshold="Rs. 400000",
+        scraper="scrape_daraz_speakers", max_items=40,
+        scrape_message="Scraped {count} speakers.",
+    ),
+}
+
+
+def normalize_category(raw: str | None) -> str:
+    cat = (raw or DEFAULT_CATEGORY).strip().lower()
+    if cat in CATEGORIES:
+        return cat
+    if cat in CATEGORY_ALIASES:
+        return CATEGORY_ALIASES[cat]
+    # Heuristic contains checks
+    if "smart" in cat and "watch" in cat:
+        return "smartwatches"
+    for needle, slug in (("camera", "cameras"), ("headphone", "headphones"), ("speaker", "speakers"),
+                         ("laptop", "laptops"), ("phone", "phones")):
+        if needle in cat:
+            return slug
+    return cat
+
+
+def get_category(raw: str | None) -> Category:
+    """Resolve a raw category name or alias; unknown categories fall back to phones."""
+    return CATEGORIES.get(normalize_category(raw)) or CATEGORIES[DEFAULT_CATEGORY]
+
+
+if __name__ == "__main__":
+    import time
+
+    for cat in CATEGORIES.values():
+        start = time.perf_counter()
+        cold = len(cat.products())
+        cold_s = time.perf_counter() - start
+        start = time.perf_counter()
+        cat.products()
+        warm_s = time.perf_counter() - start
+        print(f"{cat.slug:>12}: {cold:4d} products, cold {cold_s * 1000:6.2f} ms, warm {warm_s * 1e6:6.1f} µs")
@@ -0,0 +1,124 @@
+from typing import List, Dict
+
+import numpy as np
+
+from recommendation_agent import parse_price
+from spec_table import SPECS, spec_matrix
+
+
+# Points a priority feature is worth versus any other feature
+PRIORITY_WEIGHT = 2.0
+
+# How a feature win is phrased in the reason ("Best overall due to lowest price, more RAM.")
+REASON_PHRASES = {
+    "price": "lowest price",
+    "ram": "more RAM",
+    "storage": "more storage",
+    "camera": "higher MP camera",
+    "megapixels": "more megapixels",
+    "battery": "bigger battery",
+    "display": "larger display",
+    "refresh_rate": "higher refresh rate",
+    "driver": "larger driver",
+    "frequency": "better frequency response",
+    "impedance": "higher impedance",
+    "noise_cancellation": "noise cancellation",
+    "zoom": "longer optical zoom",
+    "video": "higher video resolution",
+    "lens": "longer lens reach",
+    "full_frame": "full-frame sensor",
+    "water_resistance": "better water resistance",
+    "gps": "built-in GPS",
+    "calling": "Bluetooth calling",
+    "heart_rate": "heart-rate tracking",
+    "power": "more output power",
+    "bluetooth": "newer Bluetooth",
+}
+
+_FLAG_KEYS = {"wireless", "noise_cancellation", "full_frame", "gps", "calling", "heart_rate"}
+
+
+def score_products(products: List[Dict], category: str = "phones", priorities: List[str] | None = None) -> Dict:
+    """
+    Deterministic points scheme over the product x spec matrix:
+    one point (PRIORITY_WEIGHT for priority features) to the single product
+    with the strictly lowest price and to the single product with the
+    strictly best value of each ranked spec. Ties and missing values score
+    nothing. The winner has the most points; ties go to the lower price,
+    then to list order.
+
+    Returns the winner index, points per product, the winning index per
+    feature key (None when tied/unknown) and a feature-based reason.
+    """
+    n = len(products)
+    if n == 0:
+        return {"winner": None, "points": [], "feature_winners": {}, "reason": ""}
+    category = category if category in SPECS else "phones"
+    priorities = {p.strip().lower() for p in priorities or [] if p.strip()}
+
+    spec_values, spec_list = spec_matrix(products, category)
+    ranked = [j for j, s in enumerate(spec_list) if s.better]
+    specs = [spec_list[j] for j in ranked]
+    prices = np.array([parse_price(p.get("price")) or np.nan for p in products], dtype=float)
+
+    # Orient every column so that larger is better: price negated, flags unknown -> 0
+    columns = [-prices]
+    for j, spec in zip(ranked, specs):
+        col = spec_values[:, j]
+        if spec.key in _FLAG_KEYS:
+            col = np.nan_to_num(col, nan=0.0)
+        columns.append(col if spec.better == "high" else -col)
+    matrix = np.column_stack(columns)
+    keys = ["price"] + [s.key for s in specs]
+    weights = np.array([PRIORITY_WEIGHT if k in priorities else 1.0 for k in keys])
+
+    known = ~np.isnan(matrix)
+    filled = np.where(known, matrix, -np.inf)
+    best = filled.max(axis=0)
+    is_best = known & (filled == best)
+    # A feature only scores when at least two products have it and exactly one is best
+    scoring = (known.sum(axis=0) >= 2) & (is_best.sum(axis=0) == 1)
+    wins = is_best & scoring
+    points = wins.astype(float) @ weights
+
+    tie_price = np.nan_to_num(prices, nan=np.inf)
+    winner = int(np.lexsort((np.arange(n), tie_price, -points))[0])
+
+    feature_winners = {k: (int(np.argmax(wins[:, j])) if scoring[j] else None) for j, k in enumerate(keys)}
+    won = [k for j, k in enumerate(keys) if wins[winner, j]]
+    # Priority features first in the reason
+    won.sort(key=lambda k: k not in priorities)
+    phrases = [REASON_PHRASES.get(k, f"better {k.replace('_', ' ')}") for k in won]
+    won_priorities = sorted(k for k in won if k in priorities)
+    if phrases:
+        # Only claim a priority the winner actually won
+        lead = f"Best for {', '.join(won_priorities)}" if won_priorities else "Best overall"
+        reason = f"{lead} due to {', '.join(phrases)}."
+    elif priorities:
+        reason = f"Best matches priorities: {', '.join(sorted(priorities))}"
+    else:
+        reason = "Best balance of features and price."
+    return {
+        "winner": winner,
+        "points": points.tolist(),
+        "feature_winners": feature_winners,
+        "reason": reason,
+    }
+
+
+if __name__ == "__main__":
+    import timeit
+
+    sample = [
+        {"name": "Samsung Galaxy A15 8GB 128GB 5000mAh 50MP", "price": "Rs. 52,999"},
+        {"name": "Redmi Note 13 8GB 256GB 5000mAh 108MP", "price": "Rs. 61,500"},
+        {"name": "Realme C67 6GB 128GB 5000mAh 108MP", "price": "Rs. 47,999"},
+    ]
+    result = score_products(sample, "phones", ["camera"])
+    print(sample[result["winner"]]["name"], result["points"], result["reason"])
+    print(result["feature_winners"])
+    # Camera is a tie, so the reason must not claim it
+    assert result["reason"] == "Best overall due to lowest price.", result["reason"]
+    assert score_products(sample, "phones", ["storage"])["reason"].startswith("Best for storage due to more storage")
+    per_call = timeit.timeit(lambda: score_products(sample, "phones", ["camera"]), number=2000) / 2000
+    print(f"{per_call * 1e6:.0f} µs per comparison")
@@ -0,0 +1,209 @@
+import os
+import json
+import math
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import List, Dict, Tuple
+
+from price_tracker import parse_price
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within one process
+    fcntl = None
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(BASE_DIR, "price_history.json")
+
+# Number of past observations averaged into the rolling baseline
+BASELINE_WINDOW = 7
+# Observations kept per product in the history file
+HISTORY_LIMIT = 60
+
+_history_lock = threading.Lock()
+
+# Composite score weights
+WEIGHT_DISCOUNT = 1.0
+WEIGHT_BASELINE_DROP = 1.0
+WEIGHT_SAVINGS = 0.05
+
+
+# -------------------------------
+# Price history
+# -------------------------------
+def load_price_history(path: str = HISTORY_PATH) -> Dict[str, List[List]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def record_price_history(products: List[Dict], path: str = HISTORY_PATH) -> None:
+    """
+    Append the current price of every product to its history (keyed by URL).
+
+    The file is re-read and rewritten under a thread lock plus an fcntl lock
+    on ``<path>.lock``, so concurrent scrapes in several workers do not lose
+    each other's observations, and it is replaced atomically, so readers
+    never see a partly written file.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    with _history_lock:
+        lock_file = None
+        if fcntl is not None:
+            lock_file = open(f"{path}.lock", "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            history = load_price_history(path)
+            for p in products or []:
+                url = p.get("url")
+                price = parse_price(p.get("price"))
+                if not url or url == "#" or price is None:
+                    continue
+                series = history.setdefault(url, [])
+                series.append([now, price])
+                del series[:-HISTORY_LIMIT]
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(history, f)
+            os.replace(tmp, path)
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+
+
+def rolling_baseline(series: List[List] | None, window: int = BASELINE_WINDOW) -> float | None:
+    """Mean of the observations before the latest one, over the last ``window`` entries."""
+    if not series or len(series) < 2:
+        return None
+    past = [price for _, price in series[-(window + 1):-1]]
+    return sum(past) / len(past) if past else None
+
+
+# -------------------------------
+# Deal scoring
+# -------------------------------
+def score_deal(product: Dict, history: Dict[str, List[List]] | None = None) -> Dict | None:
+    """
+    Score one product as a deal, or return None when it is not one.
+
+    Components: absolute savings, the larger percentage discount versus the
+    threshold or the original price, and the drop versus the rolling baseline
+    of its price history when available.
+    """
+    price = parse_price(product.get("price"))
+    if price is None:
+        return None
+    threshold = parse_price(product.get("threshold"))
+    original = parse_price(product.get("original_price"))
+
+    savings = 0
+    pct_vs_threshold = 0.0
+    if threshold and price < threshold:
+        savings = threshold - price
+        pct_vs_threshold = savings / threshold
+    pct_vs_original = 0.0
+    if original and price < original:
+        savings = max(savings, original - price)
+        pct_vs_original = (original - price) / original
+    drop_vs_baseline = 0.0
+    baseline = rolling_baseline((history or {}).get(product.get("url", "")))
+    if baseline and price < baseline:
+        drop_vs_baseline = (baseline - price) / baseline
+
+    if savings <= 0 and drop_vs_baseline <= 0:
+        return None
+
+    discount = max(pct_vs_threshold, pct_vs_original)
+    score = (WEIGHT_DISCOUNT * discount
+             + WEIGHT_BASELINE_DROP * drop_vs_baseline
+             + WEIGHT_SAVINGS * math.log10(1 + savings))
+    return {
+        "name": product.get("name", "Unknown Product"),
+        "price": product.get("price", ""),
+        "threshold": product.get("threshold", ""),
+        "url": product.get("url", "#"),
+        "brand": product.get("brand") or "Unknown",
+        "source": product.get("source") or "Daraz",
+        "savings": savings,
+        "discount_pct": round(discount * 100, 1),
+        "baseline_drop_pct": round(drop_vs_baseline * 100, 1),
+        "score": round(score, 4),
+    }
+
+
+class DealRanker:
+    """
+    Streaming top-k deal ranking.
+
+    Every scored deal is pushed into bounded min-heaps (overall, per category
+    and per brand), so ranking n products costs O(n log k) and "top k deals"
+    for any of those slices is read straight from its heap.
+    """
+
+    def __init__(self, k: int = 20, history: Dict[str, List[List]] | None = None):
+        self.k = k
+        self.history = history or {}
+        self._seq = itertools.count()
+        self._overall: List[Tuple] = []
+        self._by_category: Dict[str, List[Tuple]] = {}
+        self._by_brand: Dict[str, List[Tuple]] = {}
+        self.count = 0
+
+    def _push(self, heap: List[Tuple], entry: Tuple) -> None:
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def add(self, product: Dict, category: str | None = None) -> Dict | None:
+        deal = score_deal(product, self.history)
+        if deal is None:
+            return None
+        if category:
+            deal["category"] = category
+        self.count += 1
+        # Ties favour the earlier product: higher (score, -seq) wins
+        entry = (deal["score"], -next(self._seq), deal)
+        self._push(self._overall, entry)
+        if category:
+            self._push(self._by_category.setdefault(category, []), entry)
+        self._push(self._by_brand.setdefault(deal["brand"].lower(), []), entry)
+        return deal
+
+    def add_all(self, products: List[Dict], category: str | None = None) -> "DealRanker":
+        for p in products or []:
+            self.add(p, category)
+        return self
+
+    def top(self, n: int | None = None, category: str | None = None, brand: str | None = None) -> List[Dict]:
+        if brand:
+            heap = self._by_brand.get(brand.lower(), [])
+        elif category:
+            heap = self._by_category.get(category, [])
+        else:
+            heap = self._overall
+        ranked = sorted(heap, key=lambda e: e[:2], reverse=True)
+        return [e[2] for e in ranked[:n or self.k]]
+
+    def brands(self) -> List[str]:
+        return sorted(self._by_brand.keys())
+
+
+def top_deals(products: List[Dict], k: int = 20, category: str | None = None,
+              history: Dict[str, List[List]] | None = None) -> List[Dict]:
+    """Convenience wrapper: best ``k`` deals of one catalog."""
+    return DealRanker(k, history).add_all(products, category).top()
+
+
+if __name__ == "__main__":
+    with open(os.path.join(BASE_DIR, "daraz_products.json"), "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    ranker = DealRanker(k=10, history=load_price_history()).add_all(catalog, "phones")
+    print(f"{ranker.count} deals found, top {ranker.k}:")
+    for i, d in enumerate(ranker.top(), 1):
+        print(f"{i:2d}. {d['name'][:55]:55} {d['price']:>12}  -{d['discount_pct']}%  score {d['score']}")
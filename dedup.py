@@ -0,0 +1,200 @@
+import re
+import hashlib
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from recommendation_agent import parse_price
+
+
+# MinHash / LSH parameters: 16 bands x 4 rows puts the LSH S-curve knee near
+# Jaccard 0.5, so pairs above the verification threshold are almost never missed.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+_CHUNK_ITEMS = 1000
+
+_rng = np.random.RandomState(1)
+# Hash family (a * x + b) mod 2**32 with odd a, applied to pre-mixed shingle codes;
+# 32-bit wrapping arithmetic keeps the per-chunk hash matrix small and fast.
+_PERM_A = (_rng.randint(0, 1 << 31, size=(NUM_PERM, 1)).astype(np.uint32) << np.uint32(1)) | np.uint32(1)
+_PERM_B = _rng.randint(0, 1 << 31, size=(NUM_PERM, 1)).astype(np.uint32)
+_BAND_MIX = _rng.randint(1, 1 << 31, size=ROWS).astype(np.uint64)
+_EMPTY_SIG = np.uint32(0xFFFFFFFF)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGIT_TOKEN = re.compile(r"[a-z]*\d+[a-z0-9]*")
+
+
+def normalize_name(name: str) -> str:
+    return _NON_ALNUM.sub(" ", (name or "").lower()).strip()
+
+
+def _shingle_codes(norms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack every 4-character shingle of the (ASCII-only) normalized names into a
+    uint32 code, vectorized over the whole batch. Returns the flat codes and
+    the number of shingles per name.
+    """
+    encoded = [n.encode("ascii").ljust(SHINGLE_SIZE) if n else b"" for n in norms]
+    lengths = np.array([len(e) for e in encoded], dtype=np.int64)
+    counts = np.where(lengths > 0, lengths - SHINGLE_SIZE + 1, 0)
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    gram_offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = np.arange(int(counts.sum())) + np.repeat(starts - gram_offsets, counts)
+    codes = np.zeros(positions.size, dtype=np.uint32)
+    for k in range(SHINGLE_SIZE):
+        codes = (codes << np.uint32(8)) | buf[positions + k]
+    # Avalanche the packed bytes so neighbouring shingles spread over the hash space
+    codes ^= codes >> np.uint32(16)
+    codes *= np.uint32(0x45D9F3B)
+    codes ^= codes >> np.uint32(16)
+    return codes, counts
+
+
+def minhash_signatures(norms: List[str]) -> np.ndarray:
+    """
+    MinHash signature matrix (items x NUM_PERM) over character shingles of
+    normalized names, computed in fixed-size chunks of items.
+    """
+    sigs = np.full((len(norms), NUM_PERM), _EMPTY_SIG, dtype=np.uint32)
+    for start in range(0, len(norms), _CHUNK_ITEMS):
+        codes, counts = _shingle_codes(norms[start:start + _CHUNK_ITEMS])
+        non_empty = np.flatnonzero(counts)
+        if non_empty.size == 0:
+            continue
+        offsets = np.concatenate(([0], np.cumsum(counts[non_empty])[:-1]))
+        hashed = _PERM_A * codes[None, :]
+        hashed += _PERM_B
+        sigs[start + non_empty] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return sigs
+
+
+def _digit_tokens(norm: str) -> set:
+    return set(_DIGIT_TOKEN.findall(norm))
+
+
+def _compatible(tokens_a: set, tokens_b: set) -> bool:
+    # "a15" vs "a25" or "128gb" vs "256gb" are different devices even when the titles overlap
+    return tokens_a <= tokens_b or tokens_b <= tokens_a
+
+
+def find_duplicate_groups(products: List[Dict], threshold: float = 0.7) -> List[int]:
+    """
+    Label each product with a group number; near-identical listings share a label.
+
+    Candidates come from LSH band buckets and are confirmed by the estimated
+    Jaccard similarity of their signatures plus agreement on model/size tokens,
+    so the work stays roughly linear in the number of listings. Tokens are
+    checked against everything already in both groups, so "256GB" ~ "" ~
+    "512GB" cannot chain two storage variants into one group.
+
+    Only listings from the same ``source`` are grouped: the same model at two
+    retailers is two offers, which ``product_matcher.ProductMatchIndex`` links.
+    """
+    n = len(products)
+    if n == 0:
+        return []
+    norms = [normalize_name(p.get("name", "")) for p in products]
+    tokens = [_digit_tokens(s) for s in norms]
+    sigs = minhash_signatures(norms)
+    _, source_ids = np.unique([p.get("source") or "Daraz" for p in products], return_inverse=True)
+
+    parent = list(range(n))
+    # Model/size tokens of every listing in the group, kept on the group's root
+    group_tokens = {i: t for i, t in enumerate(tokens)}
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    valid = np.array([bool(s) for s in norms])
+    for band in range(BANDS):
+        keys = (sigs[:, band * ROWS:(band + 1) * ROWS].astype(np.uint64) * _BAND_MIX).sum(axis=1)
+        # Buckets are per source, so listings from different retailers are never paired
+        order = np.lexsort((keys, source_ids))
+        order = order[valid[order]]
+        sorted_keys = keys[order]
+        sorted_sources = source_ids[order]
+        # Within each bucket, pair every member with the bucket's first item and with
+        # its predecessor; union-find chains the rest. All pairs are scored at once.
+        same_as_prev = np.concatenate(([False], (sorted_keys[1:] == sorted_keys[:-1])
+                                       & (sorted_sources[1:] == sorted_sources[:-1])))
+        members = np.flatnonzero(same_as_prev)
+        if members.size == 0:
+            continue
+        run_start = np.maximum.accumulate(np.where(same_as_prev, 0, np.arange(order.size)))
+        left = np.concatenate((order[run_start[members]], order[members - 1]))
+        right = np.concatenate((order[members], order[members]))
+        close = np.count_nonzero(sigs[left] == sigs[right], axis=1) >= threshold * NUM_PERM
+        for a, b in zip(left[close].tolist(), right[close].tolist()):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b and _compatible(group_tokens[root_a], group_tokens[root_b]):
+                parent[root_b] = root_a
+                group_tokens[root_a] = group_tokens[root_a] | group_tokens.pop(root_b)
+
+    return [find(i) for i in range(n)]
+
+
+def dedupe_listings(products: List[Dict], threshold: float = 0.7) -> List[Dict]:
+    """
+    Collapse near-duplicate listings of the same retailer, keeping the
+    cheapest offer of each group as the canonical product. Every canonical product gets a ``group_id`` and
+    the other listings of its group under ``duplicates``.
+    """
+    labels = find_duplicate_groups(products, threshold)
+    groups: Dict[int, List[int]] = {}
+    for idx, label in enumerate(labels):
+        groups.setdefault(label, []).append(idx)
+
+    def price_key(idx: int) -> Tuple[float, int]:
+        price = parse_price(products[idx].get("price"))
+        return (price if price is not None else float("inf"), idx)
+
+    canonical: List[Tuple[int, Dict]] = []
+    for members in groups.values():
+        best = min(members, key=price_key)
+        # Groups never span sources, so the source keeps ids unique across retailers
+        seed = (products[best].get("source") or "Daraz") + "|" + min(normalize_name(products[i].get("name", "")) for i in members)
+        product = {
+            **products[best],
+            "group_id": hashlib.sha1(seed.encode("utf-8")).hexdigest()[:12],
+            "duplicates": [
+                {"name": products[i].get("name", ""), "price": products[i].get("price", ""), "url": products[i].get("url", "#")}
+                for i in members if i != best
+            ],
+        }
+        canonical.append((best, product))
+
+    # Keep the original listing order of the canonical offers
+    return [p for _, p in sorted(canonical, key=lambda item: item[0])]
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    # Regression: a listing without a storage size must not chain two sizes together
+    chain = [{"name": f"Apple iPhone 15 Pro Max Natural Titanium{size}", "price": "Rs. 400000"}
+             for size in (" 256GB", "", " 512GB")]
+    labels = find_duplicate_groups(chain)
+    assert labels[0] != labels[2], f"256GB and 512GB variants merged: {labels}"
+    assert len(dedupe_listings(chain)) == 2
+    # Regression: the same model at two retailers stays two offers for the cross-source matcher
+    retailers = [{"name": "Samsung Galaxy A15 8GB 256GB", "price": "Rs. 52,999", "source": source}
+                 for source in ("Daraz", "Life Mobile")]
+    assert len({p["group_id"] for p in dedupe_listings(retailers)}) == 2
+
+    with open("daraz_smartwatches.json", "r", encoding="utf-8") as f:
+        items = json.load(f)
+    start = time.perf_counter()
+    deduped = dedupe_listings(items)
+    elapsed = time.perf_counter() - start
+    print(f"{len(items)} listings -> {len(deduped)} canonical products in {elapsed * 1000:.1f} ms")
+    for p in deduped:
+        if p["duplicates"]:
+            print(f"- [{p['group_id']}] {p['name'][:60]} ({p['price']}) + {len(p['duplicates'])} duplicate(s)")
@@ -1,4 +1,3 @@
-import os
 import re
 import json
 from typing import List, Dict, Tuple, Optional
@@ -7,11 +6,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-try:
-    import google.generativeai as genai
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-except Exception:
-    genai = None
+import llm_gateway
+from product_cache import product_details_cache, product_cache_key
+from metrics import timed
 
 try:
     from playwright.sync_api import sync_playwright
@@ -253,13 +250,92 @@ def scrape_product_details(product_url: str, max_retries: int = 3) -> Dict[str,
     return product_details
 
 
-def generate_ai_comparison_analysis(products_details: List[Dict], user_priorities: List[str], category: str) -> Dict[str, any]:
+def get_product_details(product_url: str) -> Dict[str, any]:
     """
-    Generate comprehensive AI analysis using Gemini for product comparison
+    Product page details through the shared product cache: fresh entries are
+    served directly, stale ones are refreshed in the background, and
+    concurrent requests for the same product share one scrape.
     """
-    if not genai or not products_details:
-        return {"summary": "AI analysis unavailable", "recommendations": [], "insights": []}
-    
+    if not product_url:
+        return {}
+    scraped: Dict[str, any] = {}
+
+    def load() -> Dict[str, any]:
+        scraped.update(scrape_product_details(product_url))
+        # A page that yielded no name is a failed scrape; returning {} keeps it out of the cache
+        return scraped if scraped.get("name") else {}
+
+    details = product_details_cache.get_or_load(product_cache_key(product_url), load)
+    # Failed scrapes still return the empty details skeleton the templates expect
+    return dict(details or scraped)
+
+
+# Sections of the structured comparison, in display order
+ANALYSIS_SECTIONS = [
+    ("executive_summary", "EXECUTIVE SUMMARY"),
+    ("detailed_comparison", "DETAILED COMPARISON"),
+    ("strengths_weaknesses", "STRENGTHS & WEAKNESSES"),
+    ("priority_alignment", "USER PRIORITY ALIGNMENT"),
+    ("recommendations", "RECOMMENDATIONS"),
+    ("buying_advice", "BUYING ADVICE"),
+    ("final_verdict", "FINAL VERDICT"),
+]
+
+COMPARISON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **{key: {"type": "string"} for key, _ in ANALYSIS_SECTIONS},
+        "best_option": {"type": "string"},
+        "reason": {"type": "string"},
+        "confidence": {"type": "string"},
+    },
+    "required": [key for key, _ in ANALYSIS_SECTIONS] + ["best_option", "reason", "confidence"],
+}
+
+
+def _heuristic_best_option(products_details: List[Dict], note: str) -> Dict[str, any]:
+    """Prefer higher rated, lower priced products when the AI pick is unavailable."""
+    if not products_details:
+        return {
+            "product_name": "No products available",
+            "explanation": "No products to compare",
+            "confidence": "Low",
+            "full_response": "No products available for comparison"
+        }
+    best_product = max(products_details, key=lambda p: (
+        float(p.get('rating', 0)) * 0.7 +  # 70% weight on rating
+        (1.0 / max(1, float(re.findall(r'[\d,]+', p.get('price', '0'))[0].replace(',', '')) if re.findall(r'[\d,]+', p.get('price', '0')) else 1)) * 0.3  # 30% weight on price (lower is better)
+    ))
+    return {
+        "product_name": best_product.get('name', 'Unknown'),
+        "explanation": f"Selected based on rating ({best_product.get('rating', 0)}/5) and price value. This product offers the best balance of quality and affordability.",
+        "confidence": "Medium",
+        "full_response": note
+    }
+
+
+def _match_product_name(candidate: str, products_details: List[Dict]) -> str | None:
+    names = [p.get('name', '') for p in products_details if p.get('name')]
+    candidate_lower = (candidate or "").strip().lower()
+    for name in names:
+        if name.lower() == candidate_lower:
+            return name
+    for name in names:
+        if candidate_lower and (candidate_lower in name.lower() or name.lower() in candidate_lower):
+            return name
+    return None
+
+
+def generate_structured_comparison(products_details: List[Dict], user_priorities: List[str], category: str) -> Tuple[Dict[str, any], Dict[str, any]]:
+    """
+    One structured Gemini call that fills both the comparison analysis and the
+    best option pick. Returns ``(ai_analysis, best_option)``; the best option
+    falls back to the rating/price heuristic when the AI is unavailable.
+    """
+    if not llm_gateway.available() or not products_details:
+        return ({"summary": "AI analysis unavailable", "recommendations": [], "insights": {}},
+                _heuristic_best_option(products_details, "Heuristic selection used because AI analysis is unavailable"))
+
     # Prepare product data for AI analysis
     product_summaries = []
     for i, product in enumerate(products_details, 1):
@@ -273,19 +349,18 @@ Key Specifications:
 """
         for spec, value in product.get('specifications', {}).items():
             summary += f"- {spec}: {value}\n"
-        
+
         summary += f"\nKey Features:\n"
         for feature in product.get('features', [])[:5]:  # Top 5 features
             summary += f"- {feature}\n"
-        
+
         if product.get('reviews'):
             summary += f"\nRecent Reviews Summary:\n"
             for review in product.get('reviews', [])[:3]:  # Top 3 reviews
                 summary += f"- {review.get('rating', 0)}★: {review.get('text', '')[:100]}...\n"
-        
+
         product_summaries.append(summary)
-    
-    # Create comprehensive prompt for Gemini
+
     prompt = f"""
 You are an expert e-commerce analyst comparing {category} products. Analyze these products comprehensively:
 
@@ -293,203 +368,59 @@ You are an expert e-commerce analyst comparing {category} products. Analyze thes
 
 User Priorities: {', '.join(user_priorities) if user_priorities else 'No specific priorities mentioned'}
 
-Provide a detailed analysis including:
-
-1. EXECUTIVE SUMMARY (2-3 sentences)
-   - Overall market position and value proposition of each product
-
-2. DETAILED COMPARISON
-   - Price analysis (value for money, discounts, price positioning)
-   - Feature comparison (unique features, missing features, feature quality)
-   - Technical specifications comparison
+Respond with a JSON object containing:
+- executive_summary: 2-3 sentences on the market position and value proposition of each product
+- detailed_comparison: price analysis (value for money, discounts), feature comparison and technical specifications comparison
+- strengths_weaknesses: for each product, 3 key strengths and 2 main weaknesses, based on actual specifications and features
+- priority_alignment: how well each product matches the user's stated priorities, with specific examples
+- recommendations: best overall choice, best value for money, best for specific use cases, and any products to avoid and why
+- buying_advice: what to consider before purchasing and alternatives if none are suitable
+- final_verdict: clear winner with a 2-3 sentence justification and the key factors behind the decision
+- best_option: the exact product name of the BEST OVERALL product, copied from the list above
+- reason: 2-3 sentences on why it is the best choice, referencing actual features, prices or specifications
+- confidence: your confidence in the recommendation, one of High, Medium or Low
 
-3. STRENGTHS & WEAKNESSES
-   - For each product, list 3 key strengths and 2 main weaknesses
-   - Base this on actual specifications and features, not assumptions
-
-4. USER PRIORITY ALIGNMENT
-   - How well each product matches the user's stated priorities
-   - Specific examples of how each product serves the priorities
-
-5. RECOMMENDATIONS
-   - Best overall choice with detailed reasoning
-   - Best value for money choice
-   - Best for specific use cases (if applicable)
-   - Any products to avoid and why
-
-6. BUYING ADVICE
-   - What to consider before purchasing
-   - Alternative options if none are suitable
-
-7. FINAL VERDICT
-   - Clear winner with 2-3 sentence justification
-   - Confidence level in recommendation (High/Medium/Low)
-   - Key factors that influenced the decision
-
-Format your response clearly with headers and bullet points for easy reading.
+Use bullet points inside the text fields where helpful. Do not invent specifications that are not listed.
 """
-    
+
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
-        ai_analysis = response.text.strip()
-        
-        # Extract structured insights
-        insights = {
-            "executive_summary": "",
-            "detailed_comparison": "",
-            "strengths_weaknesses": "",
-            "priority_alignment": "",
-            "recommendations": "",
-            "buying_advice": "",
-            "final_verdict": ""
-        }
-        
-        # Parse the response into sections
-        sections = ai_analysis.split('\n')
-        current_section = None
-        
-        for line in sections:
-            line = line.strip()
-            if line.startswith('1.') or 'EXECUTIVE SUMMARY' in line.upper():
-                current_section = 'executive_summary'
-            elif line.startswith('2.') or 'DETAILED COMPARISON' in line.upper():
-                current_section = 'detailed_comparison'
-            elif line.startswith('3.') or 'STRENGTHS' in line.upper():
-                current_section = 'strengths_weaknesses'
-            elif line.startswith('4.') or 'PRIORITY ALIGNMENT' in line.upper():
-                current_section = 'priority_alignment'
-            elif line.startswith('5.') or 'RECOMMENDATIONS' in line.upper():
-                current_section = 'recommendations'
-            elif line.startswith('6.') or 'BUYING ADVICE' in line.upper():
-                current_section = 'buying_advice'
-            elif line.startswith('7.') or 'FINAL VERDICT' in line.upper():
-                current_section = 'final_verdict'
-            
-            if current_section and line:
-                insights[current_section] += line + '\n'
-        
-        return {
-            "full_analysis": ai_analysis,
-            "insights": insights,
-            "confidence": "High" if "high" in ai_analysis.lower() else "Medium" if "medium" in ai_analysis.lower() else "Low"
-        }
-        
+        ai_response = llm_gateway.generate(prompt, generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": COMPARISON_SCHEMA,
+        })
+        data = json.loads(ai_response)
+        if not isinstance(data, dict):
+            raise ValueError("Structured comparison is not a JSON object")
     except Exception as e:
         print(f"AI analysis failed: {str(e)}")
-        return {
-            "summary": f"AI analysis failed: {str(e)}",
-            "recommendations": [],
-            "insights": {}
-        }
-
-
-def generate_best_option_recommendation(products_details: List[Dict], user_priorities: List[str], category: str) -> Dict[str, any]:
-    """
-    Generate a clear best option recommendation with concise explanation using Gemini AI
-    """
-    if not genai or not products_details:
-        return {
-            "product_name": products_details[0].get('name', 'Unknown') if products_details else 'No products',
-            "explanation": "AI analysis unavailable",
-            "confidence": "Low"
-        }
-    
-    # Prepare concise product summary for best option analysis
-    product_summaries = []
-    for i, product in enumerate(products_details, 1):
-        summary = f"""
-Product {i}: {product.get('name', 'Unknown')}
-- Price: {product.get('price', 'N/A')}
-- Key Specs: {', '.join([f"{k}: {v}" for k, v in list(product.get('specifications', {}).items())[:3]])}
-"""
-        product_summaries.append(summary)
-    
-    # Create focused prompt for best option selection
-    prompt = f"""
-You are an expert e-commerce consultant. Based on the following {category} products, select the BEST OPTION and provide a concise explanation.
-
-Products:
-{chr(10).join(product_summaries)}
-
-User Priorities: {', '.join(user_priorities) if user_priorities else 'No specific priorities mentioned'}
-
-Your task:
-1. Select the BEST OVERALL product from the list
-2. Provide a SHORT explanation (2-3 sentences max) explaining why it's the best choice
-3. Consider: price value, specifications, features, and user priorities
+        return ({"summary": f"AI analysis failed: {str(e)}", "recommendations": [], "insights": {}},
+                _heuristic_best_option(products_details, "Heuristic selection used due to AI analysis failure"))
 
-Format your response as:
-BEST OPTION: [Product Name]
-REASON: [2-3 sentence explanation focusing on the key advantages]
-
-Be specific about what makes this product better than the others. Reference actual features, prices, or specifications when possible.
-"""
-    
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
-        ai_response = response.text.strip()
-        
-        # Parse the response to extract best option and reason
-        best_option = "Unknown"
-        explanation = "Analysis unavailable"
+    insights = {key: str(data.get(key) or "").strip() for key, _ in ANALYSIS_SECTIONS}
+    confidence = str(data.get("confidence") or "").strip().capitalize()
+    if confidence not in ("High", "Medium", "Low"):
         confidence = "Medium"
-        
-        lines = ai_response.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('BEST OPTION:') or line.startswith('Best Option:'):
-                best_option = line.split(':', 1)[1].strip() if ':' in line else line
-            elif line.startswith('REASON:') or line.startswith('Reason:'):
-                explanation = line.split(':', 1)[1].strip() if ':' in line else line
-        
-        # If parsing failed, try to extract from the text
-        if best_option == "Unknown":
-            for product in products_details:
-                if product.get('name', '').lower() in ai_response.lower():
-                    best_option = product.get('name', 'Unknown')
-                    break
-        
-        # Determine confidence based on response quality
-        if len(explanation) > 50 and any(word in explanation.lower() for word in ['better', 'best', 'superior', 'advantage', 'excellent']):
-            confidence = "High"
-        elif len(explanation) > 20:
-            confidence = "Medium"
-        else:
-            confidence = "Low"
-        
-        return {
-            "product_name": best_option,
-            "explanation": explanation,
+    full_analysis = "\n\n".join(f"{title}\n{insights[key]}" for key, title in ANALYSIS_SECTIONS if insights[key])
+    ai_analysis = {
+        "full_analysis": full_analysis,
+        "insights": insights,
+        "confidence": confidence,
+    }
+
+    best_name = _match_product_name(str(data.get("best_option") or ""), products_details)
+    if best_name is None:
+        best_option = _heuristic_best_option(products_details, "Heuristic selection used because the AI pick matched no product")
+    else:
+        best_option = {
+            "product_name": best_name,
+            "explanation": str(data.get("reason") or "").strip() or "Analysis unavailable",
             "confidence": confidence,
             "full_response": ai_response
         }
-        
-    except Exception as e:
-        print(f"Best option analysis failed: {str(e)}")
-        # Fallback to heuristic selection
-        if products_details:
-            # Simple heuristic: prefer higher rated, lower priced products
-            best_product = max(products_details, key=lambda p: (
-                float(p.get('rating', 0)) * 0.7 +  # 70% weight on rating
-                (1.0 / max(1, float(re.findall(r'[\d,]+', p.get('price', '0'))[0].replace(',', '')) if re.findall(r'[\d,]+', p.get('price', '0')) else 1)) * 0.3  # 30% weight on price (lower is better)
-            ))
-            return {
-                "product_name": best_product.get('name', 'Unknown'),
-                "explanation": f"Selected based on rating ({best_product.get('rating', 0)}/5) and price value. This product offers the best balance of quality and affordability.",
-                "confidence": "Medium",
-                "full_response": "Heuristic selection used due to AI analysis failure"
-            }
-        else:
-            return {
-                "product_name": "No products available",
-                "explanation": "No products to compare",
-                "confidence": "Low",
-                "full_response": "No products available for comparison"
-            }
+    return ai_analysis, best_option
 
 
+@timed("enhanced_compare")
 def enhanced_compare_products(products: List[Dict], user_priorities: List[str], category: str) -> Dict[str, any]:
     """
     Enhanced product comparison with detailed scraping and AI analysis
@@ -500,15 +431,15 @@ def enhanced_compare_products(products: List[Dict], user_priorities: List[str],
     detailed_products = []
     for i, product in enumerate(products, 1):
         print(f"📊 Scraping details for product {i}/{len(products)}: {product.get('name', 'Unknown')}")
-        detailed_info = scrape_product_details(product.get('url', ''))
+        detailed_info = get_product_details(product.get('url', ''))
         
         # Merge with original product data
         enhanced_product = {**product, **detailed_info}
         detailed_products.append(enhanced_product)
     
-    # Generate AI analysis
+    # Generate AI analysis and best option pick in a single structured call
     print("🤖 Generating AI analysis...")
-    ai_analysis = generate_ai_comparison_analysis(detailed_products, user_priorities, category)
+    ai_analysis, best_option = generate_structured_comparison(detailed_products, user_priorities, category)
     
     # Create comparison matrix
     comparison_matrix = []
@@ -530,9 +461,6 @@ def enhanced_compare_products(products: List[Dict], user_priorities: List[str],
         }
         comparison_matrix.append(row)
     
-    # Generate best option recommendation
-    best_option = generate_best_option_recommendation(detailed_products, user_priorities, category)
-    
     return {
         "products": detailed_products,
         "comparison_matrix": comparison_matrix,
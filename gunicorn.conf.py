@@ -0,0 +1,71 @@
+"""
+Gunicorn settings for production: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment:
+- PORT / BIND: listen address (default 0.0.0.0:$PORT, port 5000)
+- WEB_CONCURRENCY: worker processes (default 2 per CPU + 1)
+- GUNICORN_THREADS: threads per worker (default 16)
+- GUNICORN_TIMEOUT: seconds before a silent worker is restarted (default 120)
+- GUNICORN_MAX_REQUESTS: requests before a worker is recycled (default 0, never)
+- APP_RELEASE: release id baked into ETags; set it to keep client caches valid across restarts
+- METRICS_DIR: where workers write their /metrics snapshots (default: a fresh directory per server)
+"""
+import gc
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Scrapes, review crawls and Gemini calls block for seconds on the network, so each
+# worker serves several requests at once on threads. With gthread the worker's
+# heartbeat runs on the main thread, so a long scrape does not trip the timeout.
+# Threads cap the slow requests a worker runs at once; with 4, a handful of
+# comparisons queued every page view behind them (see load_test.py --mix shop).
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app (and run wsgi.warm_up) once in the master; workers are forked
+# with the catalogs, indexes and compiled templates already in memory. This also
+# gives every worker the same http_cache.BOOT_ID, so ETags match across workers.
+preload_app = True
+
+# Off by default: a recycled worker drops its open keep-alive connections, which
+# clients without retries see as errors. When enabled (e.g. to contain a leak) the
+# replacement is forked from the warm master, so it starts warm too.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files on tmpfs instead of a possibly slow disk
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+# Each worker counts its own requests; they write snapshots here and /metrics adds
+# them up (see metrics.py). Set before the app is imported, so metrics.py sees it.
+os.environ.setdefault("METRICS_DIR", os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                                                  f"gunicorn-metrics-{os.getpid()}"))
+
+
+def on_starting(server):
+    # Start from zero: snapshots of a previous server with the same directory are not ours
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["METRICS_DIR"], exist_ok=True)
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.freeze()
+    server.log.info(f"Preloaded and warm; {gc.get_freeze_count()} objects frozen, starting {workers} workers")
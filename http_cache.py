@@ -0,0 +1,110 @@
+import os
+import gzip
+import time
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Tuple
+
+from flask import request, session, make_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Part of every ETag, so a restart with new templates or code invalidates cached pages
+BOOT_ID = os.environ.get("APP_RELEASE") or str(time.time_ns())
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+COMPRESS_LEVEL = 6
+COMPRESSIBLE_TYPES = {"text/html", "application/json", "text/css", "text/plain", "application/javascript"}
+
+
+def _etag(parts: Tuple) -> str:
+    key = (BOOT_ID, request.path, sorted(request.args.items(multi=True)), session.get("user_id"), parts)
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag: str, last_modified: float | None) -> bool:
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return bool(since and last_modified and int(last_modified) <= since.timestamp())
+
+
+def conditional(validator: Callable[..., Tuple[Tuple, float | None]], max_age: int = 0):
+    """
+    Conditional GET support for a view.
+
+    ``validator`` receives the view's arguments and returns cheaply
+    (version parts, last-modified timestamp) for what the page shows,
+    e.g. the catalog version. The ETag combines those parts with the
+    path, query string and logged-in user. A matching If-None-Match (or
+    an If-Modified-Since not older than the timestamp) answers 304
+    without running the view. Pages with pending flash messages are
+    always rendered and never cached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                response = make_response(f(*args, **kwargs))
+                response.headers["Cache-Control"] = "no-store"
+                return response
+            parts, last_modified = validator(*args, **kwargs)
+            etag = _etag(parts)
+            if _not_modified(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+            # Private: pages depend on the session. With max_age=0 the browser revalidates on every view.
+            response.headers["Cache-Control"] = f"private, max-age={max_age}" if max_age else "private, no-cache"
+            response.vary.add("Cookie")
+            return response
+        return decorated_function
+    return decorator
+
+
+def catalog_version(category) -> Tuple[Tuple, float | None]:
+    """Validator parts for a page that only depends on one category's catalog."""
+    version = category.version
+    return (version,), (version[0] / 1e9 if version else None)
+
+
+def static_page(*args, **kwargs) -> Tuple[Tuple, float | None]:
+    """Validator for pages that only change with a release (and login state, via the ETag)."""
+    return (), None
+
+
+def compress_response(response):
+    """after_request hook: brotli (when installed) or gzip for large text responses."""
+    if (response.direct_passthrough or response.status_code != 200
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        encoding = "br"
+    elif accepted["gzip"]:
+        encoding = "gzip"
+    else:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    if encoding == "br":
+        body = brotli.compress(data, quality=5)
+    else:
+        body = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Any
+from dotenv import load_dotenv
+
+from metrics import timed
+
+# Load environment variables
+load_dotenv()
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(BASE_DIR, ".llm_cache"))
+CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 24 * 3600))
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+DEFAULT_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 30))
+# Set LLM_DISABLED=1 to force the heuristic fallbacks everywhere
+LLM_DISABLED = os.environ.get("LLM_DISABLED", "").lower() in ("1", "true", "yes")
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LLMError(RuntimeError):
+    """Raised when the LLM is unavailable or a call fails."""
+
+
+class LLMTimeout(LLMError):
+    """Raised when a call does not finish within its deadline."""
+
+
+# -------------------------------
+# Gemini client (configured once, on first use)
+# -------------------------------
+_genai = None
+_genai_loaded = False
+_client_lock = threading.Lock()
+
+
+def _client():
+    global _genai, _genai_loaded
+    if not _genai_loaded:
+        with _client_lock:
+            if not _genai_loaded:
+                if not LLM_DISABLED:
+                    try:
+                        import google.generativeai as genai
+                        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                        _genai = genai
+                    except Exception:
+                        _genai = None
+                _genai_loaded = True
+    return _genai
+
+
+def available() -> bool:
+    """True when the Gemini SDK can be used."""
+    return _client() is not None
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Any] = {
+    "calls": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "coalesced": 0,
+    "errors": 0,
+    "timeouts": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "latency_seconds_sum": 0.0,
+    "latency_seconds_count": 0,
+    "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+}
+
+
+def _bump(name: str, amount: int | float = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def _observe_latency(seconds: float) -> None:
+    with _metrics_lock:
+        _metrics["latency_seconds_sum"] += seconds
+        _metrics["latency_seconds_count"] += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                _metrics["latency_buckets"][i] += 1
+                break
+        else:
+            _metrics["latency_buckets"][-1] += 1
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Snapshot of gateway counters, token usage and the latency histogram."""
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+        snapshot["latency_buckets"] = list(_metrics["latency_buckets"])
+    snapshot["latency_bucket_bounds"] = list(LATENCY_BUCKETS)
+    snapshot["in_flight"] = len(_inflight)
+    return snapshot
+
+
+# -------------------------------
+# On-disk response cache
+# -------------------------------
+def cache_key(prompt: str, model: str = DEFAULT_MODEL, generation_config: Dict | None = None) -> str:
+    payload = json.dumps([model, prompt, generation_config or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def _read_cache(key: str, ttl: int) -> str | None:
+    try:
+        with open(_cache_path(key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if time.time() - entry.get("created", 0) > ttl:
+        return None
+    return entry.get("text")
+
+
+def _write_cache(key: str, text: str, usage: Dict[str, int]) -> None:
+    path = _cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "text": text, "usage": usage}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"LLM cache write failed: {e}")
+
+
+# -------------------------------
+# Gateway
+# -------------------------------
+_semaphore = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="llm")
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _invoke(prompt: str, model: str, generation_config: Dict | None, timeout: float) -> Dict[str, Any]:
+    genai = _client()
+    kwargs: Dict[str, Any] = {"request_options": {"timeout": timeout}}
+    if generation_config:
+        kwargs["generation_config"] = generation_config
+    response = genai.GenerativeModel(model).generate_content(prompt, **kwargs)
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "text": response.text.strip(),
+        "usage": {
+            "prompt_tokens": int(getattr(usage, "prompt_token_count", 0) or 0),
+            "completion_tokens": int(getattr(usage, "candidates_token_count", 0) or 0),
+        },
+    }
+
+
+def _call(prompt: str, model: str, generation_config: Dict | None, deadline: float) -> Dict[str, Any]:
+    """One real model call under the global concurrency limit and the caller's deadline."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or not _semaphore.acquire(timeout=remaining):
+        _bump("timeouts")
+        raise LLMTimeout("Timed out waiting for an LLM slot")
+    start = time.monotonic()
+    try:
+        future = _executor.submit(_invoke, prompt, model, generation_config, max(1.0, deadline - start))
+    except Exception:
+        _semaphore.release()
+        raise
+    # The slot is held until the call really finishes, even if the caller gives up first
+    future.add_done_callback(lambda _: _semaphore.release())
+    _bump("calls")
+    try:
+        result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        _bump("timeouts")
+        raise LLMTimeout(f"LLM call exceeded its deadline after {time.monotonic() - start:.1f}s")
+    except Exception as e:
+        _bump("errors")
+        raise LLMError(str(e)) from e
+    finally:
+        _observe_latency(time.monotonic() - start)
+    _bump("prompt_tokens", result["usage"]["prompt_tokens"])
+    _bump("completion_tokens", result["usage"]["completion_tokens"])
+    return result
+
+
+@timed("llm")
+def generate(prompt: str, model: str = DEFAULT_MODEL, generation_config: Dict | None = None,
+             timeout: float | None = None, ttl: int | None = None, use_cache: bool = True) -> str:
+    """
+    Generate text for ``prompt`` through the shared gateway.
+
+    - responses are cached on disk by a hash of (model, prompt, config) for ``ttl`` seconds
+    - identical prompts already in flight are coalesced onto a single call
+    - at most LLM_MAX_CONCURRENCY calls run at once, process-wide
+    - the call fails with LLMTimeout once ``timeout`` seconds have passed
+    """
+    if not available():
+        raise LLMError("Gemini SDK is not available")
+    deadline = time.monotonic() + (timeout if timeout is not None else DEFAULT_TIMEOUT)
+    key = cache_key(prompt, model, generation_config)
+    if use_cache:
+        cached = _read_cache(key, CACHE_TTL if ttl is None else ttl)
+        if cached is not None:
+            _bump("cache_hits")
+            return cached
+        _bump("cache_misses")
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+    if not leader:
+        _bump("coalesced")
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            _bump("timeouts")
+            raise LLMTimeout("Timed out waiting for a coalesced LLM call")
+
+    try:
+        result = _call(prompt, model, generation_config, deadline)
+        if use_cache and result["text"]:
+            _write_cache(key, result["text"], result["usage"])
+        future.set_result(result["text"])
+        return result["text"]
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
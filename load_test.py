@@ -0,0 +1,446 @@
+"""
+Load test for the Flask app with scrapers and Gemini replaced by local stubs.
+
+Starts the app in a scratch directory (its own users.json, LLM cache and
+catalog summary; the product catalogs are read, never written), either
+under gunicorn with gunicorn.conf.py, as in production, or under the
+development server. Each virtual user signs up through /signup, logs in
+through /login and then loops over a weighted mix of pages until the
+duration is up:
+
+- dashboard: GET /dashboard
+- tracker: GET /tracker
+- recommendations: GET /recommendations
+- recommend: POST /recommendations with a product name from the catalog
+- compare: GET /compare
+- compare_post: POST /compare with 2-3 products from the catalog
+
+The stubs answer in place of the network: product pages are built from
+the catalog after --scrape-latency seconds and Gemini returns canned text
+(or JSON for structured calls) after --llm-latency seconds. Everything
+around them runs for real: the product cache, the LLM gateway's disk
+cache, coalescing and concurrency limit, and the price tracker's
+background summary.
+
+The report gives throughput, p50/p95/p99 latency and the error rate per
+route. Budgets turn it into a pre-deploy check: the exit status is
+non-zero when the error rate or a route's p95 exceeds them.
+
+Usage: python load_test.py [--users 16] [--duration 30] [--mix browse]
+                           [--server gunicorn] [--workers 3] [--threads 16] [--p95-budget 500]
+       python load_test.py --mix "dashboard=3,recommend=1,compare_post=1"
+       python load_test.py --url http://staging:8000   (existing server: no stubs, and
+                                                        the load-* users stay there)
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from http.cookies import SimpleCookie
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MIXES = {
+    # Mostly reading dashboards and price lists, an occasional recommendation query
+    "browse": {"dashboard": 4, "tracker": 3, "recommendations": 2, "recommend": 1, "compare": 1},
+    # Shoppers narrowing down a purchase: recommendation queries and comparisons
+    "shop": {"dashboard": 1, "tracker": 1, "recommendations": 1, "recommend": 3, "compare": 1, "compare_post": 2},
+    # Catalog pages only, no agent work
+    "read": {"dashboard": 1, "tracker": 1, "recommendations": 1, "compare": 1},
+}
+
+PASSWORD = "load-test-password"
+
+
+# -------------------------------
+# Stubs (run inside the server under test)
+# -------------------------------
+def install_stubs(scrape_latency: float, llm_latency: float) -> None:
+    """Replace the product page scraper, the catalog scrapers and the Gemini call with local stubs."""
+    sys.path.insert(0, BASE_DIR)
+    import llm_gateway
+    import scrape_daraz
+    import enhanced_compare_agent
+    from categories import CATEGORIES
+
+    by_url = {p.get("url"): p for cat in CATEGORIES.values() for p in cat.products() if p.get("url")}
+
+    def scrape_product_details(product_url: str, max_retries: int = 3) -> Dict:
+        time.sleep(scrape_latency)
+        p = by_url.get(product_url, {})
+        return {
+            "url": product_url,
+            "name": p.get("name", "Stub product"),
+            "price": p.get("price", ""),
+            "original_price": p.get("original_price", ""),
+            "rating": 4.2,
+            "review_count": 37,
+            "specifications": {"Brand": p.get("brand", ""), "Warranty": "1 Year"},
+            "features": ["Stub feature one", "Stub feature two"],
+            "reviews_summary": "",
+            "images": [],
+            "availability": "In stock",
+            "seller": p.get("source", "daraz"),
+            "warranty": "1 Year",
+            "shipping": "Free",
+            "description": "",
+        }
+
+    def scrape_catalog(brand=None, threshold_str="Rs. 400000", max_items=40):
+        time.sleep(scrape_latency)
+        return []
+
+    def invoke(prompt: str, model: str, generation_config: Dict | None, timeout: float) -> Dict:
+        time.sleep(llm_latency)
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            # Structured comparison: pick the first product listed in the prompt
+            first = prompt.split("Product 1: ", 1)[-1].split("\n", 1)[0].strip()
+            data = {key: f"Stub {key.replace('_', ' ')}." for key in generation_config["response_schema"]["required"]}
+            data.update(best_option=first, confidence="Medium")
+            text = json.dumps(data)
+        else:
+            text = "Stub summary: prices look good this week."
+        return {"text": text, "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}}
+
+    enhanced_compare_agent.scrape_product_details = scrape_product_details
+    for cat in CATEGORIES.values():
+        setattr(scrape_daraz, cat.scraper, scrape_catalog)
+    llm_gateway._invoke = invoke
+    # available() is true once a client is loaded; the stub stands in for the SDK
+    llm_gateway._genai, llm_gateway._genai_loaded = object(), True
+
+
+def stubbed_app():
+    """App factory for gunicorn ("load_test:stubbed_app()"): stubs first, then the warmed production app."""
+    install_stubs(float(os.environ.get("LOADTEST_SCRAPE_LATENCY", 0)), float(os.environ.get("LOADTEST_LLM_LATENCY", 0)))
+    import wsgi
+    return wsgi.app
+
+
+def serve_dev(port: int) -> None:
+    install_stubs(float(os.environ.get("LOADTEST_SCRAPE_LATENCY", 0)), float(os.environ.get("LOADTEST_LLM_LATENCY", 0)))
+    from app import app
+    app.run(host="127.0.0.1", port=port, threaded=True)
+
+
+def start_server(args, workdir: str) -> subprocess.Popen:
+    env = dict(os.environ,
+               LLM_CACHE_DIR=os.path.join(workdir, "llm_cache"),
+               CATALOG_SUMMARY_PATH=os.path.join(workdir, "catalog_summary.json"),
+               REVIEW_STORE_DIR=os.path.join(workdir, "review_store"),
+               LOADTEST_SCRAPE_LATENCY=str(args.scrape_latency),
+               LOADTEST_LLM_LATENCY=str(args.llm_latency),
+               PYTHONUNBUFFERED="1")
+    if args.server == "gunicorn":
+        env.update(BIND=f"127.0.0.1:{args.port}", GUNICORN_ACCESS_LOG="/dev/null")
+        # Unless given, workers and threads come from gunicorn.conf.py, as in production
+        if args.workers:
+            env["WEB_CONCURRENCY"] = str(args.workers)
+        if args.threads:
+            env["GUNICORN_THREADS"] = str(args.threads)
+        cmd = [sys.executable, "-m", "gunicorn", "-c", os.path.join(BASE_DIR, "gunicorn.conf.py"),
+               "--pythonpath", BASE_DIR, "load_test:stubbed_app()"]
+    else:
+        cmd = [sys.executable, os.path.abspath(__file__), "--serve", str(args.port)]
+    # The scratch directory is the working directory, so users.json is created there
+    log = open(os.path.join(workdir, "server.log"), "w")
+    return subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_up(host: str, port: int, proc: subprocess.Popen | None, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request("GET", "/pricing")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not answer within {timeout:.0f}s")
+
+
+# -------------------------------
+# Virtual users
+# -------------------------------
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.samples: Dict[str, str] = {}
+
+    def record(self, route: str, seconds: float, error: str | None) -> None:
+        with self._lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            if error:
+                self.errors[route] = self.errors.get(route, 0) + 1
+                self.samples.setdefault(route, error)
+
+
+class User:
+    """One logged-in browser session: a keep-alive connection and the session cookie."""
+
+    def __init__(self, host: str, port: int, stats: Stats):
+        self.host, self.port, self.stats = host, port, stats
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+        self.cookies: Dict[str, str] = {}
+
+    def request(self, route: str, method: str, path: str, form: Dict | None = None,
+                expect: Tuple[int, ...] = (200,)) -> int:
+        headers = {"Accept-Encoding": "gzip"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        start = time.perf_counter()
+        status, error = 0, None
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            status = response.status
+            for header in response.headers.get_all("Set-Cookie") or []:
+                cookie = SimpleCookie(header)
+                self.cookies.update({k: m.value for k, m in cookie.items()})
+            if status not in expect:
+                location = response.headers.get("Location", "")
+                error = f"HTTP {status}" + (f" -> {location}" if location else "")
+        except (OSError, http.client.HTTPException) as e:
+            error = f"{type(e).__name__}: {e}"
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        self.stats.record(route, time.perf_counter() - start, error)
+        return status
+
+    def log_in(self, username: str) -> bool:
+        form = {"username": username, "email": f"{username}@example.com",
+                "password": PASSWORD, "confirm_password": PASSWORD}
+        self.request("POST /signup", "POST", "/signup", form, expect=(302,))
+        # Log in on a new connection, which may land on another worker
+        self.conn.close()
+        return self.request("POST /login", "POST", "/login", {"username": username, "password": PASSWORD},
+                            expect=(302,)) == 302
+
+
+def scenarios(catalogs: Dict[str, List[Dict]]):
+    """Scenario name -> function(user, rng) issuing one request."""
+    slugs = [s for s, products in catalogs.items() if products]
+
+    def pick(rng) -> Tuple[str, List[Dict]]:
+        slug = rng.choice(slugs)
+        return slug, catalogs[slug]
+
+    def dashboard(user, rng):
+        slug, _ = pick(rng)
+        user.request("GET /dashboard", "GET", f"/dashboard?category={slug}")
+
+    def tracker(user, rng):
+        slug, _ = pick(rng)
+        user.request("GET /tracker", "GET", f"/tracker?category={slug}")
+
+    def recommendations(user, rng):
+        slug, _ = pick(rng)
+        user.request("GET /recommendations", "GET", f"/recommendations?category={slug}")
+
+    def recommend(user, rng):
+        slug, products = pick(rng)
+        name = rng.choice(products).get("name", "")
+        user.request("POST /recommendations", "POST", f"/recommendations?category={slug}", {"query": name})
+
+    def compare(user, rng):
+        slug, _ = pick(rng)
+        user.request("GET /compare", "GET", f"/compare?category={slug}")
+
+    def compare_post(user, rng):
+        slug, products = pick(rng)
+        chosen = rng.sample(products, min(len(products), rng.choice((2, 3))))
+        user.request("POST /compare", "POST", f"/compare?category={slug}",
+                     {"selected": [p.get("url", "") for p in chosen], "priorities": "price, battery"})
+
+    return {f.__name__: f for f in (dashboard, tracker, recommendations, recommend, compare, compare_post)}
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    if raw in MIXES:
+        return MIXES[raw]
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_users(host: str, port: int, args, mix: Dict[str, float]) -> Tuple[Stats, float]:
+    sys.path.insert(0, BASE_DIR)
+    from categories import CATEGORIES
+
+    table = scenarios({slug: cat.products() for slug, cat in CATEGORIES.items()})
+    unknown = set(mix) - set(table)
+    if unknown:
+        raise SystemExit(f"unknown scenario(s) {', '.join(sorted(unknown))}; choose from {', '.join(table)}")
+    names, weights = list(mix), list(mix.values())
+    stats = Stats()
+    run_id = f"{int(time.time())}-{os.getpid()}"
+    clock: Dict[str, float] = {}
+
+    def start_clock() -> None:
+        clock["start"] = time.monotonic()
+        clock["stop"] = clock["start"] + args.duration
+
+    # Sign-ups and logins happen before the clock starts
+    start_gate = threading.Barrier(args.users + 1, action=start_clock)
+
+    def virtual_user(i: int) -> None:
+        rng = random.Random(args.seed * 1000 + i)
+        user = User(host, port, stats)
+        logged_in = user.log_in(f"load-{run_id}-{i}")
+        start_gate.wait()
+        if not logged_in:
+            return
+        while time.monotonic() < clock["stop"]:
+            table[rng.choices(names, weights)[0]](user, rng)
+            if args.think:
+                time.sleep(rng.expovariate(1 / args.think))
+
+    threads = [threading.Thread(target=virtual_user, args=(i,), daemon=True) for i in range(args.users)]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    for t in threads:
+        t.join()
+    return stats, time.monotonic() - clock["start"]
+
+
+# -------------------------------
+# Report
+# -------------------------------
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(stats: Stats, elapsed: float) -> Dict[str, Dict]:
+    rows = {}
+    for route, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        setup = route in ("POST /signup", "POST /login")
+        rows[route] = {
+            "requests": len(values),
+            "rps": None if setup else len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "errors": stats.errors.get(route, 0),
+            "error_rate": stats.errors.get(route, 0) / len(values),
+            "first_error": stats.samples.get(route),
+        }
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic after login")
+    parser.add_argument("--mix", default="browse", help=f"{', '.join(MIXES)}, or scenario=weight,...")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds between a user's requests")
+    parser.add_argument("--server", choices=("gunicorn", "dev"), default="gunicorn")
+    parser.add_argument("--workers", type=int, help="gunicorn workers (default: from gunicorn.conf.py)")
+    parser.add_argument("--threads", type=int, help="threads per gunicorn worker (default: from gunicorn.conf.py)")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--url", help="load an already running server instead (no stubs)")
+    parser.add_argument("--scrape-latency", type=float, default=2.0, help="seconds per stubbed product page scrape")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="seconds per stubbed Gemini call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--p95-budget", type=float, help="max p95 in ms for every route")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_dev(args.serve)
+        return 0
+
+    mix = parse_mix(args.mix)
+    proc, workdir = None, None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", args.port
+        workdir = tempfile.mkdtemp(prefix="load_test-")
+        proc = start_server(args, workdir)
+    try:
+        wait_until_up(host, port, proc)
+        target = args.url or f"{args.server} server"
+        if not args.url and args.server == "gunicorn":
+            target += f", {args.workers or 'default'} workers x {args.threads or 'default'} threads"
+        print(f"{args.users} users for {args.duration:.0f}s against {target}; mix "
+              + ", ".join(f"{k}={v:g}" for k, v in mix.items()))
+        stats, elapsed = run_users(host, port, args, mix)
+    except RuntimeError as e:
+        print(f"Could not start the server: {e}")
+        if workdir:
+            print(open(os.path.join(workdir, "server.log")).read()[-2000:])
+        return 1
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    rows = summarize(stats, elapsed)
+    print(f"{'route':<22} | {'requests':>8} | {'req/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'errors':>7}")
+    print("-" * 86)
+    for route, r in rows.items():
+        rps = f"{r['rps']:7.1f}" if r["rps"] is not None else f"{'-':>7}"
+        print(f"{route:<22} | {r['requests']:8d} | {rps} | {r['p50_ms']:7.1f} | {r['p95_ms']:7.1f} | "
+              f"{r['p99_ms']:7.1f} | {r['error_rate']:6.1%}")
+    traffic = [r for route, r in rows.items() if r["rps"] is not None]
+    total = sum(r["requests"] for r in traffic)
+    errors = sum(r["errors"] for r in traffic)
+    error_rate = errors / total if total else 1.0
+    print(f"Total: {total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, {error_rate:.2%} errors")
+    for route, r in rows.items():
+        if r["first_error"]:
+            print(f"  first error on {route}: {r['first_error']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"users": args.users, "duration": elapsed, "mix": mix, "target": target,
+                       "routes": rows, "total_rps": total / elapsed, "error_rate": error_rate}, f, indent=2)
+
+    failures = []
+    if error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.2%} (budget {args.max_error_rate:.2%})")
+    if any(r["errors"] == r["requests"] for route, r in rows.items() if route == "POST /login"):
+        failures.append("no virtual user could log in")
+    if args.p95_budget is not None:
+        for route, r in rows.items():
+            if r["rps"] is not None and r["p95_ms"] > args.p95_budget:
+                failures.append(f"{route} p95 {r['p95_ms']:.0f} ms (budget {args.p95_budget:.0f} ms)")
+    for f in failures:
+        print(f"BUDGET EXCEEDED: {f}")
+    if not failures:
+        print("Load test budget OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
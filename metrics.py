@@ -0,0 +1,323 @@
+import os
+import hmac
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Tuple
+
+
+# Histogram bucket upper bounds, in seconds; requests and spans share them
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# When set, /metrics requires "Authorization: Bearer <token>"; unset, it only answers loopback clients
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Shared directory where each worker process writes its snapshot, so /metrics can add
+# them up (gunicorn.conf.py sets one per server). Unset, /metrics reports this process only.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+# How often a worker rewrites its snapshot in METRICS_DIR
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 5))
+_LOCAL_ADDRS = {"127.0.0.1", "::1"}
+
+
+class Histogram:
+    """Prometheus-style latency histogram: per-bucket counts (non-cumulative), sum and count."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_lock = threading.Lock()
+_requests: Dict[Tuple[str, str], Histogram] = {}
+_responses: Dict[Tuple[str, str, str], int] = {}
+_spans: Dict[str, Histogram] = {}
+_span_errors: Dict[str, int] = {}
+
+
+def observe_request(route: str, method: str, status: int, seconds: float) -> None:
+    with _lock:
+        hist = _requests.get((route, method))
+        if hist is None:
+            hist = _requests[(route, method)] = Histogram()
+        hist.observe(seconds)
+        key = (route, method, str(status))
+        _responses[key] = _responses.get(key, 0) + 1
+
+
+def observe_span(name: str, seconds: float, error: bool = False) -> None:
+    with _lock:
+        hist = _spans.get(name)
+        if hist is None:
+            hist = _spans[name] = Histogram()
+        hist.observe(seconds)
+        if error:
+            _span_errors[name] = _span_errors.get(name, 0) + 1
+
+
+@contextmanager
+def span(name: str):
+    """Time a block of work under ``name`` (e.g. "check_prices"); exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe_span(name, time.perf_counter() - start, error=True)
+        raise
+    observe_span(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    """Decorator form of ``span`` for agent entry points."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with span(name):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+# -------------------------------
+# Prometheus text format
+# -------------------------------
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram_lines(name: str, labels: Dict[str, str], counts: List[int], total: float, count: int,
+                     bounds=LATENCY_BUCKETS) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, n in zip(bounds, counts):
+        cumulative += n
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+    return lines
+
+
+def snapshot() -> Dict:
+    """This process's metrics as plain JSON-able data; see ``merge_snapshots``."""
+    with _lock:
+        requests = [[route, method, list(h.counts), h.sum, h.count] for (route, method), h in _requests.items()]
+        responses = [[route, method, status, n] for (route, method, status), n in _responses.items()]
+        spans = [[name, list(h.counts), h.sum, h.count] for name, h in _spans.items()]
+        span_errors = dict(_span_errors)
+    import llm_gateway
+    from product_cache import product_details_cache
+    return {
+        "pid": os.getpid(),
+        "requests": requests,
+        "responses": responses,
+        "spans": spans,
+        "span_errors": span_errors,
+        "llm": llm_gateway.get_metrics(),
+        "cache": {"stats": dict(product_details_cache.stats), "entries": len(product_details_cache)},
+    }
+
+
+def _add_histogram(into: Dict, key, counts: List[int], total: float, count: int) -> None:
+    prev = into.get(key)
+    if prev is None:
+        into[key] = [list(counts), total, count]
+    else:
+        prev[0] = [a + b for a, b in zip(prev[0], counts)]
+        prev[1] += total
+        prev[2] += count
+
+
+def merge_snapshots(snaps: List[Dict], live: set) -> Dict:
+    """
+    Add up snapshots from several worker processes. Counters and histograms
+    are summed over every snapshot, including workers that have exited, so
+    they never go backwards; gauges are summed over the ``live`` pids only.
+    """
+    requests, responses, spans, span_errors = {}, {}, {}, {}
+    llm = {"in_flight": 0, "latency_bucket_bounds": None}
+    cache_stats, cache_entries = {}, 0
+    for snap in snaps:
+        for route, method, counts, total, count in snap["requests"]:
+            _add_histogram(requests, (route, method), counts, total, count)
+        for route, method, status, n in snap["responses"]:
+            responses[(route, method, status)] = responses.get((route, method, status), 0) + n
+        for name, counts, total, count in snap["spans"]:
+            _add_histogram(spans, name, counts, total, count)
+        for name, n in snap["span_errors"].items():
+            span_errors[name] = span_errors.get(name, 0) + n
+        for key, value in snap["llm"].items():
+            if key == "latency_bucket_bounds":
+                llm[key] = value
+            elif key == "latency_buckets":
+                llm[key] = [a + b for a, b in zip(llm.get(key) or [0] * len(value), value)]
+            elif key == "in_flight":
+                llm[key] += value if snap["pid"] in live else 0
+            else:
+                llm[key] = llm.get(key, 0) + value
+        for event, n in snap["cache"]["stats"].items():
+            cache_stats[event] = cache_stats.get(event, 0) + n
+        if snap["pid"] in live:
+            cache_entries += snap["cache"]["entries"]
+    return {"requests": requests, "responses": responses, "spans": spans, "span_errors": span_errors,
+            "llm": llm, "cache": {"stats": cache_stats, "entries": cache_entries}, "workers": len(live)}
+
+
+# -------------------------------
+# Per-worker snapshot files
+# -------------------------------
+_flusher_pid = None
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def flush() -> None:
+    """Write this process's snapshot to METRICS_DIR (temp file + rename, so readers never see half of it)."""
+    path = _snapshot_path(os.getpid())
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not write metrics snapshot: {e}")
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        flush()
+
+
+def _ensure_flusher() -> None:
+    # Started lazily in each worker: a thread started in the preloading master would not survive the fork
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, daemon=True, name="metrics-flush").start()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _collect() -> Dict:
+    """Every worker's metrics merged, or this process's alone without METRICS_DIR."""
+    if not METRICS_DIR:
+        return merge_snapshots([snapshot()], {os.getpid()})
+    flush()
+    snaps = []
+    for name in os.listdir(METRICS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name), "r", encoding="utf-8") as f:
+                snaps.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    live = {snap["pid"] for snap in snaps if _alive(snap["pid"])}
+    return merge_snapshots(snaps, live)
+
+
+def render_prometheus() -> str:
+    data = _collect()
+    out = [
+        "# HELP http_request_duration_seconds Request latency by route.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (route, method), (counts, total, count) in sorted(data["requests"].items()):
+        out += _histogram_lines("http_request_duration_seconds", {"route": route, "method": method}, counts, total, count)
+    out += ["# HELP http_responses_total Responses by route and status code.", "# TYPE http_responses_total counter"]
+    for (route, method, status), n in sorted(data["responses"].items()):
+        out.append(f"http_responses_total{_labels(route=route, method=method, status=status)} {n}")
+
+    out += ["# HELP span_duration_seconds Time spent in instrumented agent work.", "# TYPE span_duration_seconds histogram"]
+    for name, (counts, total, count) in sorted(data["spans"].items()):
+        out += _histogram_lines("span_duration_seconds", {"span": name}, counts, total, count)
+    out += ["# HELP span_errors_total Spans that ended with an exception.", "# TYPE span_errors_total counter"]
+    for name, n in sorted(data["span_errors"].items()):
+        out.append(f"span_errors_total{_labels(span=name)} {n}")
+
+    # LLM gateway counters and call latency
+    llm = data["llm"]
+    for key in ("calls", "cache_hits", "cache_misses", "coalesced", "errors", "timeouts", "prompt_tokens", "completion_tokens"):
+        out += [f"# TYPE llm_{key}_total counter", f"llm_{key}_total {llm[key]}"]
+    out += ["# TYPE llm_in_flight gauge", f"llm_in_flight {llm['in_flight']}"]
+    out += ["# TYPE llm_call_duration_seconds histogram"]
+    out += _histogram_lines("llm_call_duration_seconds", {}, llm["latency_buckets"], llm["latency_seconds_sum"],
+                            llm["latency_seconds_count"], bounds=llm["latency_bucket_bounds"])
+
+    # Scraped product page cache
+    cache = data["cache"]
+    out += ["# TYPE product_cache_events_total counter"]
+    for event, n in sorted(cache["stats"].items()):
+        out.append(f"product_cache_events_total{_labels(event=event)} {n}")
+    out += ["# TYPE product_cache_entries gauge", f"product_cache_entries {cache['entries']}"]
+    out += ["# HELP metrics_workers Worker processes included in these totals.", "# TYPE metrics_workers gauge",
+            f"metrics_workers {data['workers']}"]
+    return "\n".join(out) + "\n"
+
+
+def init_app(app) -> None:
+    """
+    Time every request and expose /metrics.
+
+    Under gunicorn each worker keeps its own counters and, with METRICS_DIR
+    set, writes them there every METRICS_FLUSH_SECONDS; /metrics adds up all
+    the workers' files, so other workers' numbers may lag by that much.
+    Without METRICS_TOKEN only loopback clients may read /metrics.
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        if METRICS_DIR:
+            _ensure_flusher()
+        start = g.pop("_request_start", None)
+        if start is not None:
+            # The URL rule, not the raw path, keeps the label set bounded
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        if METRICS_TOKEN:
+            supplied = request.headers.get("Authorization", "").encode("utf-8")
+            if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+                return Response("unauthorized\n", status=401, mimetype="text/plain")
+        elif request.remote_addr not in _LOCAL_ADDRS:
+            return Response("set METRICS_TOKEN to read metrics remotely\n", status=403, mimetype="text/plain")
+        return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
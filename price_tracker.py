@@ -1,22 +1,18 @@
 import json
 import re
-import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Dict
 from dotenv import load_dotenv
 
+import llm_gateway
+from metrics import timed
+
 # Load environment variables
 load_dotenv()
 
-# -------------------------------
-# Try importing Gemini SDK
-# -------------------------------
-try:
-    import google.generativeai as genai
-    # ✅ Setup Gemini API key from environment variable
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-except Exception:
-    genai = None
-
 # -------------------------------
 # Helper function to parse price
 # -------------------------------
@@ -36,6 +32,7 @@ def parse_price(price_str):
 # -------------------------------
 # Price Tracker Agent
 # -------------------------------
+@timed("check_prices")
 def check_prices(products: List[Dict]):
     alerts = []
     valid_products = 0
@@ -83,10 +80,7 @@ def check_prices(products: List[Dict]):
 # -------------------------------
 # AI Summary with Gemini
 # -------------------------------
-def llm_summary_alerts(alerts: List[Dict]):
-    if not alerts:
-        return "🔍 No price alerts at the moment. All monitored products are currently above their price thresholds."
-    
+def _alerts_prompt(alerts: List[Dict]) -> str:
     alert_details = []
     for alert in alerts:
         alert_details.append(
@@ -94,7 +88,7 @@ def llm_summary_alerts(alerts: List[Dict]):
             f"(threshold: {alert['threshold']}, savings: Rs. {alert['savings']:,})"
         )
     
-    prompt = f"""
+    return f"""
 You are a helpful price tracking assistant. Please create a friendly and informative summary of these {len(alerts)} price alerts:
 
 {chr(10).join(alert_details)}
@@ -105,18 +99,103 @@ Please:
 3. Use emojis 🎉🛒💰
 4. Keep it concise but engaging
 """
+
+
+def llm_summary_alerts(alerts: List[Dict]):
+    if not alerts:
+        return "🔍 No price alerts at the moment. All monitored products are currently above their price thresholds."
     
-    if genai is not None:
+    if llm_gateway.available():
         try:
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(prompt)
-            return response.text.strip()
+            return llm_gateway.generate(_alerts_prompt(alerts))
         except Exception as e:
             print(f"Error calling Gemini API: {e}")
     
+    return fallback_summary_alerts(alerts)
+
+
+def fallback_summary_alerts(alerts: List[Dict]) -> str:
     total_savings = sum(alert['savings'] for alert in alerts)
     return f"🎯 Found {len(alerts)} great deals with potential savings of Rs. {total_savings:,}! Check the details above for specific products."
 
+
+# -------------------------------
+# Memoized summary, refreshed in the background
+# -------------------------------
+SUMMARY_CACHE_SIZE = 32
+# After a failed LLM call, the alert set is retried no sooner than this
+SUMMARY_RETRY_SECONDS = 60
+_summary_cache: "OrderedDict[str, str]" = OrderedDict()
+_summary_pending: set = set()
+# Fingerprint -> monotonic time of the last failed LLM call
+_summary_failed: Dict[str, float] = {}
+_summary_lock = threading.Lock()
+# Bumped whenever a background summary lands, so cached tracker pages know to re-render
+_summary_version = 0
+
+
+def alerts_fingerprint(alerts: List[Dict]) -> str:
+    """Stable hash of an alert set (names, prices, thresholds), independent of order."""
+    rows = sorted((a.get("name", ""), str(a.get("current_price", "")), str(a.get("threshold", ""))) for a in alerts)
+    return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def summary_version() -> int:
+    return _summary_version
+
+
+def _refresh_summary(fingerprint: str, alerts: List[Dict]) -> None:
+    global _summary_version
+    try:
+        try:
+            summary = llm_gateway.generate(_alerts_prompt(alerts))
+        except Exception as e:
+            # Only real summaries are cached; the fallback stays up until the retry
+            print(f"Error calling Gemini API: {e}")
+            with _summary_lock:
+                _summary_failed[fingerprint] = time.monotonic()
+                while len(_summary_failed) > SUMMARY_CACHE_SIZE:
+                    _summary_failed.pop(next(iter(_summary_failed)))
+            return
+        with _summary_lock:
+            _summary_failed.pop(fingerprint, None)
+            _summary_version += 1
+            _summary_cache[fingerprint] = summary
+            _summary_cache.move_to_end(fingerprint)
+            while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+    finally:
+        with _summary_lock:
+            _summary_pending.discard(fingerprint)
+
+
+def cached_summary_alerts(alerts: List[Dict]) -> str:
+    """
+    Non-blocking alert summary. Returns the summary cached for this exact alert
+    set, or the fallback summary while a background thread asks the LLM for
+    one; the LLM runs only when the alert fingerprint has not been seen before,
+    or SUMMARY_RETRY_SECONDS after its last call failed.
+    """
+    if not alerts:
+        return llm_summary_alerts(alerts)
+    if not llm_gateway.available():
+        return fallback_summary_alerts(alerts)
+    fingerprint = alerts_fingerprint(alerts)
+    with _summary_lock:
+        cached = _summary_cache.get(fingerprint)
+        if cached is not None:
+            _summary_cache.move_to_end(fingerprint)
+            return cached
+        failed_at = _summary_failed.get(fingerprint)
+        retry_ok = failed_at is None or time.monotonic() - failed_at >= SUMMARY_RETRY_SECONDS
+        start = retry_ok and fingerprint not in _summary_pending
+        if start:
+            _summary_pending.add(fingerprint)
+    if start:
+        # Copy the alerts so the request can't mutate what the worker reads
+        threading.Thread(target=_refresh_summary, args=(fingerprint, [dict(a) for a in alerts]), daemon=True).start()
+    return fallback_summary_alerts(alerts)
+
 # -------------------------------
 # Load products
 # -------------------------------
@@ -0,0 +1,131 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+
+# Fresh for TTL seconds, then served stale (and refreshed in the background) for STALE seconds more
+PRODUCT_CACHE_TTL = int(os.environ.get("PRODUCT_CACHE_TTL", 6 * 3600))
+PRODUCT_CACHE_STALE = int(os.environ.get("PRODUCT_CACHE_STALE", 24 * 3600))
+PRODUCT_CACHE_SIZE = int(os.environ.get("PRODUCT_CACHE_SIZE", 256))
+
+
+def extract_product_id_from_url(url: str) -> str | None:
+    if not url:
+        return None
+    m = re.search(r"i\d{6,}", url)
+    if m:
+        return m.group(0)
+    m = re.search(r"/product/([\w-]+)-(\d+)", url)
+    if m:
+        return m.group(2)
+    return None
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with stale-while-revalidate.
+
+    Within ``ttl`` an entry is served as is. Between ``ttl`` and
+    ``ttl + stale`` it is still served, but one background refresh is
+    started. Older entries and misses load synchronously, and concurrent
+    callers for the same key share that one load. Empty values are never
+    cached.
+    """
+
+    def __init__(self, ttl: int = PRODUCT_CACHE_TTL, stale: int = PRODUCT_CACHE_STALE,
+                 max_entries: int = PRODUCT_CACHE_SIZE):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, callers holding or waiting on it]; dropped when the last one leaves
+        self._key_locks: Dict[str, list] = {}
+        self._refreshing: set = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "evictions": 0}
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        with self._lock:
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._key_locks[key]
+
+    def peek(self, key: str) -> Any | None:
+        """The cached value regardless of age, without loading anything."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def put(self, key: str, value: Any) -> None:
+        if not value:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _load(self, key: str, loader: Callable[[], Any]) -> Any:
+        with self._key_lock(key):
+            # Another caller may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry and time.time() - entry[0] < self.ttl:
+                return entry[1]
+            value = loader()
+            self.put(key, value)
+            return value
+
+    def _refresh(self, key: str, loader: Callable[[], Any]) -> None:
+        try:
+            value = loader()
+            self.put(key, value)
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                age = now - entry[0]
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                    return entry[1]
+                if age < self.ttl + self.stale:
+                    self.stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self.stats["refreshes"] += 1
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry[1]
+            self.stats["misses"] += 1
+        return self._load(key, loader)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Scraped product pages (details, specs and a few reviews), shared by compare and reviews
+product_details_cache = TTLCache()
+
+
+def product_cache_key(product_url: str) -> str:
+    return extract_product_id_from_url(product_url) or product_url
@@ -0,0 +1,173 @@
+import re
+from typing import List, Dict, Tuple
+
+from spec_table import product_specs
+from recommendation_agent import parse_price
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_MODEL_TOKEN = re.compile(r"^(?=.*\d)(?=.*[a-z])[a-z0-9]+$|^\d{1,4}$")
+_SPEC_SUFFIX = re.compile(r"\d(?:gb|tb|mah|mp|mm|hz|khz|w|inch|in|h|hrs?|th|nd|rd|st)$")
+# Words that distinguish variants of the same model line ("iPhone 15" vs "iPhone 15 Pro")
+VARIANT_WORDS = {"pro", "max", "plus", "ultra", "mini", "lite", "fe", "neo", "prime", "air"}
+
+# Blocks with more members than this are too generic (e.g. "5g") to be worth pairing
+MAX_BLOCK_SIZE = 200
+MATCH_THRESHOLD = 0.5
+
+
+def _tokens(name: str) -> List[str]:
+    return _TOKEN.findall((name or "").lower())
+
+
+def normalize_product(product: Dict, category: str = "phones", known_brands: set | None = None) -> Dict:
+    """Brand, model tokens, variant words and RAM/storage for one listing."""
+    name = product.get("name", "")
+    tokens = _tokens(name)
+    brand = (product.get("brand") or "").strip().lower()
+    if known_brands and brand not in tokens:
+        brand = next((t for t in tokens if t in known_brands), brand)
+    specs = product_specs(product, category)
+    model_tokens = {t for t in tokens if _MODEL_TOKEN.match(t) and not _SPEC_SUFFIX.search(t)}
+    return {
+        "brand": brand,
+        "tokens": set(tokens),
+        "model_tokens": model_tokens,
+        "variants": {t for t in tokens if t in VARIANT_WORDS},
+        "ram": specs.get("ram_gb"),
+        "storage": specs.get("storage_gb"),
+    }
+
+
+def match_score(a: Dict, b: Dict) -> float:
+    """Similarity of two normalized listings in [0, 1]; 0 when they are provably different."""
+    if a["brand"] and b["brand"] and a["brand"] != b["brand"]:
+        return 0.0
+    if a["variants"] != b["variants"]:
+        return 0.0
+    for key in ("ram", "storage"):
+        if a[key] and b[key] and a[key] != b[key]:
+            return 0.0
+    if a["model_tokens"] and b["model_tokens"] and not (a["model_tokens"] & b["model_tokens"]):
+        return 0.0
+    union = a["tokens"] | b["tokens"]
+    jaccard = len(a["tokens"] & b["tokens"]) / len(union) if union else 0.0
+    model_overlap = len(a["model_tokens"] & b["model_tokens"]) / max(1, len(a["model_tokens"] | b["model_tokens"]))
+    return 0.5 * jaccard + 0.5 * model_overlap
+
+
+class ProductMatchIndex:
+    """
+    Entity-resolution index linking the same model across retailers.
+
+    Listings are blocked by (brand, model token), so only listings sharing a
+    block are scored against each other; oversized generic blocks are skipped.
+    Matched listings are merged with union-find into canonical products, each
+    carrying the offers from every source. Merges use complete linkage: two
+    clusters join only if every pair across them scores above the threshold,
+    so A ~ B and B ~ C never pull two different variants A and C together.
+    """
+
+    def __init__(self, products: List[Dict], category: str = "phones", threshold: float = MATCH_THRESHOLD):
+        self.products = [p for p in products or [] if p.get("name") and p.get("name") != "No Name"]
+        known_brands = {(p.get("brand") or "").strip().lower() for p in self.products} - {""}
+        self.normalized = [normalize_product(p, category, known_brands) for p in self.products]
+
+        blocks: Dict[Tuple[str, str], List[int]] = {}
+        for idx, norm in enumerate(self.normalized):
+            for token in norm["model_tokens"]:
+                blocks.setdefault((norm["brand"], token), []).append(idx)
+
+        parent = list(range(len(self.products)))
+        members_of: Dict[int, List[int]] = {i: [i] for i in range(len(self.products))}
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        seen_pairs = set()
+        for members in blocks.values():
+            if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+                continue
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    if (i, j) in seen_pairs or self._source(i) == self._source(j):
+                        continue
+                    seen_pairs.add((i, j))
+                    root_i, root_j = find(i), find(j)
+                    if root_i == root_j or match_score(self.normalized[i], self.normalized[j]) < threshold:
+                        continue
+                    if all(match_score(self.normalized[a], self.normalized[b]) >= threshold
+                           for a in members_of[root_i] for b in members_of[root_j] if (a, b) != (i, j)):
+                        parent[root_j] = root_i
+                        members_of[root_i].extend(members_of.pop(root_j))
+
+        clusters: Dict[int, List[int]] = {}
+        for idx in range(len(self.products)):
+            clusters.setdefault(find(idx), []).append(idx)
+
+        self.canonical: List[Dict] = []
+        self.by_url: Dict[str, Dict] = {}
+        for members in clusters.values():
+            entry = self._canonical_entry(members)
+            self.canonical.append(entry)
+            for i in members:
+                self.by_url[self.products[i].get("url", "#")] = entry
+
+    def _source(self, idx: int) -> str:
+        return self.products[idx].get("source") or "Daraz"
+
+    def _canonical_entry(self, members: List[int]) -> Dict:
+        offers = []
+        for i in members:
+            p = self.products[i]
+            offers.append({
+                "source": self._source(i),
+                "name": p.get("name", ""),
+                "price": p.get("price", ""),
+                "price_value": parse_price(p.get("price")),
+                "url": p.get("url", "#"),
+            })
+        offers.sort(key=lambda o: o["price_value"] if o["price_value"] is not None else float("inf"))
+        norm = self.normalized[members[0]]
+        return {
+            "name": offers[0]["name"],
+            "brand": norm["brand"],
+            "model": " ".join(sorted(norm["model_tokens"])),
+            "ram": f"{norm['ram']:g} GB" if norm["ram"] else None,
+            "storage": f"{norm['storage']:g} GB" if norm["storage"] else None,
+            "offers": offers,
+            "sources": sorted({o["source"] for o in offers}),
+        }
+
+    def offers_for(self, url: str) -> List[Dict]:
+        entry = self.by_url.get(url)
+        return entry["offers"] if entry else []
+
+    def multi_source(self) -> List[Dict]:
+        """Canonical products offered by more than one retailer."""
+        return [c for c in self.canonical if len(c["sources"]) > 1]
+
+
+if __name__ == "__main__":
+    sample = [
+        {"name": "Samsung Galaxy A15 8GB 256GB", "price": "Rs. 52,999", "url": "d1", "brand": "Samsung", "source": "Daraz"},
+        {"name": "Samsung Galaxy A15 (8GB/256GB) - Blue", "price": "Rs. 51,500", "url": "l1", "brand": "Samsung", "source": "Life Mobile"},
+        {"name": "Samsung Galaxy A25 8GB 256GB", "price": "Rs. 64,999", "url": "d2", "brand": "Samsung", "source": "Daraz"},
+        {"name": "Apple iPhone 15 128GB", "price": "Rs. 249,000", "url": "d3", "brand": "Apple", "source": "Daraz"},
+        {"name": "iPhone 15 Pro 128GB", "price": "Rs. 329,000", "url": "l2", "brand": "Apple", "source": "Life Mobile"},
+    ]
+    index = ProductMatchIndex(sample)
+    for entry in index.canonical:
+        offers = ", ".join(f"{o['source']} {o['price']}" for o in entry["offers"])
+        print(f"- {entry['name']} [{entry['brand']} {entry['model']}] -> {offers}")
+
+    # Regression: a listing without a storage size must not link two sizes into one product
+    chain = ProductMatchIndex([
+        {"name": "Samsung Galaxy A55 5G 256GB", "url": "c1", "brand": "Samsung", "source": "Daraz"},
+        {"name": "Samsung Galaxy A55 5G", "url": "c2", "brand": "Samsung", "source": "Life Mobile"},
+        {"name": "Samsung Galaxy A55 5G 128GB", "url": "c3", "brand": "Samsung", "source": "Daraz"},
+    ])
+    assert chain.by_url["c1"] is not chain.by_url["c3"], "128GB and 256GB variants matched as one product"
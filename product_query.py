@@ -0,0 +1,235 @@
+import json
+import base64
+import hashlib
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Set, Tuple
+
+from price_tracker import parse_price
+
+
+# Fields returned when the caller does not ask for specific ones
+DEFAULT_FIELDS = ["name", "price", "url", "source", "brand", "threshold", "below_threshold"]
+
+# Sort keys; prefix with "-" for descending. "catalog" keeps the scraped order.
+SORT_KEYS = ("catalog", "price", "name", "savings")
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class QueryError(ValueError):
+    """A malformed filter, sort, projection or cursor; reported to API callers as a 400."""
+
+
+class CursorExpired(QueryError):
+    """The cursor was issued for an older catalog version."""
+
+
+def _encode_cursor(version: str, sort: str, offset: int) -> str:
+    raw = json.dumps([version, sort, offset], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, sort, offset = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(version), str(sort), int(offset)
+    except (ValueError, TypeError):
+        raise QueryError("invalid cursor")
+
+
+def catalog_version_tag(version) -> str:
+    """Short opaque tag for a catalog version (see ``Category.version``)."""
+    return hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:12]
+
+
+class ProductTable:
+    """
+    Read-only query index over one category's catalog.
+
+    Built once per catalog version (``Category.cached``). Brand, source
+    and below-threshold filters are posting sets of row ids, every sort
+    key has a precomputed row order, and price ranges on the price order
+    are resolved with bisect. A page walks the chosen order from the
+    cursor and stops after ``limit`` matches, so it never scans rows past
+    the page it returns, except when the filters are very selective.
+    """
+
+    def __init__(self, products: List[Dict], version_tag: str = ""):
+        self.version = version_tag
+        self.rows: List[Dict] = [p for p in products or [] if p.get("name") and p.get("name") != "No Name"]
+        n = len(self.rows)
+        self.prices: List[float | None] = [parse_price(p.get("price")) for p in self.rows]
+        thresholds = [parse_price(p.get("threshold")) for p in self.rows]
+        self.below: Set[int] = {
+            i for i in range(n)
+            if self.prices[i] is not None and thresholds[i] is not None and self.prices[i] < thresholds[i]
+        }
+        self.savings: List[float | None] = [
+            (thresholds[i] - self.prices[i]) if self.prices[i] is not None and thresholds[i] is not None else None
+            for i in range(n)
+        ]
+        self.by_brand: Dict[str, Set[int]] = {}
+        self.by_source: Dict[str, Set[int]] = {}
+        self.by_url: Dict[str, int] = {}
+        for i, p in enumerate(self.rows):
+            self.by_brand.setdefault((p.get("brand") or "").strip().lower(), set()).add(i)
+            self.by_source.setdefault((p.get("source") or "Daraz").strip().lower(), set()).add(i)
+            if p.get("url"):
+                self.by_url.setdefault(p["url"], i)
+        self.names_lower = [p["name"].lower() for p in self.rows]
+
+        # Unknown values sort last in both directions
+        priced = sorted((i for i in range(n) if self.prices[i] is not None), key=lambda i: (self.prices[i], i))
+        unpriced = [i for i in range(n) if self.prices[i] is None]
+        with_savings = sorted((i for i in range(n) if self.savings[i] is not None), key=lambda i: (self.savings[i], i))
+        no_savings = [i for i in range(n) if self.savings[i] is None]
+        by_name = sorted(range(n), key=lambda i: (self.names_lower[i], i))
+        self.orders: Dict[str, List[int]] = {
+            "catalog": list(range(n)),
+            "-catalog": list(range(n - 1, -1, -1)),
+            "price": priced + unpriced,
+            "-price": priced[::-1] + unpriced,
+            "name": by_name,
+            "-name": by_name[::-1],
+            "savings": with_savings + no_savings,
+            "-savings": with_savings[::-1] + no_savings,
+        }
+        self._sorted_prices = [self.prices[i] for i in priced]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _price_window(self, sort: str, min_price: float | None, max_price: float | None) -> Tuple[int, int]:
+        """Range of the price order that can match, so price-sorted pages skip out-of-range rows."""
+        n_priced = len(self._sorted_prices)
+        lo = bisect_left(self._sorted_prices, min_price) if min_price is not None else 0
+        hi = bisect_right(self._sorted_prices, max_price) if max_price is not None else n_priced
+        if sort == "price":
+            return lo, hi
+        return n_priced - hi, n_priced - lo
+
+    def row(self, i: int, fields: Iterable[str]) -> Dict:
+        p = self.rows[i]
+        out: Dict = {}
+        for f in fields:
+            if f == "id":
+                out["id"] = i
+            elif f == "below_threshold":
+                out[f] = i in self.below
+            elif f == "price_value":
+                out[f] = self.prices[i]
+            elif f == "savings":
+                out[f] = self.savings[i]
+            elif f == "source":
+                out[f] = p.get("source") or "Daraz"
+            else:
+                out[f] = p.get(f)
+        return out
+
+    def query(self, brands: List[str] | None = None, sources: List[str] | None = None,
+              min_price: float | None = None, max_price: float | None = None,
+              below_threshold: bool | None = None, q: str = "", sort: str = "catalog",
+              fields: List[str] | None = None, limit: int = DEFAULT_LIMIT, cursor: str | None = None) -> Dict:
+        if sort.lstrip("-") not in SORT_KEYS:
+            raise QueryError(f"unknown sort key '{sort}' (use {', '.join(SORT_KEYS)}, optionally prefixed with -)")
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        fields = fields or DEFAULT_FIELDS
+
+        offset = 0
+        if cursor:
+            version, cursor_sort, offset = _decode_cursor(cursor)
+            if version != self.version:
+                raise CursorExpired("cursor expired: the catalog changed, start again without a cursor")
+            if cursor_sort != sort:
+                raise QueryError("cursor was issued for a different sort")
+
+        # Posting-set filters, smallest set first
+        allowed: Set[int] | None = None
+        postings = []
+        if brands:
+            postings.append(set().union(*(self.by_brand.get(b.strip().lower(), set()) for b in brands)))
+        if sources:
+            postings.append(set().union(*(self.by_source.get(s.strip().lower(), set()) for s in sources)))
+        if below_threshold is True:
+            postings.append(self.below)
+        for s in sorted(postings, key=len):
+            allowed = set(s) if allowed is None else allowed & s
+        if below_threshold is False:
+            allowed = (set(range(len(self.rows))) if allowed is None else allowed) - self.below
+
+        order = self.orders[sort]
+        start, stop = offset, len(order)
+        priced = min_price is not None or max_price is not None
+        if priced and sort in ("price", "-price"):
+            lo, hi = self._price_window(sort, min_price, max_price)
+            start, stop = max(start, lo), min(stop, hi)
+        terms = q.lower().split()
+
+        items: List[Dict] = []
+        pos = start
+        while pos < stop and len(items) < limit:
+            i = order[pos]
+            pos += 1
+            if allowed is not None and i not in allowed:
+                continue
+            if priced:
+                price = self.prices[i]
+                if price is None or (min_price is not None and price < min_price) or \
+                        (max_price is not None and price > max_price):
+                    continue
+            if terms and not all(t in self.names_lower[i] for t in terms):
+                continue
+            items.append(self.row(i, fields))
+
+        has_more = len(items) == limit and pos < stop
+        return {
+            "items": items,
+            "next_cursor": _encode_cursor(self.version, sort, pos) if has_more else None,
+            "version": self.version,
+        }
+
+    def facets(self) -> Dict:
+        known = [p for p in self.prices if p is not None]
+        brands: Dict[str, int] = {}
+        sources: Dict[str, int] = {}
+        for p in self.rows:
+            b = p.get("brand") or "Unknown"
+            brands[b] = brands.get(b, 0) + 1
+            s = p.get("source") or "Daraz"
+            sources[s] = sources.get(s, 0) + 1
+        return {
+            "count": len(self.rows),
+            "below_threshold": len(self.below),
+            "brands": brands,
+            "sources": sources,
+            "price_min": min(known) if known else None,
+            "price_max": max(known) if known else None,
+            "version": self.version,
+        }
+
+
+def product_table(category) -> ProductTable:
+    """The category's query index, built once per catalog version."""
+    tag = catalog_version_tag(category.version)
+    return category.cached("product_table", lambda products: ProductTable(products, tag))
+
+
+if __name__ == "__main__":
+    import time
+    import random
+
+    products = json.load(open("daraz_products.json", encoding="utf-8"))
+    big = [{**random.choice(products), "url": f"u{i}"} for i in range(100_000)]
+    start = time.perf_counter()
+    table = ProductTable(big, "bench")
+    print(f"Indexed {len(table)} rows in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    page = table.query(max_price=150000, sort="-price", limit=50)
+    pages = 1
+    while page["next_cursor"] and pages < 20:
+        page = table.query(max_price=150000, sort="-price", limit=50, cursor=page["next_cursor"])
+        pages += 1
+    elapsed = time.perf_counter() - start
+    print(f"{pages} pages of 50 in {elapsed * 1000:.1f} ms ({elapsed / pages * 1000:.2f} ms per page)")
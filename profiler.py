@@ -0,0 +1,170 @@
+import os
+import io
+import re
+import json
+import hmac
+import time
+import random
+import pstats
+import cProfile
+from typing import Dict, List
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+# Admin token: "X-Profile: <token>" profiles that request, and unlocks the /profiles pages
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+# Fraction of requests to PROFILE_ENDPOINTS profiled without the header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_ENDPOINTS = {e.strip() for e in os.environ.get("PROFILE_ENDPOINTS", "compare,recommendations").split(",") if e.strip()}
+# Traces kept on disk; older ones are deleted
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 50))
+HOTSPOT_COUNT = 25
+
+_ID_RE = re.compile(r"^[\w.-]+$")
+
+
+def enabled() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def _authorized(request) -> bool:
+    # Header only: a ?token= query string would land in access logs and browser history
+    supplied = request.headers.get("X-Profile") or ""
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(supplied.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+
+def hotspots(stats: pstats.Stats, limit: int = HOTSPOT_COUNT) -> List[Dict]:
+    """Functions with the most own time, with call counts and cumulative time."""
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": func,
+            "file": os.path.relpath(filename, BASE_DIR) if filename.startswith(BASE_DIR) else filename,
+            "line": line,
+            "calls": ncalls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        })
+    rows.sort(key=lambda r: r["tottime"], reverse=True)
+    return rows[:limit]
+
+
+def save_profile(profile: cProfile.Profile, endpoint: str, method: str, path: str,
+                 elapsed: float, reason: str) -> str:
+    """Write the raw trace (.prof, loadable with pstats/snakeviz) and a JSON hotspot summary; returns the id."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{os.getpid()}-{random.randrange(16 ** 4):04x}"
+    base = os.path.join(PROFILE_DIR, profile_id)
+    profile.dump_stats(base + ".prof")
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    summary = {
+        "id": profile_id,
+        "endpoint": endpoint,
+        "method": method,
+        "path": path,
+        "reason": reason,
+        "elapsed": round(elapsed, 4),
+        "created": time.time(),
+        "total_calls": stats.total_calls,
+        "hotspots": hotspots(stats),
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    _prune()
+    return profile_id
+
+
+def _prune() -> None:
+    summaries = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".json"))
+    for name in summaries[:max(0, len(summaries) - PROFILE_KEEP)]:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + ext))
+            except OSError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    out = []
+    try:
+        names = sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(".json")), reverse=True)
+    except OSError:
+        return []
+    for name in names:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        summary["top"] = summary.pop("hotspots", [])[:3]
+        out.append(summary)
+    return out
+
+
+def init_app(app) -> None:
+    """
+    Opt-in request profiling. Nothing is registered unless PROFILE_TOKEN or
+    PROFILE_SAMPLE_RATE is set, so a disabled profiler costs nothing.
+
+    A request is profiled when it carries the admin header
+    ``X-Profile: <PROFILE_TOKEN>``, or is picked by PROFILE_SAMPLE_RATE on
+    one of PROFILE_ENDPOINTS. The response then carries ``X-Profile-Id``.
+    With the same header, /profiles lists traces, /profiles/<id> shows the
+    hotspots and /profiles/<id>.prof downloads the raw cProfile trace.
+
+    cProfile only sees the request's own thread. Work handed to
+    llm_gateway's executor or review_summarizer's pool shows up as time
+    spent waiting on a future, not as the functions that ran there.
+    """
+    if not enabled():
+        return
+    from flask import abort, g, jsonify, request, send_from_directory
+
+    @app.before_request
+    def _start_profile():
+        if request.path.startswith("/profiles"):
+            return
+        if request.headers.get("X-Profile") and _authorized(request):
+            reason = "header"
+        elif PROFILE_SAMPLE_RATE > 0 and request.endpoint in PROFILE_ENDPOINTS and random.random() < PROFILE_SAMPLE_RATE:
+            reason = "sampled"
+        else:
+            return
+        g._profile = (cProfile.Profile(), reason, time.perf_counter())
+        g._profile[0].enable()
+
+    @app.after_request
+    def _finish_profile(response):
+        state = g.pop("_profile", None)
+        if state is None:
+            return response
+        profile, reason, start = state
+        profile.disable()
+        elapsed = time.perf_counter() - start
+        try:
+            profile_id = save_profile(profile, request.endpoint or "unmatched", request.method, request.full_path,
+                                      elapsed, reason)
+            response.headers["X-Profile-Id"] = profile_id
+            print(f"Profiled {request.method} {request.path} ({reason}, {elapsed:.3f}s) -> {profile_id}")
+        except OSError as e:
+            print(f"Could not save profile: {e}")
+        return response
+
+    @app.route("/profiles")
+    def profiles():
+        if not _authorized(request):
+            abort(404)
+        return jsonify({"profiles": list_profiles()})
+
+    @app.route("/profiles/<profile_id>")
+    def profile_detail(profile_id: str):
+        if not _authorized(request) or not _ID_RE.match(profile_id):
+            abort(404)
+        if profile_id.endswith(".prof"):
+            return send_from_directory(PROFILE_DIR, profile_id, as_attachment=True)
+        try:
+            with open(os.path.join(PROFILE_DIR, profile_id + ".json"), "r", encoding="utf-8") as f:
+                return jsonify(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            abort(404)
@@ -1,8 +1,26 @@
 import json
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import heapq
 import re
-from typing import List, Dict
+from typing import List, Dict, Iterator
+
+from metrics import timed
+
+# Similarity is computed over fixed-size chunks of the catalog so peak memory
+# depends on CHUNK_SIZE and HASH_FEATURES, never on the number of products.
+CHUNK_SIZE = 2048
+HASH_FEATURES = 2 ** 18
+
+_hasher = None
+
+
+def _get_hasher():
+    """Same tokenization as TfidfVectorizer's defaults, but stateless (no vocabulary to build).
+    scikit-learn is imported here, on first use, so importing this module stays cheap."""
+    global _hasher
+    if _hasher is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        _hasher = HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, norm=None)
+    return _hasher
 
 def load_products_from_json(path: str = "daraz_products.json") -> List[Dict]:
     try:
@@ -40,73 +58,100 @@ def parse_price(price_str):
 # -------------------------------
 # Recommendation Agent
 # -------------------------------
+@timed("recommend")
 def recommend_products(product_name: str, products: List[Dict], top_n: int = 5, max_price: int | None = None):
     """
     Recommend products using a composite score:
     - name similarity (TF-IDF cosine)
     - brand match bonus
     - price proximity bonus (if max_price provided)
+
+    The TF-IDF vectors stay sparse and are built chunk by chunk from a hashed
+    vocabulary, so memory is bounded regardless of catalog size.
     """
     if not products:
         print("No products available for recommendations.")
         return []
 
     # Filter by max_price if specified
-    filtered_products = []
-    for p in products:
+    def in_budget(p: Dict) -> bool:
         price_val = parse_price(p['price'])
-        if max_price is None or (price_val is not None and price_val <= max_price):
-            filtered_products.append(p)
-
-    if not filtered_products:
+        return max_price is None or (price_val is not None and price_val <= max_price)
+
+    def chunks() -> Iterator[List[Dict]]:
+        batch: List[Dict] = []
+        for p in products:
+            if in_budget(p):
+                batch.append(p)
+                if len(batch) == CHUNK_SIZE:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    import numpy as np
+    from sklearn.preprocessing import normalize
+    _hasher = _get_hasher()
+
+    # Pass 1: document frequencies over the query plus all candidate names (TF-IDF's smooth idf)
+    doc_freq = np.zeros(HASH_FEATURES, dtype=np.float64)
+    n_docs = 1
+    doc_freq[_hasher.transform([product_name]).indices] += 1
+    for batch in chunks():
+        counts = _hasher.transform([p['name'] for p in batch])
+        doc_freq += np.bincount(counts.indices, minlength=HASH_FEATURES)
+        n_docs += len(batch)
+
+    if n_docs == 1:
         print("No products within the specified price range." if max_price is not None else "No products available.")
         return []
 
-    # Create a list of product names
-    product_names = [p['name'] for p in filtered_products]
-
-    # Include the query product as the first item
-    corpus = [product_name] + product_names
-
-    # Vectorize names using TF-IDF
-    vectorizer = TfidfVectorizer().fit_transform(corpus)
-    vectors = vectorizer.toarray()
-
-    # Compute cosine similarity between query and all products
-    name_similarity = cosine_similarity([vectors[0]], vectors[1:])[0]
+    idf = np.log((1.0 + n_docs) / (1.0 + doc_freq)) + 1.0
+    query_vec = normalize(_hasher.transform([product_name]).multiply(idf).tocsr())
 
     # Extract brand from names heuristically (first token or within known brands)
     known_brands = {"samsung","xiaomi","apple","google","nokia","vivo","redmi","huawei","oneplus","realme","oppo","infinix"}
     q_lower = product_name.lower()
     q_brand = next((b for b in known_brands if b in q_lower), (q_lower.split()[0] if q_lower else ""))
 
-    scores: List[float] = []
-    for idx, p in enumerate(filtered_products):
-        base = float(name_similarity[idx])
-        # brand bonus
-        p_name_lower = (p.get("name") or "").lower()
-        p_brand = next((b for b in known_brands if b in p_name_lower), (p_name_lower.split()[0] if p_name_lower else ""))
-        brand_bonus = 0.1 if q_brand and p_brand and q_brand == p_brand else 0.0
-        # price proximity bonus (closer to max_price without exceeding)
-        price_bonus = 0.0
-        if max_price is not None:
-            p_price = parse_price(p.get("price"))
-            if p_price is not None and p_price <= max_price:
-                # normalize proximity: closer to max_price gets slight boost
-                proximity = 1.0 - (max(0, max_price - p_price) / max(max_price, 1))
-                price_bonus = 0.1 * proximity
-        scores.append(base + brand_bonus + price_bonus)
-
-    top_indices = sorted(range(len(filtered_products)), key=lambda i: scores[i], reverse=True)[:top_n]
+    # Pass 2: sparse cosine similarity per chunk, keeping only a top_n heap across chunks
+    heap: List[tuple] = []
+    position = 0
+    for batch in chunks():
+        vectors = normalize(_hasher.transform([p['name'] for p in batch]).multiply(idf).tocsr())
+        name_similarity = (vectors @ query_vec.T).toarray().ravel()
+        for offset, p in enumerate(batch):
+            base = float(name_similarity[offset])
+            # brand bonus
+            p_name_lower = (p.get("name") or "").lower()
+            p_brand = next((b for b in known_brands if b in p_name_lower), (p_name_lower.split()[0] if p_name_lower else ""))
+            brand_bonus = 0.1 if q_brand and p_brand and q_brand == p_brand else 0.0
+            # price proximity bonus (closer to max_price without exceeding)
+            price_bonus = 0.0
+            if max_price is not None:
+                p_price = parse_price(p.get("price"))
+                if p_price is not None and p_price <= max_price:
+                    # normalize proximity: closer to max_price gets slight boost
+                    proximity = 1.0 - (max(0, max_price - p_price) / max(max_price, 1))
+                    price_bonus = 0.1 * proximity
+            score = base + brand_bonus + price_bonus
+            # Ties keep catalog order, matching a stable sort on score
+            entry = (score, -position, base, p)
+            if len(heap) < top_n:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+            position += 1
+
     recommendations = []
-    for idx in top_indices:
+    for score, _, base, p in sorted(heap, key=lambda e: e[:2], reverse=True):
         recommendations.append({
-            "name": filtered_products[idx]["name"],
-            "price": filtered_products[idx]["price"],
-            "url": filtered_products[idx]["url"],
-            "source": filtered_products[idx].get("source", ""),
-            "similarity_score": round(float(name_similarity[idx]), 2),
-            "composite_score": round(float(scores[idx]), 2)
+            "name": p["name"],
+            "price": p["price"],
+            "url": p["url"],
+            "source": p.get("source", ""),
+            "similarity_score": round(base, 2),
+            "composite_score": round(score, 2)
         })
 
     return recommendations
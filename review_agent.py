@@ -1,18 +1,23 @@
-import re
 import json
 import os
-from typing import List, Dict, Tuple
+import time
+from urllib.parse import urlparse
+from typing import List, Dict, Tuple, Set
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Try Gemini for summaries; fall back to rule-based summary
-try:
-    import google.generativeai as genai
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-except Exception:
-    genai = None
+# Gemini (through the shared gateway) for summaries; fall back to rule-based summary
+import llm_gateway
+from review_summarizer import summarize_reviews_map_reduce
+from product_cache import extract_product_id_from_url, product_details_cache, product_cache_key
+from review_store import review_hash, load_reviews, known_hashes, is_fresh, merge_reviews
+from review_sentiment import analyze_sentiment, format_summary, aspect_notes
+from metrics import span, timed
+
+# Set REVIEW_LLM_POLISH=0 to always use the local summary
+LLM_POLISH = os.environ.get("REVIEW_LLM_POLISH", "1").lower() not in ("0", "false", "no")
 
 # Try Playwright for scraping; fall back to mock
 try:
@@ -21,18 +26,6 @@ except Exception:
     sync_playwright = None
 
 
-def extract_product_id_from_url(url: str) -> str | None:
-    if not url:
-        return None
-    m = re.search(r"i\d{6,}", url)
-    if m:
-        return m.group(0)
-    m = re.search(r"/product/([\w-]+)-(\d+)", url)
-    if m:
-        return m.group(2)
-    return None
-
-
 def mock_fetch_reviews(product_name: str, max_reviews: int = 20) -> List[Dict]:
     examples = [
         {"rating": 5, "text": f"Excellent {product_name}! Battery life is great and the screen is vivid."},
@@ -44,10 +37,323 @@ def mock_fetch_reviews(product_name: str, max_reviews: int = 20) -> List[Dict]:
     return examples[:max_reviews]
 
 
-def scrape_daraz_reviews(product_url: str, max_reviews: int = 20) -> List[Dict]:
+# Incremental mode stops once this many already-stored reviews are on the page
+KNOWN_OVERLAP = 3
+
+# Crawl budgets: the most reviews one analysis collects, and the wall-clock limit per crawl
+MAX_REVIEWS = int(os.environ.get("REVIEW_CRAWL_MAX", 1000))
+CRAWL_SECONDS = float(os.environ.get("REVIEW_CRAWL_SECONDS", 90))
+# Stratified early stop: once MIN_SAMPLE reviews are loaded, every star level holding at
+# least RARE_SHARE of them needs PER_RATING reviews, then the sample is representative enough
+STRATA_MIN_SAMPLE = 200
+STRATA_PER_RATING = 30
+STRATA_RARE_SHARE = 0.05
+
+STOP_REASONS = {
+    "count_budget": "review count budget reached",
+    "time_budget": "time budget reached",
+    "strata_covered": "enough reviews of every star rating",
+    "reached_stored": "reached reviews already stored",
+    "exhausted": "no more reviews to load",
+    "store_fresh": "served from the review store",
+    "unavailable": "browser scraping unavailable",
+    "error": "page error",
+}
+
+# Visible reviews (text and star rating) in one round-trip; used while scrolling and for the final extraction
+_VISIBLE_REVIEWS_JS = """
+() => {
+  const blockSelectors = ["[data-qa-locator='review-item']", "div.review-item", "div.mod-reviews div.item",
+                          "div.c3yR0V", "div.c3XbGJ", "div.review"];
+  const textSelectors = [".content", ".review-content", "p", "div"];
+  for (const sel of blockSelectors) {
+    const blocks = document.querySelectorAll(sel);
+    if (!blocks.length) continue;
+    return Array.from(blocks).map(b => {
+      let text = b.innerText.trim();
+      for (const ts of textSelectors) {
+        const el = b.querySelector(ts);
+        if (el && el.innerText.trim()) { text = el.innerText.trim(); break; }
+      }
+      let rating = 0;
+      const star = b.querySelector("[aria-label*='out of 5'], [aria-label*='Out of 5']");
+      const m = star && (star.getAttribute("aria-label") || "").match(/(\\d(?:\\.\\d)?)\\s*out of\\s*5/i);
+      if (m) rating = parseFloat(m[1]);
+      else rating = Math.min(5, b.querySelectorAll(".star, .icon-star, .grade-star, .rating-star").length);
+      if (!rating) {
+        const t = b.innerText.match(/(\\d(?:\\.\\d)?)\\s*\\/\\s*5/);
+        if (t) rating = parseFloat(t[1]);
+      }
+      return {text, rating};
+    });
+  }
+  return [];
+}
+"""
+
+
+def strata_covered(ratings: List[float], min_sample: int = STRATA_MIN_SAMPLE,
+                   per_rating: int = STRATA_PER_RATING, rare_share: float = STRATA_RARE_SHARE) -> bool:
+    """True when the loaded ratings cover every common star level well enough to stop."""
+    if len(ratings) < min_sample:
+        return False
+    counts: Dict[int, int] = {}
+    for r in ratings:
+        counts[int(round(r))] = counts.get(int(round(r)), 0) + 1
+    return all(c >= per_rating for c in counts.values() if c / len(ratings) >= rare_share)
+
+
+def _budget_stop(loaded: List[Dict], max_reviews: int, known: Set[str] | None, deadline: float) -> str | None:
+    """The STOP_REASONS key that ends the crawl given the reviews loaded so far, if any."""
+    if max_reviews and len(loaded) >= max_reviews:
+        return "count_budget"
+    if known and sum(1 for r in loaded if review_hash(r["text"]) in known) >= min(KNOWN_OVERLAP, len(known)):
+        return "reached_stored"
+    if strata_covered([r["rating"] for r in loaded if r["rating"]]):
+        return "strata_covered"
+    if time.monotonic() >= deadline:
+        return "time_budget"
+    return None
+
+
+# -------------------------------
+# Review JSON endpoint (the one the product page itself pages through)
+# -------------------------------
+REVIEW_API_PAGE_SIZE = 50
+REVIEW_API_CONCURRENCY = 4
+REVIEW_API_SORT = 1  # most recent first, so incremental fetches can stop at stored reviews
+
+# Runs inside the product page so requests carry its cookies; pages are fetched concurrently
+_REVIEW_API_JS = """
+async ({urls, timeoutMs}) => Promise.all(urls.map(u =>
+  fetch(u, {credentials: "include", headers: {"accept": "application/json"}, signal: AbortSignal.timeout(timeoutMs)})
+    .then(r => r.ok ? r.json() : null)
+    .catch(() => null)
+))
+"""
+
+
+def review_api_url(product_url: str, item_id: str, page_no: int, page_size: int = REVIEW_API_PAGE_SIZE) -> str:
+    host = urlparse(product_url).hostname or "www.daraz.lk"
+    suffix = host.split("daraz.", 1)[1] if "daraz." in host else "lk"
+    return (f"https://my.daraz.{suffix}/pdp/review/getReviewList?itemId={item_id}"
+            f"&pageSize={page_size}&filter=0&sort={REVIEW_API_SORT}&pageNo={page_no}")
+
+
+def parse_review_page(payload: Dict | None) -> Tuple[List[Dict], int] | None:
+    """Reviews and total page count from one review JSON page; None when it is not one."""
+    model = (payload or {}).get("model") if isinstance(payload, dict) else None
+    if not isinstance(model, dict):
+        return None
+    reviews: List[Dict] = []
+    for item in model.get("items") or []:
+        text = (item.get("reviewContent") or "").strip()
+        if not text:
+            continue
+        reviews.append({
+            "rating": float(item.get("rating") or 0),
+            "text": text,
+            "date": item.get("reviewTime") or "",
+            "variant": item.get("skuInfo") or "",
+        })
+    total_pages = int((model.get("paging") or {}).get("totalPages") or 0)
+    return reviews, total_pages
+
+
+def _fetch_reviews_via_api(page, product_url: str, max_reviews: int, known: Set[str] | None,
+                           deadline: float, report: Dict) -> List[Dict] | None:
+    """
+    Page through the review JSON endpoint from inside the loaded product page,
+    REVIEW_API_CONCURRENCY pages at a time, under the same budgets as the DOM
+    crawl. Returns None when the endpoint is unusable (blocked, changed), so
+    the caller falls back to the DOM.
+    """
+    product_id = extract_product_id_from_url(product_url)
+    if not product_id:
+        return None
+    item_id = product_id.lstrip("i")
+
+    def fetch(page_numbers: List[int]) -> List:
+        timeout_ms = max(1000, int((deadline - time.monotonic()) * 1000))
+        urls = [review_api_url(product_url, item_id, n) for n in page_numbers]
+        return page.evaluate(_REVIEW_API_JS, {"urls": urls, "timeoutMs": timeout_ms}) or []
+
+    try:
+        first = parse_review_page((fetch([1]) or [None])[0])
+    except Exception:
+        first = None
+    if first is None:
+        return None
+    reviews, total_pages = first
+    report["source"] = "api"
+    report["order"] = "recent"
+    report["rounds"] = 1
+    next_page = 2
+    while True:
+        report["loaded"] = len(reviews)
+        reason = _budget_stop(reviews, max_reviews, known, deadline)
+        if reason:
+            report["stop_reason"] = reason
+            break
+        if next_page > total_pages:
+            report["stop_reason"] = "exhausted"
+            break
+        batch = list(range(next_page, min(total_pages, next_page + REVIEW_API_CONCURRENCY - 1) + 1))
+        report["rounds"] += 1
+        try:
+            pages = [parse_review_page(payload) for payload in fetch(batch)]
+        except Exception:
+            report["stop_reason"] = "error"
+            break
+        if not any(p and p[0] for p in pages):
+            report["stop_reason"] = "exhausted"
+            break
+        for parsed in pages:
+            if parsed:
+                reviews.extend(parsed[0])
+        next_page = batch[-1] + 1
+    return reviews[:max_reviews] if max_reviews else reviews
+
+
+# The review section's sort control, and its newest-first option
+_SORT_OPENERS = ["div.oper:has-text('Sort')", "text=/^\\s*Sort(\\s*by)?\\s*:/i", "div.review-sort"]
+_RECENT_OPTIONS = ["li:has-text('Recent')", "div.next-menu-item:has-text('Recent')", "text=/^\\s*(Most\\s+)?Recent\\s*$/i"]
+
+
+def _select_recent_sort(page) -> bool:
+    """Switch the rendered reviews to newest first; False when the control was not found."""
+    for opener in _SORT_OPENERS:
+        try:
+            el = page.query_selector(opener)
+            if not el:
+                continue
+            el.click()
+            page.wait_for_timeout(500)
+            for option in _RECENT_OPTIONS:
+                choice = page.query_selector(option)
+                if choice:
+                    choice.click()
+                    page.wait_for_timeout(1500)
+                    return True
+        except Exception:
+            pass
+    return False
+
+
+def _crawl_reviews_dom(page, max_reviews: int, known: Set[str] | None, deadline: float, report: Dict) -> List[Dict]:
+    """
+    Fallback path: scroll the rendered review section and parse review blocks.
+
+    The section is switched to newest first before scrolling. If that fails
+    the page stays in relevance order, where stored reviews show up on the
+    first screen, so the stop at stored reviews is disabled for this crawl.
+    """
+    report["source"] = "dom"
+    reviews: List[Dict] = []
+    # Try to navigate to reviews tab/section if available
+    possible_tab_selectors = [
+        "a[data-spm-anchor-id*='tab-reviews']",
+        "a[href*='#reviews']",
+        "#module_product_review a",
+        "text=Ratings & Reviews",
+    ]
+    for sel in possible_tab_selectors:
+        if time.monotonic() >= deadline:
+            break
+        try:
+            el = page.query_selector(sel)
+            if el:
+                el.click()
+                page.wait_for_timeout(1500)
+                break
+        except Exception:
+            pass
+    if _select_recent_sort(page):
+        report["order"] = "recent"
+    else:
+        report["order"] = "relevance"
+        known = None
+
+    # Keep scrolling and try to click any "load more"/pagination until no new content is loaded
+    last_height = 0
+    stagnant_rounds = 0
+    while True:
+        report["rounds"] += 1
+        page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
+        page.wait_for_timeout(1200)
+        # Try clicking any load more buttons commonly used
+        for sel in [
+            "button:has-text('Load More')",
+            "button:has-text('See More')",
+            "a:has-text('Load More')",
+            "a:has-text('See More')",
+            "button.load-more",
+            "button[data-qa-locator='view-more']",
+        ]:
+            if time.monotonic() >= deadline:
+                break
+            try:
+                btn = page.query_selector(sel)
+                if btn:
+                    btn.click()
+                    page.wait_for_timeout(1500)
+            except Exception:
+                pass
+        new_height = page.evaluate("document.body.scrollHeight")
+        if new_height == last_height:
+            stagnant_rounds += 1
+        else:
+            stagnant_rounds = 0
+        last_height = new_height
+        # break when we've had multiple stagnant rounds (no new content)
+        if stagnant_rounds >= 3:
+            report["stop_reason"] = "exhausted"
+            break
+        visible = page.evaluate(_VISIBLE_REVIEWS_JS) or []
+        report["loaded"] = len(visible)
+        reason = _budget_stop(visible, max_reviews, known, deadline)
+        if reason:
+            report["stop_reason"] = reason
+            break
+
+    # One page.evaluate for every block; the crawl budget was already spent above
+    try:
+        visible = page.evaluate(_VISIBLE_REVIEWS_JS) or []
+    except Exception:
+        visible = []
+    for r in visible:
+        if len(reviews) >= max_reviews:
+            break
+        text_val = (r.get("text") or "").strip()
+        if text_val:
+            reviews.append({"rating": float(r.get("rating") or 0), "text": text_val})
+    return reviews
+
+
+def scrape_daraz_reviews(product_url: str, max_reviews: int = 20, known: Set[str] | None = None) -> List[Dict]:
+    return crawl_daraz_reviews(product_url, max_reviews, known)[0]
+
+
+def crawl_daraz_reviews(product_url: str, max_reviews: int = 20, known: Set[str] | None = None,
+                        time_budget: float = CRAWL_SECONDS) -> Tuple[List[Dict], Dict]:
+    """
+    Scrape reviews from a Daraz product page, newest first, within budgets.
+
+    Reviews come from the page's review JSON endpoint when it answers, and
+    from the rendered review section otherwise (report["source"] says
+    which). Either way, paging stops when ``max_reviews`` reviews are
+    loaded, ``time_budget`` seconds have passed, the loaded ratings cover
+    every common star level (see strata_covered), the page reaches stored
+    reviews (``known`` text hashes; only when the reviews are in date
+    order, see report["order"]), or nothing new loads. Returns the reviews
+    and a crawl report with the stop reason.
+    """
+    report = {"stop_reason": "unavailable", "source": None, "rounds": 0, "elapsed": 0.0, "loaded": 0}
     if not product_url or sync_playwright is None:
-        return []
+        return [], report
 
+    started = time.monotonic()
+    deadline = started + time_budget
     reviews: List[Dict] = []
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True, args=[
@@ -59,193 +365,89 @@ def scrape_daraz_reviews(product_url: str, max_reviews: int = 20) -> List[Dict]:
         context = browser.new_context(viewport={'width': 1366, 'height': 900})
         page = context.new_page()
         try:
-            page.goto(product_url, timeout=120000, wait_until='domcontentloaded')
+            page.goto(product_url, timeout=max(1000, int(time_budget * 1000)), wait_until='domcontentloaded')
             page.wait_for_timeout(3000)
 
-            # Try to navigate to reviews tab/section if available
-            possible_tab_selectors = [
-                "a[data-spm-anchor-id*='tab-reviews']",
-                "a[href*='#reviews']",
-                "#module_product_review a",
-                "text=Ratings & Reviews",
-            ]
-            for sel in possible_tab_selectors:
-                try:
-                    el = page.query_selector(sel)
-                    if el:
-                        el.click()
-                        page.wait_for_timeout(1500)
-                        break
-                except Exception:
-                    pass
-
-            # Keep scrolling and try to click any "load more"/pagination until no new content is loaded
-            last_height = 0
-            stagnant_rounds = 0
-            while True:
-                page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
-                page.wait_for_timeout(1200)
-                # Try clicking any load more buttons commonly used
-                for sel in [
-                    "button:has-text('Load More')",
-                    "button:has-text('See More')",
-                    "a:has-text('Load More')",
-                    "a:has-text('See More')",
-                    "button.load-more",
-                    "button[data-qa-locator='view-more']",
-                ]:
-                    try:
-                        btn = page.query_selector(sel)
-                        if btn:
-                            btn.click()
-                            page.wait_for_timeout(1500)
-                    except Exception:
-                        pass
-                new_height = page.evaluate("document.body.scrollHeight")
-                if new_height == last_height:
-                    stagnant_rounds += 1
-                else:
-                    stagnant_rounds = 0
-                last_height = new_height
-                # break when we've had multiple stagnant rounds (no new content)
-                if stagnant_rounds >= 3:
-                    break
-
-            candidate_blocks = []
-            review_block_selectors = [
-                "[data-qa-locator='review-item']",
-                "div.review-item",
-                "div.mod-reviews div.item",
-                "div.c3yR0V",
-                "div.c3XbGJ",
-                "div.review",
-            ]
-            for sel in review_block_selectors:
-                blocks = page.query_selector_all(sel)
-                if blocks:
-                    candidate_blocks = blocks
-                    break
-
-            if not candidate_blocks:
-                # fallback: collect any elements that look like reviews via star icons + text length
-                candidate_blocks = page.query_selector_all("text=/\d+ out of 5|★|\bstars?\b/i") or []
-
-            for block in candidate_blocks:
-                if len(reviews) >= max_reviews:
-                    break
-                try:
-                    # Extract rating
-                    rating = None
-                    # aria-label like "4 out of 5"
-                    star_el = block.query_selector("[aria-label*='out of 5'], [aria-label*='Out of 5']")
-                    if star_el:
-                        lab = (star_el.get_attribute("aria-label") or "")
-                        m = re.search(r"(\d(?:\.\d)?)\s*out of\s*5", lab, re.I)
-                        if m:
-                            rating = float(m.group(1))
-                    if rating is None:
-                        # count filled stars
-                        filled = block.query_selector_all(".star, .icon-star, .grade-star, .rating-star")
-                        if filled:
-                            rating = float(min(5, len(filled)))
-                    if rating is None:
-                        # try text content
-                        txt = (block.inner_text() or "").strip()
-                        m = re.search(r"(\d(?:\.\d)?)\s*/\s*5", txt)
-                        if m:
-                            rating = float(m.group(1))
-                    # Extract text
-                    text_el = None
-                    for sel in [
-                        "[data-qa-locator='review-item'] .content",
-                        ".content",
-                        ".review-content",
-                        "p",
-                        "div",
-                    ]:
-                        text_el = block.query_selector(sel)
-                        if text_el and (text_el.inner_text() or "").strip():
-                            break
-                    text_val = (text_el.inner_text().strip() if text_el else (block.inner_text() or "").strip())
-                    if not text_val:
-                        continue
-                    reviews.append({
-                        "rating": rating if rating is not None else 0,
-                        "text": text_val,
-                    })
-                except Exception:
-                    continue
+            reviews = _fetch_reviews_via_api(page, product_url, max_reviews, known, deadline, report)
+            if reviews is None:
+                reviews = _crawl_reviews_dom(page, max_reviews, known, deadline, report)
         except Exception:
-            pass
+            report["stop_reason"] = "error"
         finally:
             context.close()
             browser.close()
 
-    # If max_reviews is very large, this effectively returns all collected
-    return reviews[:max_reviews] if max_reviews else reviews
+    report["elapsed"] = round(time.monotonic() - started, 1)
+    return (reviews[:max_reviews] if max_reviews else reviews), report
 
 
-def summarize_reviews_llm(product_name: str, reviews: List[Dict]) -> str:
+def summarize_reviews_llm(product_name: str, reviews: List[Dict], product_key: str | None = None,
+                          analysis: Dict | None = None) -> str:
     if not reviews:
         return "No reviews available yet."
-    bullets = [f"{r.get('rating','?')}★: {r.get('text','').strip()}" for r in reviews]
-    prompt = f"""
-You are a concise e-commerce review analyst. Given user reviews for {product_name}, produce:
-1) One-line verdict with stars (e.g., 4.3/5)
-2) Top 3 pros
-3) Top 3 cons
-4) Short buying advice in <= 25 words
-
-Reviews:\n{chr(10).join(bullets)}
-"""
-    if genai is not None:
+    # Local sentiment/aspect scoring is the baseline; the LLM only polishes it
+    analysis = analysis or analyze_sentiment(reviews)
+    if LLM_POLISH and llm_gateway.available():
         try:
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            resp = model.generate_content(prompt)
-            return resp.text.strip()
+            # Map-reduce over token-budgeted chunks; chunk summaries are cached per product_key
+            return summarize_reviews_map_reduce(product_name, reviews, product_key, aspect_notes(analysis))
         except Exception:
             pass
-    # Fallback heuristic summary
-    ratings = [r.get("rating", 0) or 0 for r in reviews]
-    avg = round(sum(ratings) / len(ratings), 1) if ratings else 0
-    pros: List[str] = []
-    cons: List[str] = []
-    for r in reviews:
-        t = (r.get("text") or "").lower()
-        if any(k in t for k in ["great", "excellent", "good", "fast", "recommended", "authentic", "vivid", "battery"]):
-            pros.append(r.get("text", ""))
-        if any(k in t for k in ["late", "dented", "weak", "average", "bad", "poor", "noisy"]):
-            cons.append(r.get("text", ""))
-    pros = pros[:3]
-    cons = cons[:3]
-    advice = "Good overall value; check camera low-light and speaker needs before buying."
-    lines = [
-        f"Verdict: {avg}/5 ⭐",
-        "Pros:",
-        *([f"- {p}" for p in pros] or ["- —"]),
-        "Cons:",
-        *([f"- {c}" for c in cons] or ["- —"]),
-        f"Advice: {advice}",
-    ]
-    return "\n".join(lines)
+    return format_summary(analysis)
+
+
+@timed("fetch_reviews")
+def fetch_reviews(product_url: str, max_reviews: int = 20) -> Tuple[List[Dict], Dict]:
+    """
+    Reviews for a product, served from the review store, plus the crawl
+    report. Only reviews newer than the stored ones are scraped, and a
+    recently refreshed product is not scraped at all.
+    """
+    product_id = extract_product_id_from_url(product_url)
+    if not product_id:
+        return crawl_daraz_reviews(product_url, max_reviews=max_reviews)
+    if is_fresh(product_id):
+        stored = load_reviews(product_id)
+        return stored[:max_reviews], {"stop_reason": "store_fresh", "rounds": 0, "elapsed": 0.0, "loaded": len(stored)}
+    fetched, report = crawl_daraz_reviews(product_url, max_reviews=max_reviews, known=known_hashes(product_id))
+    stored, added = merge_reviews(product_id, fetched)
+    report["added"] = added
+    print(f"Review store {product_id}: {added} new, {len(stored)} total ({report['stop_reason']})")
+    return stored[:max_reviews], report
 
 
-def analyze_product_reviews(product_name: str, product_url: str | None = None, max_reviews: int = 20) -> Tuple[List[Dict], str]:
+@timed("analyze_reviews")
+def analyze_product_reviews(product_name: str, product_url: str | None = None, max_reviews: int = 20) -> Tuple[List[Dict], str, Dict]:
+    """
+    Fetch and summarize reviews. Returns (reviews, summary, analysis); the
+    analysis carries the crawl report under "crawl" when a URL was crawled.
+    """
     reviews: List[Dict] = []
+    report = None
     if product_url:
         try:
-            reviews = scrape_daraz_reviews(product_url, max_reviews=max_reviews)
+            reviews, report = fetch_reviews(product_url, max_reviews=max_reviews)
         except Exception:
             reviews = []
+    if not reviews and product_url:
+        # Reuse the reviews of a product page already scraped for comparison
+        cached = product_details_cache.peek(product_cache_key(product_url)) or {}
+        reviews = list(cached.get("reviews") or [])[:max_reviews]
     if not reviews:
         reviews = mock_fetch_reviews(product_name, max_reviews=max_reviews)
-    summary = summarize_reviews_llm(product_name, reviews)
-    return reviews, summary
+    product_key = extract_product_id_from_url(product_url) if product_url else None
+    with span("review_sentiment"):
+        analysis = analyze_sentiment(reviews)
+    with span("review_summary"):
+        summary = summarize_reviews_llm(product_name, reviews, product_key, analysis)
+    if report:
+        analysis["crawl"] = {**report, "reason": STOP_REASONS.get(report["stop_reason"], report["stop_reason"])}
+    return reviews, summary, analysis
 
 
 if __name__ == "__main__":
     name = "Samsung Galaxy S24 Ultra"
-    reviews, summary = analyze_product_reviews(name)
+    reviews, summary, _ = analyze_product_reviews(name)
     print(json.dumps(reviews, ensure_ascii=False, indent=2))
     print("\n--- SUMMARY ---\n")
     print(summary)
@@ -0,0 +1,202 @@
+import re
+from typing import List, Dict
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+# Sentiment lexicon: word -> weight (negated forms get the opposite sign)
+POSITIVE_WORDS = {
+    "good": 1, "nice": 1, "fine": 0.5, "fast": 1, "quick": 1, "smooth": 1, "clear": 1, "vivid": 1,
+    "loud": 0.5, "crisp": 1, "sturdy": 1, "solid": 1, "durable": 1, "comfortable": 1, "beautiful": 1,
+    "happy": 1, "satisfied": 1, "worth": 1, "recommended": 1.5, "recommend": 1.5, "authentic": 1.5,
+    "genuine": 1.5, "original": 1, "working": 0.5, "thanks": 0.5, "thank": 0.5, "love": 2, "great": 2,
+    "excellent": 2, "amazing": 2, "awesome": 2, "perfect": 2, "superb": 2, "best": 2,
+}
+NEGATIVE_WORDS = {
+    "bad": -1.5, "poor": -1.5, "slow": -1, "late": -1, "delay": -1, "delayed": -1, "weak": -1,
+    "cheap": -0.5, "noisy": -1, "issue": -1, "issues": -1, "problem": -1, "problems": -1,
+    "heating": -1, "overheating": -1.5, "lag": -1, "laggy": -1, "hang": -1, "hangs": -1, "drains": -1,
+    "scratched": -1, "scratches": -1, "dented": -1.5, "missing": -1, "faulty": -2, "defective": -2,
+    "damaged": -2, "broken": -2, "fake": -2, "useless": -2, "waste": -2, "disappointed": -2,
+    "refund": -1, "return": -0.5, "worst": -2, "terrible": -2, "average": -0.5,
+}
+SENTIMENT_WORDS = {**POSITIVE_WORDS, **NEGATIVE_WORDS}
+
+# Aspect -> terms that count as a mention of it
+ASPECTS = {
+    "battery": ["battery", "charge", "charging", "charger", "backup", "mah", "drain", "drains"],
+    "camera": ["camera", "photo", "photos", "picture", "pictures", "video", "videos", "selfie", "lens", "zoom"],
+    "display": ["display", "screen", "brightness", "amoled", "resolution"],
+    "performance": ["performance", "speed", "lag", "laggy", "hang", "hangs", "gaming", "processor", "heating"],
+    "sound": ["sound", "audio", "speaker", "speakers", "bass", "volume", "mic", "noise", "noisy", "loud"],
+    "delivery": ["delivery", "delivered", "shipping", "courier", "arrived", "packaging", "package", "packed", "late", "delay", "delayed"],
+    "authenticity": ["authentic", "genuine", "original", "fake", "warranty", "sealed", "copy"],
+    "build": ["build", "quality", "design", "body", "sturdy", "material", "dented", "scratched", "scratches", "broken"],
+    "value": ["price", "value", "worth", "money", "cheap", "expensive", "budget"],
+    "comfort": ["comfortable", "comfort", "fit", "strap", "ear", "ears", "wear"],
+}
+ASPECT_LABELS = {a: a.capitalize() for a in ASPECTS}
+
+# Per-review sentiment above/below these counts as positive/negative
+POSITIVE_CUTOFF = 0.15
+NEGATIVE_CUTOFF = -0.15
+# Weight of the lexicon score versus the star rating when both are present
+LEXICON_WEIGHT = 0.6
+
+_NEGATION = re.compile(r"\b(?:not|no|never|hardly|isn'?t|wasn'?t|don'?t|doesn'?t|didn'?t|aren'?t)\s+(\w+)")
+
+
+def _preprocess(text: str) -> str:
+    # "not good" -> "not_good", so negated words are separate vocabulary entries
+    return _NEGATION.sub(r"not_\1", text.lower())
+
+
+def _build_vocabulary():
+    vocab: Dict[str, int] = {}
+    for word in list(SENTIMENT_WORDS) + [t for terms in ASPECTS.values() for t in terms]:
+        for form in (word, f"not_{word}"):
+            vocab.setdefault(form, len(vocab))
+    weights = np.zeros(len(vocab))
+    aspect_matrix = np.zeros((len(vocab), len(ASPECTS)))
+    for word, w in SENTIMENT_WORDS.items():
+        weights[vocab[word]] = w
+        weights[vocab[f"not_{word}"]] = -w
+    for j, terms in enumerate(ASPECTS.values()):
+        for t in terms:
+            aspect_matrix[vocab[t], j] = 1
+            aspect_matrix[vocab[f"not_{t}"], j] = 1
+    return vocab, weights, aspect_matrix
+
+
+_VOCAB, _WEIGHTS, _ASPECT_MATRIX = _build_vocabulary()
+_vectorizer = CountVectorizer(vocabulary=_VOCAB, preprocessor=_preprocess, token_pattern=r"(?u)\b\w+\b")
+
+
+def score_reviews(reviews: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized per-review scores: combined sentiment in [-1, 1] and a
+    reviews x aspects boolean mention matrix (columns in ASPECTS order).
+    """
+    texts = [r.get("text") or "" for r in reviews]
+    counts = _vectorizer.transform(texts)
+    lexicon = np.tanh(counts @ _WEIGHTS / 2.0)
+    ratings = np.array([float(r.get("rating") or 0) for r in reviews])
+    has_rating = ratings > 0
+    stars = np.where(has_rating, (ratings - 3.0) / 2.0, 0.0)
+    has_words = (counts @ np.abs(_WEIGHTS)) > 0
+    combined = np.where(
+        has_words & has_rating, LEXICON_WEIGHT * lexicon + (1 - LEXICON_WEIGHT) * stars,
+        np.where(has_rating, stars, lexicon),
+    )
+    mentions = (counts @ _ASPECT_MATRIX) > 0
+    return {"sentiment": combined, "mentions": np.asarray(mentions), "ratings": ratings}
+
+
+def _quote(text: str, limit: int = 120) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def analyze_sentiment(reviews: List[Dict], min_mentions: int = 2) -> Dict:
+    """
+    Aggregate sentiment and aspect scores for a set of reviews, without any
+    LLM call. Aspects mentioned by fewer than ``min_mentions`` reviews (or
+    2% of them, whichever is larger) are left out of pros/cons.
+    """
+    reviews = [r for r in reviews or [] if (r.get("text") or "").strip()]
+    if not reviews:
+        return {"count": 0, "avg_rating": 0, "sentiment": 0.0, "aspects": [], "pros": [], "cons": []}
+    scores = score_reviews(reviews)
+    sentiment, mentions, ratings = scores["sentiment"], scores["mentions"], scores["ratings"]
+    rated = ratings[ratings > 0]
+    n_mentions = mentions.sum(axis=0)
+    positive = (mentions & (sentiment[:, None] > POSITIVE_CUTOFF)).sum(axis=0)
+    negative = (mentions & (sentiment[:, None] < NEGATIVE_CUTOFF)).sum(axis=0)
+    aspect_sum = sentiment @ mentions
+
+    floor = max(min_mentions, int(0.02 * len(reviews)))
+    aspects = []
+    for j, aspect in enumerate(ASPECTS):
+        n = int(n_mentions[j])
+        if n == 0:
+            continue
+        idx = np.flatnonzero(mentions[:, j])
+        aspects.append({
+            "aspect": aspect,
+            "label": ASPECT_LABELS[aspect],
+            "mentions": n,
+            "score": round(float(aspect_sum[j] / n), 2),
+            "positive_pct": round(100.0 * positive[j] / n, 1),
+            "negative_pct": round(100.0 * negative[j] / n, 1),
+            "best_quote": _quote(reviews[idx[np.argmax(sentiment[idx])]].get("text")),
+            "worst_quote": _quote(reviews[idx[np.argmin(sentiment[idx])]].get("text")),
+            "significant": n >= floor,
+        })
+    aspects.sort(key=lambda a: a["mentions"], reverse=True)
+    significant = [a for a in aspects if a["significant"]]
+    pros = sorted((a for a in significant if a["score"] > 0.2), key=lambda a: a["score"], reverse=True)
+    cons = sorted((a for a in significant if a["score"] < 0 or (a["score"] <= 0.2 and a["negative_pct"] >= 35)),
+                  key=lambda a: a["score"])
+    return {
+        "count": len(reviews),
+        "avg_rating": round(float(rated.mean()), 1) if rated.size else 0,
+        "sentiment": round(float(sentiment.mean()), 2),
+        "positive_pct": round(100.0 * float((sentiment > POSITIVE_CUTOFF).mean()), 1),
+        "negative_pct": round(100.0 * float((sentiment < NEGATIVE_CUTOFF).mean()), 1),
+        "aspects": aspects,
+        "pros": pros[:3],
+        "cons": cons[:3],
+    }
+
+
+def format_summary(analysis: Dict) -> str:
+    """Render an analysis in the same verdict/pros/cons/advice layout as the LLM summary."""
+    if not analysis.get("count"):
+        return "No reviews available yet."
+    pros = [f"- {a['label']}: {a['positive_pct']:.0f}% positive across {a['mentions']} mentions (\"{a['best_quote']}\")"
+            for a in analysis["pros"]]
+    cons = [f"- {a['label']}: {a['negative_pct']:.0f}% negative across {a['mentions']} mentions (\"{a['worst_quote']}\")"
+            for a in analysis["cons"]]
+    if analysis["cons"]:
+        advice = f"Check {', '.join(a['label'].lower() for a in analysis['cons'])} before buying."
+    elif analysis["avg_rating"] >= 4 or analysis["sentiment"] > 0.3:
+        advice = "Reviewers are consistently happy; a safe pick at this price."
+    else:
+        advice = "Mixed feedback; compare alternatives before buying."
+    return "\n".join([
+        f"Verdict: {analysis['avg_rating']}/5 ⭐ ({analysis['positive_pct']:.0f}% positive of {analysis['count']} reviews)",
+        "Pros:",
+        *(pros or ["- —"]),
+        "Cons:",
+        *(cons or ["- —"]),
+        f"Advice: {advice}",
+    ])
+
+
+def aspect_notes(analysis: Dict) -> str:
+    """Compact aspect digest handed to the LLM polish step."""
+    return "\n".join(
+        f"- {a['label']}: {a['mentions']} mentions, {a['positive_pct']:.0f}% positive, {a['negative_pct']:.0f}% negative"
+        for a in analysis.get("aspects", []) if a["significant"]
+    )
+
+
+if __name__ == "__main__":
+    import time
+    import random
+
+    sample = [
+        {"rating": 5, "text": "Battery life is excellent and the camera is great in daylight."},
+        {"rating": 4, "text": "Good phone, delivery was late by two days though."},
+        {"rating": 2, "text": "Screen arrived dented, not happy with the packaging."},
+        {"rating": 5, "text": "Genuine product, fast delivery. Highly recommended!"},
+        {"rating": 3, "text": "Camera is not good in low light, battery is fine."},
+    ]
+    print(format_summary(analyze_sentiment(sample)))
+
+    many = [dict(random.choice(sample), text=random.choice(sample)["text"] + f" #{i}") for i in range(50000)]
+    start = time.perf_counter()
+    analyze_sentiment(many)
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(many)} reviews in {elapsed:.2f}s ({len(many) / elapsed:,.0f} reviews/s)")
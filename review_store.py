@@ -0,0 +1,82 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import List, Dict, Set, Tuple
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.environ.get("REVIEW_STORE_DIR", os.path.join(BASE_DIR, "review_store"))
+# Stored reviews younger than this are served without re-scraping (seconds)
+FRESH_SECONDS = int(os.environ.get("REVIEW_STORE_TTL", 3600))
+
+_lock = threading.Lock()
+
+
+def review_hash(text: str) -> str:
+    """Hash of the normalized review text, used for dedup and stable ordering."""
+    norm = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+
+def _path(product_id: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_-]+", "_", product_id)[:80]
+    return os.path.join(STORE_DIR, f"{safe}.json")
+
+
+def load_store(product_id: str) -> Dict:
+    """The stored record for a product: {"product_id", "updated", "reviews"} (newest first)."""
+    try:
+        with open(_path(product_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"product_id": product_id, "updated": 0, "reviews": []}
+
+
+def load_reviews(product_id: str) -> List[Dict]:
+    return load_store(product_id)["reviews"]
+
+
+def known_hashes(product_id: str) -> Set[str]:
+    return {r["hash"] for r in load_reviews(product_id)}
+
+
+def is_fresh(product_id: str, max_age: int = FRESH_SECONDS) -> bool:
+    store = load_store(product_id)
+    return bool(store["reviews"]) and time.time() - store.get("updated", 0) < max_age
+
+
+def merge_reviews(product_id: str, fetched: List[Dict]) -> Tuple[List[Dict], int]:
+    """
+    Add newly fetched reviews (page order, newest first) in front of the
+    stored ones, skipping any whose text hash is already stored. Returns
+    all stored reviews and the number added. An empty fetch (e.g. a failed
+    scrape) leaves the store untouched, so it is not marked fresh.
+    """
+    if not fetched:
+        return load_reviews(product_id), 0
+    with _lock:
+        store = load_store(product_id)
+        seen = {r["hash"] for r in store["reviews"]}
+        now = time.time()
+        added: List[Dict] = []
+        for r in fetched:
+            text = (r.get("text") or "").strip()
+            if not text:
+                continue
+            h = review_hash(text)
+            if h in seen:
+                continue
+            seen.add(h)
+            added.append({**r, "text": text, "hash": h, "first_seen": now})
+        store["reviews"] = added + store["reviews"]
+        store["updated"] = now
+        os.makedirs(STORE_DIR, exist_ok=True)
+        path = _path(product_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(store, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    return store["reviews"], len(added)
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict
+
+import llm_gateway
+from review_store import review_hash
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHUNK_CACHE_DIR = os.environ.get("REVIEW_CHUNK_CACHE_DIR", os.path.join(BASE_DIR, "review_cache"))
+
+# Rough prompt budgeting: ~4 characters per token for English review text
+CHARS_PER_TOKEN = 4
+CHUNK_TOKEN_BUDGET = 3000
+REDUCE_TOKEN_BUDGET = 6000
+MAX_SAMPLED_REVIEWS = 2000
+MAX_REVIEW_CHARS = 1200
+MAP_CONCURRENCY = 4
+# A review whose hash is divisible by this closes its chunk (content-defined boundaries)
+BOUNDARY_MODULUS = 24
+
+_cache_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def _bullet(review: Dict) -> str:
+    text = (review.get("text") or "").strip().replace("\n", " ")
+    return f"{review.get('rating', '?')}★: {text[:MAX_REVIEW_CHARS]}"
+
+
+def dedupe_and_sample(reviews: List[Dict], max_reviews: int = MAX_SAMPLED_REVIEWS) -> List[Dict]:
+    """
+    Drop empty and duplicate reviews, then keep at most ``max_reviews``,
+    sampled per star rating in proportion to its share. Output is ordered by
+    text hash so the same review always lands in the same place.
+    """
+    unique: Dict[str, Dict] = {}
+    for r in reviews or []:
+        if not (r.get("text") or "").strip():
+            continue
+        unique.setdefault(review_hash(r["text"]), r)
+    items = sorted(unique.items())
+    if len(items) > max_reviews:
+        strata: Dict[int, List] = {}
+        for item in items:
+            strata.setdefault(int(round(float(item[1].get("rating") or 0))), []).append(item)
+        sampled = []
+        for bucket in strata.values():
+            # Hash order is effectively random, so a prefix is an unbiased sample
+            sampled.extend(bucket[:max(1, round(max_reviews * len(bucket) / len(items)))])
+        items = sorted(sampled)[:max_reviews]
+    return [r for _, r in items]
+
+
+def chunk_reviews(reviews: List[Dict], token_budget: int = CHUNK_TOKEN_BUDGET) -> List[List[Dict]]:
+    """
+    Split hash-ordered reviews into chunks that fit ``token_budget``. Besides the
+    budget, a chunk also ends after any review whose hash hits BOUNDARY_MODULUS,
+    so adding reviews only changes the chunks they fall into and the cached
+    summaries of all other chunks stay valid.
+    """
+    chunks: List[List[Dict]] = []
+    current: List[Dict] = []
+    used = 0
+    for r in reviews:
+        cost = estimate_tokens(_bullet(r))
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(r)
+        used += cost
+        if int(review_hash(r["text"])[:8], 16) % BOUNDARY_MODULUS == 0:
+            chunks.append(current)
+            current, used = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# -------------------------------
+# Per-product chunk summary cache
+# -------------------------------
+def _cache_path(product_key: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_-]+", "_", product_key)[:80]
+    return os.path.join(CHUNK_CACHE_DIR, f"{safe}.json")
+
+
+def load_chunk_cache(product_key: str) -> Dict[str, str]:
+    try:
+        with open(_cache_path(product_key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_chunk_cache(product_key: str, summaries: Dict[str, str]) -> None:
+    path = _cache_path(product_key)
+    with _cache_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def _chunk_id(chunk: List[Dict]) -> str:
+    return hashlib.sha1("|".join(review_hash(r["text"]) for r in chunk).encode("utf-8")).hexdigest()
+
+
+# -------------------------------
+# Map and reduce prompts
+# -------------------------------
+def _summarize_chunk(product_name: str, chunk: List[Dict]) -> str:
+    bullets = "\n".join(_bullet(r) for r in chunk)
+    prompt = f"""
+You are analysing one batch of {len(chunk)} user reviews for {product_name}.
+List the recurring pros, recurring cons and notable themes (delivery, authenticity, battery, etc.)
+as short bullet points, each with a rough count of how many reviews mention it. No preamble.
+
+Reviews:\n{bullets}
+"""
+    return llm_gateway.generate(prompt)
+
+
+def _reduce_batch(product_name: str, summaries: List[str]) -> str:
+    joined = "\n\n".join(f"Batch {i}:\n{s}" for i, s in enumerate(summaries, 1))
+    prompt = f"""
+Merge these partial review analyses for {product_name} into one list of recurring pros,
+cons and themes with combined counts. Keep it as short bullet points. No preamble.
+
+{joined}
+"""
+    return llm_gateway.generate(prompt)
+
+
+def _final_summary(product_name: str, notes: str, review_count: int, avg_rating: float, aspects: str = "") -> str:
+    if aspects:
+        notes = f"Aspect scores from all reviews:\n{aspects}\n\n{notes}"
+    prompt = f"""
+You are a concise e-commerce review analyst. Based on this analysis of {review_count} user reviews
+for {product_name} (average rating {avg_rating}/5), produce:
+1) One-line verdict with stars (e.g., 4.3/5)
+2) Top 3 pros
+3) Top 3 cons
+4) Short buying advice in <= 25 words
+
+Analysis:\n{notes}
+"""
+    return llm_gateway.generate(prompt)
+
+
+def summarize_reviews_map_reduce(product_name: str, reviews: List[Dict], product_key: str | None = None,
+                                 aspects: str = "") -> str:
+    """
+    Hierarchical LLM summary: dedup and sample the reviews, chunk them to a
+    token budget, summarize chunks concurrently (reusing cached chunk
+    summaries for ``product_key``), then reduce until one final summary.
+    ``aspects`` is an optional locally computed aspect digest for the final prompt.
+    Raises on LLM failure so callers can fall back.
+    """
+    sampled = dedupe_and_sample(reviews)
+    if not sampled:
+        return "No reviews available yet."
+    ratings = [float(r.get("rating") or 0) for r in sampled]
+    avg_rating = round(sum(ratings) / len(ratings), 1)
+    chunks = chunk_reviews(sampled)
+
+    if len(chunks) == 1:
+        # Small products: a single prompt with the reviews themselves
+        bullets = "\n".join(_bullet(r) for r in chunks[0])
+        return _final_summary(product_name, f"Reviews:\n{bullets}", len(sampled), avg_rating, aspects)
+
+    cache = load_chunk_cache(product_key) if product_key else {}
+    ids = [_chunk_id(c) for c in chunks]
+    missing = [(cid, c) for cid, c in zip(ids, chunks) if cid not in cache]
+    if missing:
+        with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+            results = list(pool.map(lambda item: _summarize_chunk(product_name, item[1]), missing))
+        for (cid, _), summary in zip(missing, results):
+            cache[cid] = summary
+        if product_key:
+            # Only keep summaries of chunks that still exist
+            save_chunk_cache(product_key, {cid: cache[cid] for cid in ids})
+
+    summaries = [cache[cid] for cid in ids]
+    while sum(estimate_tokens(s) for s in summaries) > REDUCE_TOKEN_BUDGET and len(summaries) > 1:
+        batches: List[List[str]] = [[]]
+        used = 0
+        for s in summaries:
+            cost = estimate_tokens(s)
+            if batches[-1] and used + cost > REDUCE_TOKEN_BUDGET:
+                batches.append([])
+                used = 0
+            batches[-1].append(s)
+            used += cost
+        if len(batches) == len(summaries):
+            # Every summary is already at the budget on its own; stop shrinking
+            break
+        with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+            summaries = list(pool.map(lambda batch: _reduce_batch(product_name, batch), batches))
+
+    return _final_summary(product_name, "\n\n".join(summaries), len(sampled), avg_rating, aspects)
@@ -0,0 +1,272 @@
+import re
+from typing import List, Dict, Callable, NamedTuple
+
+import numpy as np
+
+
+class Spec(NamedTuple):
+    """One comparable spec: display key, typed column, display formatter and which direction is better."""
+    key: str
+    column: str
+    fmt: Callable[[Dict], str]
+    better: str = "high"  # "high", "low" or "" (not ranked)
+
+
+def _unit(column: str, unit: str) -> Callable[[Dict], str]:
+    return lambda s: f"{s[column]:g} {unit}"
+
+
+def _flag(column: str) -> Callable[[Dict], str]:
+    return lambda s: "Yes" if s[column] else "No"
+
+
+# -------------------------------
+# Precompiled patterns
+# -------------------------------
+_GB = re.compile(r"(\d{1,4})\s?(gb|tb)\b")
+_RAM_PLUS_STORAGE = re.compile(r"\b(\d{1,2})\s?(?:gb)?\s?\+\s?(\d{2,4})\s?(gb|tb)\b")
+_RAM_LABEL = re.compile(r"\b(\d{1,2})\s?gb\s?(?:of\s)?(?:ram|ddr\d?|lpddr\d?x?)\b")
+_MP = re.compile(r"(\d{1,3}(?:\.\d)?)\s?mp\b")
+_MAH = re.compile(r"(\d{3,5})\s?mah\b")
+_INCH = re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s?(?:\"+|”|''|-?inch(?:es)?\b|in\b)")
+_HZ_REFRESH = re.compile(r"(\d{2,3})\s?hz\b")
+_DRIVER = re.compile(r"(\d{1,2})\s?mm\s?(?:dynamic\s)?driver")
+_FREQUENCY = re.compile(r"(\d{1,3})\s?hz\s?(?:-|–|~|to)\s?(\d{1,2}(?:,?\d{3})?)\s?(k)?hz")
+_OHM = re.compile(r"(\d{2,3})\s?(?:ohm|ω)")
+_HOURS = re.compile(r"(\d{1,3})\s?(?:\+\s?)?(?:h|hr|hrs|hour|hours)\b")
+_DAYS = re.compile(r"(\d{1,2})\s?(?:\+\s?)?days?\b")
+_ZOOM = re.compile(r"(\d{1,3}(?:\.\d)?)\s?x\s?(?:optical\s)?zoom")
+_LENS = re.compile(r"(\d{2,3})(?:\s?-\s?(\d{2,3}))?\s?mm\b")
+_VIDEO = re.compile(r"\b(8k|6k|4k|2\.7k|1080p|720p)\b")
+_WATTS = re.compile(r"(\d{1,4})\s?w(?:att)?s?\b")
+_IP = re.compile(r"\bip[x]?(\d)(\d)?\b")
+_ATM = re.compile(r"(\d{1,2})\s?atm\b")
+_BT_VERSION = re.compile(r"(?:bluetooth|bt)\s?v?(\d(?:\.\d)?)\b")
+_5G = re.compile(r"\b5g\b")
+_NOISE_CANCEL = re.compile(r"noise\s?cancel|\banc\b")
+_WIRELESS = re.compile(r"wireless|bluetooth|\btws\b")
+_WIRED = re.compile(r"\bwired\b")
+_GPS = re.compile(r"\bgps\b")
+_CALLING = re.compile(r"\b(?:bt|bluetooth)\s?call|answer\s?call|\bcalling\b|dial\s?call")
+_HEART_RATE = re.compile(r"heart\s?rate")
+_FULL_FRAME = re.compile(r"full[\s-]?frame")
+
+_VIDEO_LINES = {"8k": 4320, "6k": 3160, "4k": 2160, "2.7k": 1520, "1080p": 1080, "720p": 720}
+
+# RAM above this (GB) is read as storage when a listing has a single GB value
+_RAM_CEILING = {"phones": 24, "laptops": 64}
+# Plausible screen sizes (inches); anything else is a model number or "10 in 1"
+_DISPLAY_RANGE = {"phones": (3.5, 8.0), "laptops": (10.0, 18.5), "smartwatches": (0.8, 3.0)}
+
+
+def _memory(text: str, category: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    m = _RAM_PLUS_STORAGE.search(text)
+    if m:
+        out["ram_gb"] = float(m.group(1))
+        out["storage_gb"] = float(m.group(2)) * (1024 if m.group(3) == "tb" else 1)
+        return out
+    m = _RAM_LABEL.search(text)
+    if m:
+        out["ram_gb"] = float(m.group(1))
+    sizes = [float(v) * (1024 if unit == "tb" else 1) for v, unit in _GB.findall(text)]
+    ceiling = _RAM_CEILING.get(category, 24)
+    if "ram_gb" not in out and len(sizes) >= 2 and min(sizes) <= ceiling:
+        out["ram_gb"] = min(sizes)
+    storage = [v for v in sizes if v > ceiling or (len(sizes) == 1 and v >= 32)]
+    if storage:
+        out["storage_gb"] = max(storage)
+    elif len(sizes) == 1 and "ram_gb" not in out:
+        out["ram_gb"] = sizes[0]
+    return out
+
+
+def _display(text: str, category: str) -> float | None:
+    low, high = _DISPLAY_RANGE[category]
+    for m in _INCH.finditer(text):
+        if low <= float(m.group(1)) <= high:
+            return float(m.group(1))
+    return None
+
+
+def _has(pattern: re.Pattern, text: str) -> bool | None:
+    # Absent flags are unknown (None), not a confident "No"
+    return True if pattern.search(text) else None
+
+
+def _number(pattern: re.Pattern, text: str, cast=float) -> float | None:
+    m = pattern.search(text)
+    return cast(m.group(1)) if m else None
+
+
+def _phones(text: str) -> Dict:
+    specs = _memory(text, "phones")
+    specs["camera_mp"] = _number(_MP, text)
+    specs["battery_mah"] = _number(_MAH, text)
+    specs["display_in"] = _display(text, "phones")
+    specs["refresh_hz"] = _number(_HZ_REFRESH, text)
+    specs["five_g"] = _has(_5G, text)
+    return specs
+
+
+def _laptops(text: str) -> Dict:
+    specs = _memory(text, "laptops")
+    specs["display_in"] = _display(text, "laptops")
+    specs["refresh_hz"] = _number(_HZ_REFRESH, text)
+    return specs
+
+
+def _headphones(text: str) -> Dict:
+    specs = {
+        "driver_mm": _number(_DRIVER, text),
+        "impedance_ohm": _number(_OHM, text),
+        "battery_hours": _number(_HOURS, text),
+        "noise_cancellation": _has(_NOISE_CANCEL, text),
+        "wireless": True if _WIRELESS.search(text) else (False if _WIRED.search(text) else None),
+    }
+    m = _FREQUENCY.search(text)
+    if m:
+        high = float(m.group(2).replace(",", "")) * (1000 if m.group(3) else 1)
+        specs["freq_low_hz"], specs["freq_high_hz"] = float(m.group(1)), high
+    return specs
+
+
+def _cameras(text: str) -> Dict:
+    m = _LENS.search(text)
+    video = _VIDEO.search(text)
+    return {
+        "camera_mp": _number(_MP, text),
+        "optical_zoom_x": _number(_ZOOM, text),
+        "video_lines": float(_VIDEO_LINES[video.group(1)]) if video else None,
+        "lens_min_mm": float(m.group(1)) if m else None,
+        "lens_max_mm": float(m.group(2) or m.group(1)) if m else None,
+        "full_frame": _has(_FULL_FRAME, text),
+    }
+
+
+def _smartwatches(text: str) -> Dict:
+    return {
+        "display_in": _display(text, "smartwatches"),
+        "battery_days": _number(_DAYS, text),
+        "water_atm": _number(_ATM, text),
+        "gps": _has(_GPS, text),
+        "calling": _has(_CALLING, text),
+        "heart_rate": _has(_HEART_RATE, text),
+    }
+
+
+def _speakers(text: str) -> Dict:
+    ip = _IP.search(text)
+    return {
+        "power_w": _number(_WATTS, text),
+        "battery_hours": _number(_HOURS, text),
+        "water_ip": float(ip.group(2) or ip.group(1)) if ip else None,
+        "bluetooth_version": _number(_BT_VERSION, text),
+        "wireless": _has(_WIRELESS, text),
+    }
+
+
+EXTRACTORS = {
+    "phones": _phones,
+    "laptops": _laptops,
+    "headphones": _headphones,
+    "cameras": _cameras,
+    "smartwatches": _smartwatches,
+    "speakers": _speakers,
+}
+
+_MEMORY_SPECS = [
+    Spec("ram", "ram_gb", _unit("ram_gb", "GB")),
+    Spec("storage", "storage_gb", _unit("storage_gb", "GB")),
+]
+
+# Comparable specs per category, in display order (price, brand and source are added by callers)
+SPECS: Dict[str, List[Spec]] = {
+    "phones": _MEMORY_SPECS + [
+        Spec("camera", "camera_mp", _unit("camera_mp", "MP")),
+        Spec("battery", "battery_mah", _unit("battery_mah", "mAh")),
+        Spec("display", "display_in", _unit("display_in", "in")),
+        Spec("refresh_rate", "refresh_hz", _unit("refresh_hz", "Hz")),
+    ],
+    "laptops": _MEMORY_SPECS + [
+        Spec("display", "display_in", _unit("display_in", "in")),
+        Spec("refresh_rate", "refresh_hz", _unit("refresh_hz", "Hz")),
+    ],
+    "headphones": [
+        Spec("driver", "driver_mm", _unit("driver_mm", "mm")),
+        Spec("frequency", "freq_high_hz", lambda s: f"{s.get('freq_low_hz', 0):g}-{s['freq_high_hz']:g} Hz"),
+        Spec("impedance", "impedance_ohm", _unit("impedance_ohm", "Ohm")),
+        Spec("battery", "battery_hours", _unit("battery_hours", "hours")),
+        Spec("wireless", "wireless", _flag("wireless"), ""),
+        Spec("noise_cancellation", "noise_cancellation", _flag("noise_cancellation")),
+    ],
+    "cameras": [
+        Spec("megapixels", "camera_mp", _unit("camera_mp", "MP")),
+        Spec("zoom", "optical_zoom_x", lambda s: f"{s['optical_zoom_x']:g}x optical"),
+        Spec("video", "video_lines", lambda s: f"{s['video_lines']:g}p"),
+        Spec("lens", "lens_max_mm", lambda s: f"{s.get('lens_min_mm', s['lens_max_mm']):g}-{s['lens_max_mm']:g} mm"),
+        Spec("full_frame", "full_frame", _flag("full_frame")),
+    ],
+    "smartwatches": [
+        Spec("display", "display_in", _unit("display_in", "in")),
+        Spec("battery", "battery_days", _unit("battery_days", "days")),
+        Spec("water_resistance", "water_atm", _unit("water_atm", "ATM")),
+        Spec("gps", "gps", _flag("gps")),
+        Spec("calling", "calling", _flag("calling")),
+        Spec("heart_rate", "heart_rate", _flag("heart_rate")),
+    ],
+    "speakers": [
+        Spec("power", "power_w", _unit("power_w", "W")),
+        Spec("battery", "battery_hours", _unit("battery_hours", "hours")),
+        Spec("water_resistance", "water_ip", lambda s: f"IPX{s['water_ip']:g}"),
+        Spec("bluetooth", "bluetooth_version", lambda s: f"v{s['bluetooth_version']:g}"),
+        Spec("wireless", "wireless", _flag("wireless"), ""),
+    ],
+}
+
+
+def extract_specs(name: str, category: str = "phones") -> Dict[str, float | bool]:
+    """Typed spec columns parsed from a product name; missing values are left out."""
+    extractor = EXTRACTORS.get(category, _phones)
+    specs = extractor((name or "").lower())
+    return {k: v for k, v in specs.items() if v is not None}
+
+
+def format_specs(specs: Dict, category: str = "phones") -> Dict[str, str]:
+    """Display strings keyed by spec key ("8 GB", "48 MP", "Yes", ...)."""
+    out: Dict[str, str] = {}
+    for spec in SPECS.get(category, SPECS["phones"]):
+        if spec.column in specs:
+            out[spec.key] = spec.fmt(specs)
+    return out
+
+
+def product_specs(product: Dict, category: str = "phones") -> Dict[str, float | bool]:
+    """Specs precomputed at ingest when present, otherwise parsed from the name."""
+    specs = product.get("specs")
+    if isinstance(specs, dict):
+        return specs
+    return extract_specs(product.get("name", ""), category)
+
+
+def add_spec_columns(products: List[Dict], category: str) -> List[Dict]:
+    """Ingest stage: store the typed specs of every product under ``specs``."""
+    for p in products:
+        p["specs"] = extract_specs(p.get("name", ""), category)
+    return products
+
+
+def spec_matrix(products: List[Dict], category: str = "phones") -> tuple:
+    """
+    Products x specs float matrix (NaN where unknown; flags as 1.0), with the
+    Spec list giving the column order.
+    """
+    specs = SPECS.get(category, SPECS["phones"])
+    matrix = np.full((len(products), len(specs)), np.nan)
+    for i, p in enumerate(products):
+        values = product_specs(p, category)
+        for j, spec in enumerate(specs):
+            v = values.get(spec.column)
+            if v is not None:
+                matrix[i, j] = float(v)
+    return matrix, specs
@@ -2,16 +2,41 @@ import json
 import os
 import hashlib
 import secrets
-from typing import Optional, Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within one process
+    fcntl = None
+
 class UserAuth:
+    """
+    Users stored in a JSON file that several server processes may share.
+    Reads reload the file when another process changed it, and every
+    write is a read-modify-write under a file lock, so concurrent
+    sign-ups in different workers do not overwrite each other.
+    """
+
     def __init__(self, users_file: str = "users.json"):
         self.users_file = users_file
+        self._lock = threading.Lock()
+        self._version: Tuple | None = None
         self.users = self._load_users()
     
+    def _disk_version(self) -> Tuple | None:
+        try:
+            st = os.stat(self.users_file)
+        except OSError:
+            return None
+        # Every save replaces the file, so the inode changes even within one mtime tick
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
     def _load_users(self) -> Dict[str, Dict[str, Any]]:
         """Load users from JSON file"""
+        self._version = self._disk_version()
         if os.path.exists(self.users_file):
             try:
                 with open(self.users_file, 'r') as f:
@@ -20,10 +45,38 @@ class UserAuth:
                 return {}
         return {}
     
+    def _refresh(self):
+        """Reload the users if the file changed since it was last read or written"""
+        if self._disk_version() == self._version:
+            return
+        # Reload under the thread lock, so a reload that read the file just before a
+        # save in this process cannot replace the saved users with the older copy
+        with self._lock:
+            if self._disk_version() != self._version:
+                self.users = self._load_users()
+    
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the users file, across threads and processes, with the latest users loaded"""
+        with self._lock:
+            lock_file = None
+            if fcntl is not None:
+                lock_file = open(f"{self.users_file}.lock", "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.users = self._load_users()
+                yield
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+    
     def _save_users(self):
-        """Save users to JSON file"""
-        with open(self.users_file, 'w') as f:
+        """Save users to JSON file (call inside _locked)"""
+        tmp = f"{self.users_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
             json.dump(self.users, f, indent=2)
+        os.replace(tmp, self.users_file)
+        self._version = self._disk_version()
     
     def _hash_password(self, password: str) -> str:
         """Hash password using SHA-256 with salt"""
@@ -48,25 +101,26 @@ class UserAuth:
         if len(password) < 6:
             return {"success": False, "message": "Password must be at least 6 characters long"}
         
-        if username in self.users:
-            return {"success": False, "message": "Username already exists"}
-        
-        # Check if email already exists
-        for user_data in self.users.values():
-            if user_data.get("email") == email:
-                return {"success": False, "message": "Email already registered"}
-        
-        # Create new user
-        user_id = secrets.token_hex(8)
-        self.users[username] = {
-            "user_id": user_id,
-            "email": email,
-            "password_hash": self._hash_password(password),
-            "created_at": datetime.now().isoformat(),
-            "last_login": None
-        }
-        
-        self._save_users()
+        with self._locked():
+            if username in self.users:
+                return {"success": False, "message": "Username already exists"}
+            
+            # Check if email already exists
+            for user_data in self.users.values():
+                if user_data.get("email") == email:
+                    return {"success": False, "message": "Email already registered"}
+            
+            # Create new user
+            user_id = secrets.token_hex(8)
+            self.users[username] = {
+                "user_id": user_id,
+                "email": email,
+                "password_hash": self._hash_password(password),
+                "created_at": datetime.now().isoformat(),
+                "last_login": None
+            }
+            
+            self._save_users()
         return {"success": True, "message": "User registered successfully", "user_id": user_id}
     
     def login_user(self, username: str, password: str) -> Dict[str, Any]:
@@ -74,6 +128,7 @@ class UserAuth:
         if not username or not password:
             return {"success": False, "message": "Username and password are required"}
         
+        self._refresh()
         if username not in self.users:
             return {"success": False, "message": "Invalid username or password"}
         
@@ -83,8 +138,10 @@ class UserAuth:
             return {"success": False, "message": "Invalid username or password"}
         
         # Update last login
-        user_data["last_login"] = datetime.now().isoformat()
-        self._save_users()
+        with self._locked():
+            if username in self.users:
+                self.users[username]["last_login"] = datetime.now().isoformat()
+                self._save_users()
         
         return {
             "success": True, 
@@ -96,10 +153,12 @@ class UserAuth:
     
     def get_user(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user data by username"""
+        self._refresh()
         return self.users.get(username)
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user data by user ID"""
+        self._refresh()
         for username, user_data in self.users.items():
             if user_data.get("user_id") == user_id:
                 return {"username": username, **user_data}
@@ -107,27 +166,30 @@ class UserAuth:
     
     def update_user(self, username: str, **kwargs) -> bool:
         """Update user data"""
-        if username not in self.users:
-            return False
-        
-        for key, value in kwargs.items():
-            if key != "password_hash":  # Don't allow direct password hash updates
-                self.users[username][key] = value
-        
-        self._save_users()
+        with self._locked():
+            if username not in self.users:
+                return False
+            
+            for key, value in kwargs.items():
+                if key != "password_hash":  # Don't allow direct password hash updates
+                    self.users[username][key] = value
+            
+            self._save_users()
         return True
     
     def delete_user(self, username: str) -> bool:
         """Delete a user"""
-        if username in self.users:
-            del self.users[username]
-            self._save_users()
-            return True
+        with self._locked():
+            if username in self.users:
+                del self.users[username]
+                self._save_users()
+                return True
         return False
     
     def list_users(self) -> Dict[str, Dict[str, Any]]:
         """List all users (for admin purposes)"""
         # Return users without password hashes
+        self._refresh()
         safe_users = {}
         for username, user_data in self.users.items():
             safe_users[username] = {
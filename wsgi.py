@@ -0,0 +1,75 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+``app.py``'s ``__main__`` block runs the single-threaded development
+server; this module exposes the same ``app`` for a multi-worker WSGI
+server. With ``preload_app`` (see gunicorn.conf.py) it is imported once in
+the master, and ``warm_up`` builds every category's catalog and derived
+indexes there, so the forked workers share them copy-on-write and serve
+their first request warm.
+
+Set WARMUP=0 to skip the warmup (e.g. for quick local restarts).
+"""
+import os
+import time
+
+from app import app
+
+
+def warm_up(flask_app=app) -> dict:
+    """
+    Prime the per-category caches the request handlers would otherwise
+    build on first use: the catalog, product table, below-threshold list,
+    cross-retailer match index and dashboard summary for every category,
+    plus the cross-category recommendation index and the compiled
+    templates. Returns per-step timings in seconds.
+
+    Nothing here calls Gemini or a scraper: llm_gateway's thread pool
+    must not have started threads before the workers are forked.
+    """
+    from categories import CATEGORIES
+    from catalog_summary import get_summary
+    from product_query import product_table
+    from recommendation_agent import _get_hasher
+
+    timings = {}
+    for slug, cat in CATEGORIES.items():
+        start = time.perf_counter()
+        cat.products()
+        product_table(cat)
+        cat.below_threshold()
+        cat.match_index()
+        get_summary(cat)
+        timings[slug] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from catalog_index import get_catalog_index
+    get_catalog_index()
+    _get_hasher()
+    timings["recommendation_index"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Agents the routes import lazily; loading them here keeps that work out of the first requests
+    import compare_agent, enhanced_compare_agent, review_agent, catalog_ingest  # noqa: F401
+    timings["agents"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in flask_app.jinja_env.list_templates():
+        flask_app.jinja_env.get_template(name)
+    timings["templates"] = time.perf_counter() - start
+    return timings
+
+
+if os.environ.get("WARMUP", "1") != "0":
+    _start = time.perf_counter()
+    _timings = warm_up()
+    print(f"Warmup done in {time.perf_counter() - _start:.2f}s: "
+          + ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in _timings.items()))
+
+
+if __name__ == "__main__":
+    # Same as the development server, but warmed up first
+    port = int(os.environ.get("PORT", 5000))
+    app.run(host="0.0.0.0", port=port)